@@ -0,0 +1,412 @@
+"""
+Benchmark suite for pytfc hot paths.
+
+Each benchmark runs in a fresh worker process against a
+`pytfc.testing.FakeTfcServer` hosted in a separate process, so peak
+RSS and allocation figures only reflect the pytfc side of the call.
+Results are written as JSON to `benchmarks/results/<label>.json` and
+can be compared against an earlier result file to spot regressions.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --quick --only list_all_10k
+    python benchmarks/run_benchmarks.py --label v0.3.0
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/v0.3.0.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+sys.path.insert(0, REPO_ROOT)
+
+ORG = 'pytfc-bench'
+MiB = 1024 * 1024
+
+
+# ----------------------------------------------------------------------
+# Server process
+# ----------------------------------------------------------------------
+def _server_main(seed_name, size, conn):
+    """
+    Entry point of the server process: seeds the fake server using
+    the named seed function and serves until told to stop.
+    """
+    from pytfc.testing import FakeTfcServer
+
+    server = FakeTfcServer().start()
+    server.seed_organization(ORG)
+    context = SEEDS[seed_name](server, size) if seed_name else {}
+    conn.send({'hostname': server.hostname, 'token': server.token,
+               'context': context})
+    conn.recv()
+    conn.send(server.request_count)
+    server.stop()
+
+
+class ServerProcess:
+    """
+    Runs a seeded `FakeTfcServer` in a child process.
+    """
+    def __init__(self, seed_name, size):
+        self._parent, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_server_main, args=(seed_name, size, child), daemon=True)
+
+    def __enter__(self):
+        self._process.start()
+        info = self._parent.recv()
+        self.hostname = info['hostname']
+        self.token = info['token']
+        self.context = info['context']
+        return self
+
+    def request_count(self):
+        self._parent.send('stop')
+        count = self._parent.recv()
+        self._process.join()
+        return count
+
+    def __exit__(self, *exc):
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+
+
+# ----------------------------------------------------------------------
+# Seed functions (run in the server process)
+# ----------------------------------------------------------------------
+def _seed_workspaces(server, size):
+    server.seed_workspaces(ORG, size)
+    return {}
+
+def _seed_workspace(server, size):
+    ws_id = server.seed_workspace(ORG, 'bench-ws')
+    return {'ws_id': ws_id, 'ws': 'bench-ws'}
+
+def _seed_state(server, size):
+    ws_id = server.seed_workspace(ORG, 'bench-ws')
+    chunk = os.urandom(MiB).hex().encode('ascii')[:MiB]
+    state = chunk * size
+    sv_id = server.seed_state_version(ws_id, state, parse_outputs=False)
+    return {'ws_id': ws_id, 'sv_id': sv_id, 'size': len(state)}
+
+def _seed_plan_export(server, size):
+    ws_id = server.seed_workspace(ORG, 'bench-ws')
+    run_id = server.seed_run(ws_id)
+    return {'ws_id': ws_id, 'plan_id': server.runs[run_id]['plan_id']}
+
+SEEDS = {
+    'workspaces': _seed_workspaces,
+    'workspace': _seed_workspace,
+    'state': _seed_state,
+    'plan_export': _seed_plan_export,
+}
+
+
+# ----------------------------------------------------------------------
+# Benchmarks (run in the worker process)
+# ----------------------------------------------------------------------
+def _make_tf_tree(root, size):
+    """
+    Writes a Terraform-like tree of roughly `size` MiB: small `.tf`
+    files plus larger, partially compressible data files.
+    """
+    rng = random.Random(42)
+    for d in range(size):
+        module_dir = os.path.join(root, 'modules', f'mod{d:03d}')
+        os.makedirs(module_dir, exist_ok=True)
+        for i in range(8):
+            with open(os.path.join(module_dir, f'r{i}.tf'), 'w') as fp:
+                fp.write(f'resource "null_resource" "r{i}" {{}}\n' * 200)
+        with open(os.path.join(module_dir, 'data.bin'), 'wb') as fp:
+            fp.write(rng.randbytes(MiB // 2))
+            fp.write(b'\0' * (MiB // 2))
+
+def _client(server, **kwargs):
+    import pytfc
+    return pytfc.Client(hostname=server.hostname, token=server.token,
+                        org=ORG, **kwargs)
+
+def bench_list_all(server, workdir):
+    client = _client(server)
+    return {'records': len(client.workspaces.list_all()['data'])}
+
+def bench_create_tf_tarball(server, workdir):
+    client = _client(server)
+    tarball = client.configuration_versions._create_tf_tarball(
+        source_dir=server.tree, dest_dir=workdir)
+    return {'bytes': os.path.getsize(tarball)}
+
+def bench_cv_upload(server, workdir):
+    client = _client(server)
+    cv = client.configuration_versions.create(ws_id=server.context['ws_id'])
+    upload_url = cv.json()['data']['attributes']['upload-url']
+    with open(server.tarball, 'rb') as fp:
+        client.configuration_versions.upload(cv_upload_url=upload_url,
+                                             tf_tarball=fp)
+    return {'bytes': os.path.getsize(server.tarball)}
+
+def bench_state_download(server, workdir):
+    client = _client(server)
+    url = client.state_versions.get_download_url(
+        sv_id=server.context['sv_id'])
+    return {'bytes': len(client.state_versions.download(url=url))}
+
+def bench_plan_export_download(server, workdir):
+    client = _client(server)
+    path = client.plan_exports.download(plan_id=server.context['plan_id'],
+                                        dest_folder=workdir)
+    return {'bytes': os.path.getsize(path)}
+
+def bench_client_construction(server, workdir):
+    rounds = 50
+    for _ in range(rounds):
+        _client(server, ws=server.context['ws'])
+    return {'rounds': rounds}
+
+
+class Benchmark:
+    """
+    A named benchmark: what to seed, how large, and what to time.
+    `prepare` runs in the worker before timing starts.
+    """
+    def __init__(self, func, seed=None, size=None, quick_size=None,
+                 prepare=None):
+        self.func = func
+        self.seed = seed
+        self.size = size
+        self.quick_size = quick_size
+        self.prepare = prepare
+
+
+def _prepare_tree(server, workdir, size):
+    server.tree = os.path.join(workdir, 'tree')
+    _make_tf_tree(server.tree, size)
+
+def _prepare_tarball(server, workdir, size):
+    _prepare_tree(server, workdir, size)
+    import pytfc
+    cv_client = pytfc.api.ConfigurationVersions(None, ORG, None, None,
+                                                'WARNING')
+    server.tarball = cv_client._create_tf_tarball(
+        source_dir=server.tree, dest_dir=workdir)
+
+
+BENCHMARKS = {
+    'list_all_10k': Benchmark(bench_list_all, seed='workspaces',
+                              size=10000, quick_size=1000),
+    'list_all_100k': Benchmark(bench_list_all, seed='workspaces',
+                               size=100000, quick_size=5000),
+    'create_tf_tarball': Benchmark(bench_create_tf_tarball, size=64,
+                                   quick_size=4, prepare=_prepare_tree),
+    'cv_upload': Benchmark(bench_cv_upload, seed='workspace', size=64,
+                           quick_size=4, prepare=_prepare_tarball),
+    'state_download_100mb': Benchmark(bench_state_download, seed='state',
+                                      size=100, quick_size=8),
+    'plan_export_download': Benchmark(bench_plan_export_download,
+                                      seed='plan_export'),
+    'client_construction': Benchmark(bench_client_construction,
+                                      seed='workspace'),
+}
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _worker(name, quick, measure_allocations):
+    """
+    Runs one benchmark in this (fresh) process and
+    prints its result as a single JSON line.
+    """
+    bench = BENCHMARKS[name]
+    size = bench.quick_size if quick else bench.size
+    workdir = tempfile.mkdtemp(prefix='pytfc-bench-')
+    try:
+        with ServerProcess(bench.seed, size) as server:
+            if bench.prepare is not None:
+                bench.prepare(server, workdir, size)
+            rss_before = _peak_rss_bytes()
+            start = time.perf_counter()
+            info = bench.func(server, workdir)
+            wall = time.perf_counter() - start
+            rss_after = _peak_rss_bytes()
+            requests_made = server.request_count()
+
+        result = {
+            'size': size,
+            'wall_seconds': round(wall, 4),
+            'requests': requests_made,
+            'requests_per_second': round(requests_made / wall, 1)
+                                   if wall else None,
+            'peak_rss_bytes': rss_after,
+            'peak_rss_growth_bytes': rss_after - rss_before,
+        }
+        result.update(info)
+
+        if measure_allocations:
+            with ServerProcess(bench.seed, size) as server:
+                if bench.prepare is not None:
+                    shutil.rmtree(workdir, ignore_errors=True)
+                    os.makedirs(workdir)
+                    bench.prepare(server, workdir, size)
+                tracemalloc.start()
+                bench.func(server, workdir)
+                current, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                server.request_count()
+            result['alloc_peak_bytes'] = peak
+            result['alloc_blocks_live'] = sum(
+                s.count for s in snapshot.statistics('filename'))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(result))
+
+
+def bench_import_time(rounds=7):
+    """
+    Measures `import pytfc` in fresh interpreters (best of `rounds`).
+    """
+    code = ('import time; t = time.perf_counter(); import pytfc; '
+            'print(time.perf_counter() - t)')
+    timings = []
+    for _ in range(rounds):
+        out = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT,
+                             check=True, capture_output=True, text=True)
+        timings.append(float(out.stdout.strip()))
+    return {'wall_seconds': round(min(timings), 4),
+            'wall_seconds_median': round(sorted(timings)[rounds // 2], 4),
+            'rounds': rounds}
+
+
+def run_all(names, quick, measure_allocations):
+    results = {}
+    if 'import_time' in names:
+        print("Running `import_time`...")
+        results['import_time'] = bench_import_time()
+    for name in names:
+        if name == 'import_time':
+            continue
+        print(f"Running `{name}`...")
+        cmd = [sys.executable, os.path.abspath(__file__), '--worker', name]
+        if quick:
+            cmd.append('--quick')
+        if not measure_allocations:
+            cmd.append('--no-allocations')
+        out = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True,
+                             text=True)
+        if out.returncode != 0:
+            print(out.stderr)
+            results[name] = {'error': out.stderr.strip().splitlines()[-1]}
+            continue
+        results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+    return results
+
+
+def _git_describe():
+    try:
+        return subprocess.run(['git', 'describe', '--tags', '--always',
+                               '--dirty'], cwd=REPO_ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(baseline, current, threshold):
+    """
+    Prints a per-metric comparison and returns the
+    list of metrics that regressed beyond `threshold`.
+    """
+    metrics = ['wall_seconds', 'peak_rss_growth_bytes', 'alloc_peak_bytes']
+    regressions = []
+    print(f"\n{'benchmark':<24}{'metric':<24}{'baseline':>14}"
+          f"{'current':>14}{'change':>10}")
+    for name, result in current.items():
+        base = baseline.get(name)
+        if not base or 'error' in result or 'error' in base:
+            continue
+        for metric in metrics:
+            if metric not in result or not base.get(metric):
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            flag = ' !' if change > threshold else ''
+            print(f"{name:<24}{metric:<24}{base[metric]:>14}"
+                  f"{result[metric]:>14}{change:>+9.1%}{flag}")
+            if change > threshold:
+                regressions.append((name, metric, change))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='pytfc benchmark suite.')
+    parser.add_argument('--only', nargs='+', default=None,
+        choices=['import_time'] + list(BENCHMARKS),
+        help='Run only the named benchmarks.')
+    parser.add_argument('--quick', action='store_true',
+        help='Use small data sizes (smoke test).')
+    parser.add_argument('--no-allocations', dest='allocations',
+        action='store_false', help='Skip the tracemalloc pass.')
+    parser.add_argument('--label', default=None,
+        help='Name of the results file (defaults to `git describe`).')
+    parser.add_argument('--compare', default=None,
+        help='Results file to compare against.')
+    parser.add_argument('--threshold', type=float, default=0.10,
+        help='Relative change reported as a regression (default 0.10).')
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        _worker(args.worker, args.quick, args.allocations)
+        return
+
+    names = args.only or ['import_time'] + list(BENCHMARKS)
+    results = run_all(names, args.quick, args.allocations)
+    label = args.label or _git_describe()
+    if args.quick:
+        label += '-quick'
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f'{label}.json')
+    with open(out_path, 'w') as fp:
+        json.dump({
+            'label': label,
+            'created-at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'quick': args.quick,
+            'results': results,
+        }, fp, indent=2)
+    print(f"Wrote results to `{out_path}`.")
+
+    for name, result in results.items():
+        print(f"{name:<24}{json.dumps(result)}")
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)['results']
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,9 +4,8 @@ interface with the supported TFC/E API endpoints and resources.
 """
 from os import getenv
 import logging
-import sys
-from pytfc.requestor import Requestor
-from pytfc.utils import DEFAULT_LOG_LEVEL
+from pytfc.requestor import Requestor, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT
+from pytfc.utils import DEFAULT_LOG_LEVEL, get_logger
 from pytfc.exceptions import MissingToken
 from pytfc.exceptions import MissingOrganization
 from pytfc import api
@@ -17,45 +16,53 @@ class Client:
     """
     Initialize this class to access sub-classes
     for all TFC/E API endpoints and resources.
+
+    Sub-classes are imported and initialized on first access, and the
+    Workspace ID of `ws` is only looked up when something needs it.
     """
+    _api_packages = {
+        'api': api,
+        'admin_api': admin_api
+    }
+
     _no_org_required_classes = {
-        'admin_organizations': admin_api.AdminOrganizations,
-        'admin_runs': admin_api.AdminRuns,
-        'admin_settings': admin_api.AdminSettings,
-        'admin_terraform_versions': admin_api.AdminTerraformVersions,
-        'admin_users': admin_api.AdminUsers,
-        'admin_workspaces': admin_api.AdminWorkspaces,
-        'organizations': api.Organizations,
-        'policy_checks': api.PolicyChecks,
-        'team_membership': api.TeamMembership,
-        'team_tokens': api.TeamTokens
+        'admin_organizations': 'admin_api.AdminOrganizations',
+        'admin_runs': 'admin_api.AdminRuns',
+        'admin_settings': 'admin_api.AdminSettings',
+        'admin_terraform_versions': 'admin_api.AdminTerraformVersions',
+        'admin_users': 'admin_api.AdminUsers',
+        'admin_workspaces': 'admin_api.AdminWorkspaces',
+        'organizations': 'api.Organizations',
+        'policy_checks': 'api.PolicyChecks',
+        'team_membership': 'api.TeamMembership',
+        'team_tokens': 'api.TeamTokens'
     }
 
     _org_required_classes = {
-        'agent_pools': api.AgentPools,
-        'applies': api.Applies,
-        'audit_trails': api.AuditTrails,
-        'configuration_versions': api.ConfigurationVersions,
-        'notification_configurations': api.NotificationConfigurations,
-        'oauth_clients': api.OauthClients,
-        'oauth_tokens': api.OauthTokens,
-        'plan_exports': api.PlanExports,
-        'plans': api.Plans,
-        'projects': api.Projects,
-        'registry_modules': api.RegistryModules,
-        'runs': api.Runs,
-        'run_task_stages': api.RunTaskStages,
-        'run_tasks': api.RunTasks,
-        'run_triggers': api.RunTriggers,
-        'ssh_keys': api.SSHKeys,
-        'state_versions': api.StateVersions,
-        'state_version_outputs': api.StateVersionOutputs,
-        'team_access': api.TeamAccess,
-        'teams': api.Teams,
-        'variable_sets': api.VariableSets,
-        'workspaces': api.Workspaces,
-        'workspace_variables': api.WorkspaceVariables,
-        'workspace_resources': api.WorkspaceResources,
+        'agent_pools': 'api.AgentPools',
+        'applies': 'api.Applies',
+        'audit_trails': 'api.AuditTrails',
+        'configuration_versions': 'api.ConfigurationVersions',
+        'notification_configurations': 'api.NotificationConfigurations',
+        'oauth_clients': 'api.OauthClients',
+        'oauth_tokens': 'api.OauthTokens',
+        'plan_exports': 'api.PlanExports',
+        'plans': 'api.Plans',
+        'projects': 'api.Projects',
+        'registry_modules': 'api.RegistryModules',
+        'runs': 'api.Runs',
+        'run_task_stages': 'api.RunTaskStages',
+        'run_tasks': 'api.RunTasks',
+        'run_triggers': 'api.RunTriggers',
+        'ssh_keys': 'api.SSHKeys',
+        'state_versions': 'api.StateVersions',
+        'state_version_outputs': 'api.StateVersionOutputs',
+        'team_access': 'api.TeamAccess',
+        'teams': 'api.Teams',
+        'variable_sets': 'api.VariableSets',
+        'workspaces': 'api.Workspaces',
+        'workspace_variables': 'api.WorkspaceVariables',
+        'workspace_resources': 'api.WorkspaceResources',
     }
 
     def __init__(
@@ -66,13 +73,18 @@ class Client:
         ws=None,
         log_level=DEFAULT_LOG_LEVEL,
         verify=True,
-        requestor=Requestor
+        requestor=Requestor,
+        session=None,
+        timeout=DEFAULT_TIMEOUT,
+        cache=None,
+        pool_size=DEFAULT_POOL_SIZE
     ):
 
-        self._logger = logging.getLogger(self.__class__.__name__)
         self._log_level = getattr(logging, log_level.upper())
-        self._logger.setLevel(self._log_level)
-        self._logger.addHandler(logging.StreamHandler(sys.stdout))
+        self._logger = get_logger(self.__class__.__name__, self._log_level)
+        self._api_classes = {}
+        # Optional `pytfc.cache.DiskCache` for immutable artifacts.
+        self._cache = cache
         self._logger.debug("Instantiating TFC/E API client.")
 
         if hostname is not None:
@@ -98,7 +110,11 @@ class Client:
         else:
             raise MissingToken
 
-        _base_uri_v2 = f'https://{self.hostname}/api/v2'
+        if self.hostname.startswith(('https://', 'http://')):
+            # Scheme is explicit, e.g. for a local fake server.
+            _base_uri_v2 = f'{self.hostname}/api/v2'
+        else:
+            _base_uri_v2 = f'https://{self.hostname}/api/v2'
         _headers = {
             'Authorization': 'Bearer ' + self._token,
             'Content-Type': 'application/vnd.api+json'
@@ -108,7 +124,10 @@ class Client:
             headers=_headers,
             base_uri=_base_uri_v2,
             verify=verify,
-            log_level=self._log_level
+            log_level=self._log_level,
+            session=session,
+            timeout=timeout,
+            pool_size=pool_size
         )
 
         if org is not None:
@@ -124,11 +143,8 @@ class Client:
         if ws is not None:
             self._logger.debug("Setting ws from argument.")
             self.ws = ws
-            if self.org is not None:
-                self._logger.debug(f"Fetching and setting ws_id from ws argument.")
-                self.ws_id = self._get_ws_id(self.ws)
-            else:
-                self.ws_id = None
+            # Resolved from `ws` on first access (see `ws_id`).
+            self.ws_id = None
         else:
             self._logger.debug("A ws was not set.")
             self.ws = ws
@@ -140,7 +156,7 @@ class Client:
             classes_dict=self._no_org_required_classes,
             org=self.org,
             ws=self.ws,
-            ws_id=self.ws_id
+            ws_id=self._ws_id
         )
 
         if self.org is not None:
@@ -150,28 +166,57 @@ class Client:
                 classes_dict=self._org_required_classes,
                 org=self.org, # needed ?
                 ws=self.ws, # needed ?
-                ws_id=self.ws_id # needed ?
+                ws_id=self._ws_id # needed ?
             )
     
+    @property
+    def ws_id(self):
+        """
+        ID of the Workspace set as `ws`. Fetched
+        on first access and cached afterwards.
+        """
+        if self._ws_id is None and self.ws is not None and self.org is not None:
+            self._logger.debug(f"Fetching and setting ws_id from ws `{self.ws}`.")
+            self._ws_id = self._get_ws_id(self.ws)
+        return self._ws_id
+
+    @ws_id.setter
+    def ws_id(self, value):
+        self._ws_id = value
+
     def _get_ws_id(self, ws_name):
         path = f'/organizations/{self.org}/workspaces/{ws_name}'
         return self._requestor.get(path=path).json()['data']['id']
 
     def _init_api_classes(self, classes_dict, org=None, ws=None, ws_id=None):
         """
-        Initialize all supported API endpoint classes.
+        Register supported API endpoint classes. Each one is
+        initialized on first attribute access (see `__getattr__`).
         """
         for cls_name in classes_dict:
-            cls = classes_dict[cls_name]
-            initialized_cls = cls(
-                requestor=self._requestor,
-                org=self.org,
-                ws=self.ws,
-                ws_id=self.ws_id,
-                log_level=self._log_level
-            )
+            self.__dict__.pop(cls_name, None)
+            self._api_classes[cls_name] = classes_dict[cls_name]
+
+    def __getattr__(self, name):
+        api_classes = self.__dict__.get('_api_classes', {})
+        if name not in api_classes:
+            raise AttributeError(f"'{self.__class__.__name__}' object"
+                                 f" has no attribute '{name}'")
+
+        package, cls_name = api_classes[name].split('.')
+        cls = getattr(self._api_packages[package], cls_name)
+        initialized_cls = cls(
+            requestor=self._requestor,
+            org=self.org,
+            ws=self.ws,
+            ws_id=self._ws_id,
+            log_level=self._log_level,
+            ws_id_resolver=lambda: self.ws_id,
+            cache=self._cache
+        )
 
-            setattr(self, cls_name, initialized_cls)
+        setattr(self, name, initialized_cls)
+        return initialized_cls
 
     def set_org(self, name):
         """
@@ -1,6 +1,31 @@
-from .admin_organizations import AdminOrganizations
-from .admin_runs import AdminRuns
-from .admin_settings import AdminSettings
-from .admin_terraform_versions import AdminTerraformVersions
-from .admin_users import AdminUsers
-from .admin_workspaces import AdminWorkspaces
\ No newline at end of file
+"""
+TFE Admin API endpoint classes.
+
+Endpoint modules are imported on first attribute access so that
+`import pytfc` stays cheap.
+"""
+import importlib
+
+_classes = {
+    'AdminOrganizations': 'admin_organizations',
+    'AdminRuns': 'admin_runs',
+    'AdminSettings': 'admin_settings',
+    'AdminTerraformVersions': 'admin_terraform_versions',
+    'AdminUsers': 'admin_users',
+    'AdminWorkspaces': 'admin_workspaces',
+}
+
+__all__ = list(_classes)
+
+
+def __getattr__(name):
+    if name in _classes:
+        module = importlib.import_module(f'.{_classes[name]}', __name__)
+        cls = getattr(module, name)
+        globals()[name] = cls
+        return cls
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
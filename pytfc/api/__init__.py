@@ -1,28 +1,53 @@
-from .agent_pools import AgentPools
-from .applies import Applies
-from .audit_trails import AuditTrails
-from .configuration_versions import ConfigurationVersions
-from .notification_configurations import NotificationConfigurations
-from .oauth_clients import OauthClients
-from .oauth_tokens import OauthTokens
-from .organizations import Organizations
-from .plan_exports import PlanExports
-from .plans import Plans
-from .policy_checks import PolicyChecks
-from .projects import Projects
-from .registry_modules import RegistryModules
-from .runs import Runs
-from .run_task_stages import RunTaskStages
-from .run_tasks import RunTasks
-from .run_triggers import RunTriggers
-from .ssh_keys import SSHKeys
-from .state_versions import StateVersions
-from .state_version_outputs import StateVersionOutputs
-from .team_access import TeamAccess
-from .team_membership import TeamMembership
-from .team_tokens import TeamTokens
-from .teams import Teams
-from .variable_sets import VariableSets
-from .workspaces import Workspaces
-from .workspace_variables import WorkspaceVariables
-from .workspace_resources import WorkspaceResources
\ No newline at end of file
+"""
+TFC/E API endpoint classes.
+
+Endpoint modules are imported on first attribute access so that
+`import pytfc` stays cheap.
+"""
+import importlib
+
+_classes = {
+    'AgentPools': 'agent_pools',
+    'Applies': 'applies',
+    'AuditTrails': 'audit_trails',
+    'ConfigurationVersions': 'configuration_versions',
+    'NotificationConfigurations': 'notification_configurations',
+    'OauthClients': 'oauth_clients',
+    'OauthTokens': 'oauth_tokens',
+    'Organizations': 'organizations',
+    'PlanExports': 'plan_exports',
+    'Plans': 'plans',
+    'PolicyChecks': 'policy_checks',
+    'Projects': 'projects',
+    'RegistryModules': 'registry_modules',
+    'Runs': 'runs',
+    'RunTaskStages': 'run_task_stages',
+    'RunTasks': 'run_tasks',
+    'RunTriggers': 'run_triggers',
+    'SSHKeys': 'ssh_keys',
+    'StateVersions': 'state_versions',
+    'StateVersionOutputs': 'state_version_outputs',
+    'TeamAccess': 'team_access',
+    'TeamMembership': 'team_membership',
+    'TeamTokens': 'team_tokens',
+    'Teams': 'teams',
+    'VariableSets': 'variable_sets',
+    'Workspaces': 'workspaces',
+    'WorkspaceVariables': 'workspace_variables',
+    'WorkspaceResources': 'workspace_resources',
+}
+
+__all__ = list(_classes)
+
+
+def __getattr__(name):
+    if name in _classes:
+        module = importlib.import_module(f'.{_classes[name]}', __name__)
+        cls = getattr(module, name)
+        globals()[name] = cls
+        return cls
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
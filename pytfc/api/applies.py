@@ -1,5 +1,6 @@
 """TFC/E Applies API endpoints module."""
 from pytfc.tfc_api_base import TfcApiBase
+from pytfc.waiter import APPLY_FINAL_STATUSES, get_waiter
 
 
 class Applies(TfcApiBase):
@@ -11,4 +12,21 @@ class Applies(TfcApiBase):
         GET /applies/:id
         """
         path = f'/applies/{apply_id}'
-        return self._requestor.get(path=path)
\ No newline at end of file
+        return self._requestor.get(path=path)
+
+    def wait(self, apply_id, statuses=APPLY_FINAL_STATUSES, waiter=None,
+             timeout=None, on_change=None):
+        """
+        Polls the Apply (one GET per poll) until its status is one of
+        `statuses`. `on_change(previous, current)` is called on status
+        changes.
+
+        Returns the final Apply object (dict).
+        """
+        waiter = get_waiter(waiter, timeout=timeout, on_change=on_change,
+                            initial_delay=1, max_delay=15)
+        return waiter.wait(
+            poll=lambda: self.show(apply_id=apply_id).json(),
+            until=lambda apply: apply['data']['attributes']['status']
+                in statuses,
+            key=lambda apply: apply['data']['attributes']['status'])
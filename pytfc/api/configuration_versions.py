@@ -1,18 +1,92 @@
 """TFC/E Configuration Versions API endpoints module."""
+import contextvars
+import functools
+import glob
+import json
 import os
-import time
-import tarfile
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from pytfc import deadline
+from pytfc.bundle import ConfigurationBundle
 from pytfc.tfc_api_base import TfcApiBase
+from pytfc.transfer import as_limiter
+from pytfc.waiter import get_waiter
 from pytfc.utils import validate_ws_id_is_set
-from pytfc.exceptions import ConfigurationVersionUploadError
+from pytfc.exceptions import ConfigurationVersionUploadError, DeadlineExceeded
+from pytfc.exceptions import FanOutError
+
+# Constants
+TARBALL_NAME = 'tf_*.tar.gz'
+
+
+class ConfigurationVersionCache:
+    """
+    Maps bundle content hashes to uploaded Configuration Version IDs
+    per Workspace. Kept in memory, and persisted as JSON when `path`
+    is given so that separate processes (e.g. pipeline re-runs) can
+    share it.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r') as fp:
+                self._entries = json.load(fp)
+
+    @staticmethod
+    def _key(ws_id, digest, speculative):
+        return f"{ws_id}:{'speculative' if speculative else 'standard'}:{digest}"
+
+    def get(self, ws_id, digest, speculative=False):
+        with self._lock:
+            return self._entries.get(self._key(ws_id, digest, speculative))
+
+    def set(self, ws_id, digest, speculative, cv_id):
+        if digest is None:
+            return
+        with self._lock:
+            self._entries[self._key(ws_id, digest, speculative)] = cv_id
+            self._save()
+
+    def discard(self, ws_id, digest, speculative=False):
+        with self._lock:
+            self._entries.pop(self._key(ws_id, digest, speculative), None)
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as fp:
+            json.dump(self._entries, fp)
+        os.replace(tmp_path, self.path)
 
 
 class ConfigurationVersions(TfcApiBase):
     """
     TFC/E Configuration Version methods.
     """
+    # Summary of the most recently built bundle.
+    last_bundle = None
+
+    @property
+    def cv_cache(self):
+        """
+        Content hash -> Configuration Version ID cache used by
+        `create_and_upload(reuse=True)`. Assign a
+        `ConfigurationVersionCache(path=...)` to persist it.
+        """
+        if getattr(self, '_cv_cache', None) is None:
+            self._cv_cache = ConfigurationVersionCache()
+        return self._cv_cache
+
+    @cv_cache.setter
+    def cv_cache(self, cache):
+        self._cv_cache = cache
+
     @validate_ws_id_is_set
     def list(self, ws_id=None, page_number=None, page_size=None):
         """
@@ -96,10 +170,21 @@ class ConfigurationVersions(TfcApiBase):
         path = f'/workspaces/{ws_id}/configuration-versions'
         return self._requestor.post(path=path, payload=payload)
 
-    def _create_tf_tarball(self, source_dir, dest_dir='./'):
+    def _create_tf_tarball(self, source_dir, dest_dir='./',
+                           terraformignore=True, compresslevel=6,
+                           compress_workers=None):
         """
         Helper method to create tarball of Terraform files from specified path.
         Configuration Versions API requires tar.gz file format for upload.
+
+        Honors `.terraformignore` in `source_dir` along with Terraform's
+        default excludes (`.git/`, `.terraform/` except modules) unless
+        `terraformignore=False`. A summary of the bundle is logged and
+        kept in `self.last_bundle`.
+
+        Compression runs block-parallel on `compress_workers` threads
+        (default: one per CPU, `1` for plain single-threaded gzip) at
+        `compresslevel` (0-9).
         """
         if not os.path.exists(source_dir):
             self._logger.error(f"Path `{source_dir}` not found.")
@@ -110,24 +195,52 @@ class ConfigurationVersions(TfcApiBase):
         
         now = datetime.now()
         timestamp = now.strftime("%m%d%Y_%H%M%S")
-        tf_tarfile_out = 'tf_{}.tar.gz'.format(timestamp)
+        tf_tarfile_out = TARBALL_NAME.replace('*', timestamp)
         
         try:
-            with tarfile.open(dest_dir + tf_tarfile_out, 'w:gz') as tar:
-                tar.add(source_dir, arcname=os.path.sep)
-            return(dest_dir + tf_tarfile_out)
+            # Earlier tarballs in `dest_dir` are never bundled, so a
+            # `dest_dir` inside the source tree keeps the content hash.
+            bundle = ConfigurationBundle(
+                source_dir=source_dir, terraformignore=terraformignore,
+                compresslevel=compresslevel, workers=compress_workers,
+                exclude=glob.glob(glob.escape(dest_dir) + TARBALL_NAME))
+            with open(dest_dir + tf_tarfile_out, 'wb') as tar:
+                bundle.write_to(tar)
         except Exception as e:
             self._logger.error(e)
             raise
 
-    def upload(self, cv_upload_url, tf_tarball):
+        self.last_bundle = bundle.summary()
+        self._log_bundle_summary(self.last_bundle)
+        return(dest_dir + tf_tarfile_out)
+
+    def _log_bundle_summary(self, summary):
+        self._logger.info(
+            f"Bundled {summary['files']} files: {summary['size']} bytes"
+            f" ({summary['compressed_size']} compressed);"
+            f" skipped {len(summary['skipped'])} ignored paths.")
+        for path in summary['skipped']:
+            self._logger.debug(f"Skipped `{path}` (.terraformignore).")
+
+    @deadline.with_deadline
+    def upload(self, cv_upload_url, tf_tarball, progress=None,
+               bandwidth=None, retries=3):
         """
         PUT https://archivist.<TFC/E HOSTNAME>/v1/object/<UNIQUE_OBJECT_ID>
+
+        `tf_tarball` may be bytes, a file object or an iterable of chunks.
+        `progress(sent, total)` reports upload progress, `bandwidth`
+        (bytes per second or a shared `BandwidthLimiter`) throttles it,
+        and transient failures are retried up to `retries` times.
         """
         try:
-            resp = requests.put(url=cv_upload_url, data=tf_tarball)
-            resp.raise_for_status()
+            resp = self._requestor.upload(url=cv_upload_url, data=tf_tarball,
+                                          progress=progress,
+                                          bandwidth=bandwidth,
+                                          retries=retries)
             return resp.status_code
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             self._logger.error("Exception occurred uploading Terraform"
                                " configuration bundle to archivist:")
@@ -141,50 +254,138 @@ class ConfigurationVersions(TfcApiBase):
             self._logger.warning(f"Path `{path}` not found.")
             pass
     
+    def wait_for_upload(self, cv_id, waiter=None, timeout=None,
+                        on_change=None):
+        """
+        Polls the Configuration Version (one GET per poll) until its
+        status is 'uploaded'. Raises `ConfigurationVersionUploadError`
+        if it errored. `waiter` overrides the default `Waiter`;
+        `on_change(previous, current)` is called on status changes.
+
+        Returns the final status.
+        """
+        waiter = get_waiter(waiter, timeout=timeout, on_change=on_change,
+                            initial_delay=0.25, max_delay=5)
+        self._logger.debug("Checking for 'uploaded' Config Version status.")
+        cv_status = waiter.wait(
+            poll=lambda: self.get_cv_status(cv_id=cv_id),
+            until=lambda status: status in ('uploaded', 'errored'))
+        if cv_status == 'errored':
+            self._logger.error(f"Configuration Version `{cv_id}` errored.")
+            raise ConfigurationVersionUploadError
+        return cv_status
+
+    def _get_reusable_cv(self, ws_id, digest, speculative):
+        """
+        Helper method that returns the cached Configuration Version ID
+        for this content hash if it still exists and is 'uploaded'.
+        """
+        cv_id = self.cv_cache.get(ws_id, digest, speculative)
+        if cv_id is None:
+            return None
+        try:
+            cv_status = self.get_cv_status(cv_id=cv_id)
+        except Exception as e:
+            self._logger.debug(f"Cached Configuration Version `{cv_id}`"
+                               f" is no longer available: {e}")
+            cv_status = None
+        if cv_status != 'uploaded':
+            self.cv_cache.discard(ws_id, digest, speculative)
+            return None
+        self._logger.info(f"Reusing Configuration Version `{cv_id}`"
+                          f" (content hash {digest[:12]}).")
+        return cv_id
+
     @validate_ws_id_is_set
+    @deadline.with_deadline
     def create_and_upload(self, source_tf_dir, dest_tf_dir='./',
                           auto_queue_runs=True, speculative=False,
-                          cleanup=False, ws_id=None):
+                          cleanup=False, ws_id=None, stream=False,
+                          terraformignore=True, compresslevel=6,
+                          compress_workers=None, reuse=False,
+                          progress=None, bandwidth=None):
         """
         Method that wraps multiple other methods to more easily create
         and upload a Configuration Version in a Workspace in one call.
+
+        With `stream=True` the tar.gz bundle is generated from the
+        directory walk straight into the upload body (chunked transfer
+        encoding, constant memory) and no local tarball is written, so
+        `dest_tf_dir` and `cleanup` are ignored. Either way
+        `terraformignore` applies `.terraformignore` (and Terraform's
+        default excludes); pass `False` to bundle every file. What was
+        bundled and skipped is available in `self.last_bundle`.
+        `compresslevel` and `compress_workers` tune the (parallel) gzip
+        compression of the bundle.
+
+        With `reuse=True` the bundle's content hash is looked up in
+        `self.cv_cache`; if the Workspace already has an uploaded
+        Configuration Version with identical content, its ID is returned
+        without creating or uploading anything. Note that no run is
+        queued in that case, regardless of `auto_queue_runs`.
+
+        Accepts an optional `deadline` (seconds or `Deadline`) that
+        bounds all requests and status polling combined.
         
-        Returns newly created Configuration Version ID.
+        Returns newly created (or reused) Configuration Version ID.
         """
         # 0. Validate Workspace ID is present
         ws_id = ws_id if ws_id else self.ws_id
 
-        # 1. Create Config Version and return its `upload-url`
-        cv = self.create(auto_queue_runs=auto_queue_runs,
-            speculative=speculative, ws_id=ws_id)
-        cv_id=cv.json()['data']['id']
-        cv_upload_url = cv.json()['data']['attributes']['upload-url']
-        self._logger.debug(f"Created Configuration Version `{cv_id}`.")
-        
-        # 2. Create tarball of Terraform files
-        tf_tarball = self._create_tf_tarball(source_dir=source_tf_dir,
-                                             dest_dir=dest_tf_dir)
-        self._logger.debug(f"Created Terraform tarball `{tf_tarball}`.")
-        
-        # 3. Upload Terraform tarball to Config Version
-        with open(tf_tarball, 'rb') as tf_tarball_upload:
-            self.upload(cv_upload_url=cv_upload_url,
-                        tf_tarball=tf_tarball_upload)
-        self._logger.debug(f"Uploaded Terraform tarball `{tf_tarball}`.")
-
-        # 4. Check Config Version status
-        cv_status = self.get_cv_status(cv_id=cv_id)
-        self._logger.debug(f"Checking for 'uploaded' Config Version status.")
-        while cv_status != 'uploaded':
-            if self.get_cv_status(cv_id=cv_id) == 'uploaded':
-                break
+        # 1. Create tarball of Terraform files (or prepare the stream)
+        tf_tarball = None
+        if stream:
+            bundle = ConfigurationBundle(source_dir=source_tf_dir,
+                                         terraformignore=terraformignore,
+                                         compresslevel=compresslevel,
+                                         workers=compress_workers)
+            digest = bundle.content_hash() if reuse else None
+        else:
+            tf_tarball = self._create_tf_tarball(
+                source_dir=source_tf_dir, dest_dir=dest_tf_dir,
+                terraformignore=terraformignore, compresslevel=compresslevel,
+                compress_workers=compress_workers)
+            self._logger.debug(f"Created Terraform tarball `{tf_tarball}`.")
+            digest = self.last_bundle['digest']
+
+        # 2. Reuse an uploaded Config Version with identical content
+        cv_id = None
+        if reuse:
+            cv_id = self._get_reusable_cv(ws_id=ws_id, digest=digest,
+                                          speculative=speculative)
+
+        if cv_id is None:
+            # 3. Create Config Version and return its `upload-url`
+            cv = self.create(auto_queue_runs=auto_queue_runs,
+                speculative=speculative, ws_id=ws_id)
+            cv_id=cv.json()['data']['id']
+            cv_upload_url = cv.json()['data']['attributes']['upload-url']
+            self._logger.debug(f"Created Configuration Version `{cv_id}`.")
+
+            # 4. Upload Terraform tarball to Config Version
+            if stream:
+                self.upload(cv_upload_url=cv_upload_url,
+                            tf_tarball=bundle.iter_gzip(),
+                            progress=progress, bandwidth=bandwidth)
+                self.last_bundle = bundle.summary()
+                self._log_bundle_summary(self.last_bundle)
+                digest = bundle.digest
             else:
-                cv_status = self.get_cv_status(cv_id=cv_id)
-                self._logger.debug(f"Current Config Version status: `{cv_status}`")
-                time.sleep(2)
+                with open(tf_tarball, 'rb') as tf_tarball_upload:
+                    self.upload(cv_upload_url=cv_upload_url,
+                                tf_tarball=tf_tarball_upload,
+                                progress=progress, bandwidth=bandwidth)
+                self._logger.debug(
+                    f"Uploaded Terraform tarball `{tf_tarball}`.")
+
+            # 5. Check Config Version status
+            self.wait_for_upload(cv_id=cv_id)
+            self.cv_cache.set(ws_id, digest, speculative, cv_id)
 
-        # 5. Cleanup
-        if cleanup:
+        # 6. Cleanup
+        if tf_tarball is None:
+            pass
+        elif cleanup:
             self._logger.debug(\
                 f"Deleting local Terraform tarball `{tf_tarball}`.")
             self._cleanup_tf_tarball(path=tf_tarball)
@@ -194,3 +395,94 @@ class ConfigurationVersions(TfcApiBase):
         
         return cv_id
 
+    @contextmanager
+    def build_buffer(self, source_tf_dir, terraformignore=True,
+                     compresslevel=6, compress_workers=None):
+        """
+        Builds the bundle of `source_tf_dir` once into a shared
+        memory-mapped `BundleBuffer` for `upload_buffer()`. A summary of
+        the bundle is logged and kept in `self.last_bundle`; the buffer
+        is released when the `with` block exits.
+        """
+        bundle = ConfigurationBundle(source_dir=source_tf_dir,
+                                     terraformignore=terraformignore,
+                                     compresslevel=compresslevel,
+                                     workers=compress_workers)
+        with bundle.to_buffer() as buffer:
+            self.last_bundle = bundle.summary()
+            self._log_bundle_summary(self.last_bundle)
+            yield buffer
+
+    @deadline.with_deadline
+    def upload_buffer(self, ws_id, buffer, auto_queue_runs=True,
+                      speculative=False, progress=None, bandwidth=None):
+        """
+        Creates a Configuration Version in Workspace `ws_id`, uploads an
+        already built `BundleBuffer` (see `build_buffer()`) to it and
+        waits for it to reach 'uploaded'. The same buffer can be uploaded
+        to many Workspaces concurrently.
+
+        Returns the Configuration Version ID.
+        """
+        cv = self.create(auto_queue_runs=auto_queue_runs,
+                         speculative=speculative, ws_id=ws_id)
+        cv_id = cv.json()['data']['id']
+        cv_upload_url = cv.json()['data']['attributes']['upload-url']
+        self.upload(cv_upload_url=cv_upload_url, tf_tarball=buffer.reader(),
+                    progress=progress, bandwidth=bandwidth)
+        self.wait_for_upload(cv_id=cv_id)
+        self._logger.debug(f"Uploaded Configuration Version `{cv_id}`"
+                           f" to Workspace `{ws_id}`.")
+        return cv_id
+
+    @deadline.with_deadline
+    def create_and_upload_many(self, source_tf_dir, ws_ids,
+                               auto_queue_runs=True, speculative=False,
+                               terraformignore=True, compresslevel=6,
+                               compress_workers=None, max_workers=8,
+                               progress=None, bandwidth=None):
+        """
+        Builds the bundle from `source_tf_dir` once and, for every
+        Workspace ID in `ws_ids`, concurrently creates a Configuration
+        Version, uploads the same bytes (one shared memory-mapped buffer)
+        and waits for it to reach 'uploaded'.
+
+        `progress(ws_id, sent, total)` reports per-Workspace upload
+        progress and `bandwidth` (bytes per second) caps the combined
+        throughput of all uploads. Keep `max_workers` within the
+        client's `pool_size` so every thread keeps its connection.
+
+        Returns a dict of Workspace ID -> Configuration Version ID.
+        Raises `FanOutError` (carrying `results` and `errors` dicts)
+        if any Workspace failed; the others are still completed.
+        """
+        ws_ids = list(dict.fromkeys(ws_ids))
+        limiter = as_limiter(bandwidth)
+        results = {}
+        errors = {}
+        with self.build_buffer(source_tf_dir, terraformignore=terraformignore,
+                               compresslevel=compresslevel,
+                               compress_workers=compress_workers) as buffer, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Each task runs in a copy of the caller's context so the
+            # active deadline applies to the worker threads too.
+            futures = {
+                executor.submit(
+                    contextvars.copy_context().run, self.upload_buffer,
+                    ws_id, buffer, auto_queue_runs, speculative,
+                    functools.partial(progress, ws_id) if progress else None,
+                    limiter): ws_id
+                for ws_id in ws_ids
+            }
+            for future, ws_id in futures.items():
+                try:
+                    results[ws_id] = future.result()
+                except Exception as e:
+                    self._logger.error(f"Workspace `{ws_id}`: {e}")
+                    errors[ws_id] = e
+
+        if errors:
+            raise FanOutError(
+                f"{len(errors)} of {len(ws_ids)} Workspaces failed.",
+                results=results, errors=errors)
+        return results
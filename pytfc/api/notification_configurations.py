@@ -1,4 +1,6 @@
 """TFC/E Notification Configurations API endpoints module."""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from pytfc.tfc_api_base import TfcApiBase
 from pytfc.utils import validate_ws_id_is_set
 
@@ -78,4 +80,41 @@ class NotificationConfigurations(TfcApiBase):
         DELETE /notification-configurations/:notification-configuration-id
         """
         path = f'/notification-configurations/{nc_id}'
-        return self._requestor.delete(path=path)
\ No newline at end of file
+        return self._requestor.delete(path=path)
+
+    def _ensure_webhook(self, ws_id, url, token, name, triggers):
+        existing = self.list(ws_id=ws_id, page_size=100).json()['data']
+        for nc in existing:
+            attributes = nc['attributes']
+            if attributes.get('destination-type') == 'generic' and \
+                    attributes.get('url') == url:
+                self._logger.debug(f"Webhook already registered on"
+                                   f" Workspace `{ws_id}`.")
+                return nc['id']
+        nc = self.create(name=name, destination_type='generic', enabled=True,
+                         token=token, triggers=triggers, url=url, ws_id=ws_id)
+        return nc.json()['data']['id']
+
+    def register_webhook(self, url, token, ws_ids=None, name='pytfc-webhook',
+                         triggers=None, max_workers=8):
+        """
+        Helper method that registers a generic (webhook) Notification
+        Configuration pointing at `url` on each Workspace in `ws_ids`
+        (defaults to the client's Workspace), skipping Workspaces that
+        already notify `url`. `token` is used by TFC/E to sign deliveries
+        (see `pytfc.webhooks.WebhookReceiver`). `triggers` defaults to
+        all Run triggers.
+
+        Returns a dict of Workspace ID -> Notification Configuration ID.
+        """
+        from pytfc.webhooks import RUN_TRIGGERS
+        triggers = triggers if triggers is not None else RUN_TRIGGERS
+        ws_ids = ws_ids if ws_ids else [self.ws_id]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                ws_id: executor.submit(contextvars.copy_context().run,
+                                       self._ensure_webhook, ws_id, url,
+                                       token, name, triggers)
+                for ws_id in ws_ids
+            }
+            return {ws_id: f.result() for ws_id, f in futures.items()}
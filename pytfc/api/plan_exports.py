@@ -1,9 +1,14 @@
 """TFC/E Plan Exports API endpoints module."""
-import requests
+import contextlib
+import os
 import tarfile
-from time import sleep
+from pytfc import deadline
+from pytfc.cache import READ_SIZE, SENTINEL_MOCKS_KEY
+from pytfc.transfer import IterStream
 from pytfc.tfc_api_base import TfcApiBase
-from pytfc.exceptions import MissingPlan, PlanExportDownloadError
+from pytfc.exceptions import DeadlineExceeded, MissingPlan
+from pytfc.exceptions import PlanExportDownloadError
+from pytfc.waiter import PLAN_EXPORT_FINAL_STATUSES, Waiter, get_waiter
 from .plans import Plans
 
 class PlanExports(TfcApiBase):
@@ -38,9 +43,12 @@ class PlanExports(TfcApiBase):
     def get_download_url(self, pe_id):
         """
         GET /plan-exports/:id/download
+
+        Returns the archivist URL the API redirects to, without
+        downloading the bundle itself.
         """
         path = f'/plan-exports/{pe_id}/download'
-        return self._requestor.get(path=path).url
+        return self._requestor.get_redirect(path=path)
     
     def create(self, plan_id):
         """
@@ -72,57 +80,201 @@ class PlanExports(TfcApiBase):
         path = f'/plan-exports/{pe_id}'
         return self._requestor.get(path=path)
 
-    def _extract_tarball(self, filepath, dest_folder):
-        tarball = tarfile.open(filepath, 'r:gz')
-        tarball.extractall(dest_folder)
-        tarball.close()
-    
-    def download(self, pe_id=None, plan_id=None, dest_folder='./',
-                 tarball_prefix=None, extract=True):
+    def wait(self, pe_id, waiter=None, timeout=None, on_change=None):
         """
-        Utility method to download and optionally extract a Sentinel
-        Mock (Plan Export) tarball based on either Plan Export ID
-        (`pe_id`) or Plan ID (`plan_id`). If a Plan Export does not
-        already exist on the Plan ID specified, one will be created.
+        Polls the Plan Export (one GET per poll) until it reaches a
+        final status. Raises `PlanExportDownloadError` unless it finished.
+        `on_change(previous, current)` is called on status changes.
 
-        Returns path of tarball downloaded as a string.
+        Returns the final status.
+        """
+        waiter = get_waiter(waiter, timeout=timeout, on_change=on_change,
+                            initial_delay=0.5, max_delay=5)
+        status = waiter.wait(
+            poll=lambda: self.show(pe_id=pe_id).json()
+                ['data']['attributes']['status'],
+            until=lambda status: status in PLAN_EXPORT_FINAL_STATUSES)
+        if status != 'finished':
+            self._logger.error(f"Plan Export `{pe_id}` is `{status}`.")
+            raise PlanExportDownloadError
+        return status
+
+    def _resolve_pe_id(self, pe_id=None, plan_id=None):
+        """
+        Returns `pe_id`, or the Plan Export of `plan_id` (created if
+        the Plan does not have one yet).
         """
         if pe_id is not None:
-            pe_id = pe_id
-        elif plan_id is not None:
-            plan_id = plan_id
-            pe_id = self.get_plan_export_id(plan_id=plan_id)
-        else:
+            return pe_id
+        if plan_id is None:
             self._logger.error(\
                 "Either `pe_id` or `plan_id` is required.")
             raise MissingPlan
 
+        pe_id = self.get_plan_export_id(plan_id=plan_id)
         if pe_id is None:
-            self._logger.info(f"Creating new Plan Export.")
+            self._logger.info("Creating new Plan Export.")
             new_pe = self.create(plan_id=plan_id)
             pe_id = new_pe.json()['data']['id']
             self._logger.info(f"Created Plan Export `{pe_id}`.")
-        else:
-            pe_id = pe_id
-        
+        return pe_id
+
+    def _open_bundle(self, pe_id, max_wait=60):
+        """
+        Waits for the Plan Export and returns an iterator over the
+        chunks of its tar.gz bundle, streamed (and resumed on
+        interruption) rather than buffered. Retries (with backoff) up
+        to `max_wait` seconds while the archive is still empty.
+        """
+        self.wait(pe_id=pe_id)
         pe_dl_url = self.get_download_url(pe_id=pe_id)
-        pe_bytes_data = requests.get(url=pe_dl_url, stream=True).content
-        retry_count = 0
-        while len(pe_bytes_data) == 0:
-            self._logger.debug("Detected Plan Export download from"
-                               f" `{pe_id}` was empty. Retrying...")
-            sleep(1)
-            pe_bytes_data = requests.get(url=pe_dl_url, stream=True).content
-            retry_count += 1
-            if retry_count == 60:
-                self._logger.error(f"Exceeded max download retries on `{pe_id}`.")
-                raise PlanExportDownloadError
-        self._logger.debug(f"Downloaded Plan Export `{pe_id}`.")
-
-        if tarball_prefix is not None:
-            filename = tarball_prefix + '-sentinel-mocks.tar.gz'
+
+        def first_chunk():
+            chunks = self._requestor.iter_download(url=pe_dl_url)
+            return next(chunks, b''), chunks
+
+        waiter = Waiter(initial_delay=0.5, max_delay=5, timeout=max_wait)
+        try:
+            first, chunks = waiter.wait(poll=first_chunk,
+                                        until=lambda result: result[0],
+                                        key=lambda result: len(result[0]))
+        except DeadlineExceeded:
+            outer = deadline.current()
+            if outer is not None and outer.expired():
+                raise
+            self._logger.error(f"Plan Export `{pe_id}` download was still"
+                               f" empty after {max_wait}s.")
+            raise PlanExportDownloadError
+
+        def bundle():
+            yield first
+            yield from chunks
+        return bundle()
+
+    def _bundle(self, pe_id=None, plan_id=None):
+        """
+        Chunks of the Sentinel Mock bundle of `pe_id` or `plan_id`.
+        With a client cache the bundle is stored under the Plan ID (or
+        the Plan Export ID if only that is known) once fully read, and
+        later reads need no API requests at all.
+        """
+        key = SENTINEL_MOCKS_KEY.format(id=plan_id if plan_id else pe_id) \
+            if self._cache is not None and (plan_id or pe_id) else None
+        if key is not None:
+            with self._cache.open(key) as cached:
+                if cached is not None:
+                    self._logger.debug(f"Sentinel mocks of"
+                                       f" `{plan_id or pe_id}` read from"
+                                       " cache.")
+                    yield from iter(lambda: cached.read(READ_SIZE), b'')
+                    return
+
+        pe_id = self._resolve_pe_id(pe_id=pe_id, plan_id=plan_id)
+        with self._cache.writer(key) if key is not None \
+                else contextlib.nullcontext() as cache_file:
+            for chunk in self._open_bundle(pe_id):
+                if cache_file is not None:
+                    cache_file.write(chunk)
+                yield chunk
+
+    @staticmethod
+    def _selected(name, members):
+        if members is None:
+            return True
+        if callable(members):
+            return members(name)
+        return name in members
+
+    def _iter_tar(self, chunks, members=None):
+        """
+        Yields `(TarInfo, tarfile)` for each selected regular file of a
+        streamed tar.gz, reading it sequentially (`r|gz`).
+        """
+        chunks = iter(chunks)
+        with tarfile.open(fileobj=IterStream(chunks), mode='r|gz') as tar:
+            for member in tar:
+                if member.isfile() and self._selected(member.name, members):
+                    yield member, tar
+        # Read the rest of the stream (gzip trailer) so it completes.
+        for _ in chunks:
+            pass
+
+    def _extract_member(self, tar, member, dest_folder):
+        if hasattr(tarfile, 'data_filter'):
+            tar.extract(member, dest_folder, filter='data')
         else:
-            filename = pe_id + '-sentinel-mocks.tar.gz'
+            tar.extract(member, dest_folder)
+        return os.path.join(dest_folder, member.name)
+
+    @deadline.with_deadline
+    def iter_mocks(self, pe_id=None, plan_id=None, members=None):
+        """
+        Streams a Sentinel Mock bundle and yields `(name, bytes)` for
+        each file in it, without writing anything to disk. `members` is
+        a list of file names (e.g. `['mock-tfplan-v2.sentinel']`) or a
+        predicate on the name. Only one file is held in memory at a time.
+        Accepts an optional `deadline` (seconds or `Deadline`).
+        """
+        for member, tar in self._iter_tar(
+                self._bundle(pe_id=pe_id, plan_id=plan_id), members=members):
+            yield member.name, tar.extractfile(member).read()
+
+    def read_mocks(self, pe_id=None, plan_id=None, members=None):
+        """
+        Returns the files of a Sentinel Mock bundle as a dict of
+        name -> bytes (see `iter_mocks`).
+        """
+        return dict(self.iter_mocks(pe_id=pe_id, plan_id=plan_id,
+                                    members=members))
+
+    @deadline.with_deadline
+    def extract(self, pe_id=None, plan_id=None, dest_folder='./',
+                members=None):
+        """
+        Streams a Sentinel Mock bundle straight into `dest_folder`,
+        optionally only the `members` selected (list of names or a
+        predicate), without storing the tarball.
+
+        Returns the list of extracted file paths.
+        """
+        extracted = [self._extract_member(tar, member, dest_folder)
+                     for member, tar in self._iter_tar(
+                         self._bundle(pe_id=pe_id, plan_id=plan_id),
+                         members=members)]
+        self._logger.debug(f"Extracted {len(extracted)} Sentinel mock"
+                           f" files into `{dest_folder}`.")
+        return extracted
+
+    @deadline.with_deadline
+    def download(self, pe_id=None, plan_id=None, dest_folder='./',
+                 tarball_prefix=None, extract=True, members=None):
+        """
+        Utility method to download and optionally extract a Sentinel
+        Mock (Plan Export) tarball based on either Plan Export ID
+        (`pe_id`) or Plan ID (`plan_id`). If a Plan Export does not
+        already exist on the Plan ID specified, one will be created.
+
+        The bundle is streamed: it is written to disk and, with
+        `extract=True`, extracted (optionally only the `members`
+        selected) in the same pass, without re-reading the tarball.
+
+        Without `tarball_prefix` the tarball is named after the Plan
+        Export ID or, with a client cache, after the ID the bundle is
+        cached under (`plan_id` if given), so that a cached bundle is
+        written without any API request.
+
+        Accepts an optional `deadline` (seconds or `Deadline`) that
+        bounds all requests and download retries combined.
+
+        Returns path of tarball downloaded as a string.
+        """
+        if tarball_prefix is None:
+            if self._cache is not None and (plan_id or pe_id):
+                tarball_prefix = plan_id if plan_id else pe_id
+            else:
+                pe_id = self._resolve_pe_id(pe_id=pe_id, plan_id=plan_id)
+                tarball_prefix = pe_id
+        filename = tarball_prefix + '-sentinel-mocks.tar.gz'
 
         if dest_folder == './':
             dest_path = dest_folder + filename
@@ -130,14 +282,22 @@ class PlanExports(TfcApiBase):
             dest_path = dest_folder + '/' + filename
 
         with open(dest_path, 'wb') as file:
-            file.write(pe_bytes_data)
-        self._logger.debug(f"Created archive `{dest_path}`.")
-
-        if extract:
-            self._logger.debug(f"Extracting tarball from `{dest_path}`.")
-            self._extract_tarball(filepath=dest_path, dest_folder=dest_folder)
-            self._logger.debug(f"Extracted archive `{dest_path}`.")
+            def tee(chunks):
+                for chunk in chunks:
+                    file.write(chunk)
+                    yield chunk
 
+            chunks = tee(self._bundle(pe_id=pe_id, plan_id=plan_id))
+            if extract:
+                self._logger.debug(f"Extracting Sentinel mocks of"
+                                   f" `{pe_id or plan_id}` into"
+                                   f" `{dest_folder}`.")
+                for member, tar in self._iter_tar(chunks, members=members):
+                    self._extract_member(tar, member, dest_folder)
+            # Drain whatever the extractor did not need to read.
+            for _ in chunks:
+                pass
+        self._logger.debug(f"Created archive `{dest_path}`.")
         return dest_path
     
     def delete(self, pe_id):
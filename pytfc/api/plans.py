@@ -1,6 +1,12 @@
 """TFC/E Plans API endpoints module."""
+import contextlib
+import json
+from pytfc import plan_json
+from pytfc.cache import PLAN_JSON_KEY
+from pytfc.requestor import DEFAULT_UPLOAD_RETRIES
 from pytfc.tfc_api_base import TfcApiBase
-from pytfc.exceptions import MissingRun
+from pytfc.exceptions import MissingRun, PlanJsonUnavailable
+from pytfc.transfer import TRANSFER_CHUNK_SIZE
 from .runs import Runs
 
 
@@ -39,6 +45,91 @@ class Plans(TfcApiBase):
     def get_json_output(self, plan_id):
         """
         GET /plans/:id/json-output
+
+        The JSON output of a finished Plan never changes, so it is
+        served from the client's cache (if any) after the first read.
+        """
+        key = PLAN_JSON_KEY.format(plan_id=plan_id)
+        if self._cache is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._logger.debug(f"Plan `{plan_id}` JSON read from cache.")
+                return json.loads(cached)
+
+        path = f'/plans/{plan_id}/json-output'
+        r = self._requestor.get(path=path)
+        if r.status_code != 200 or not r.content:
+            raise PlanJsonUnavailable(f"Plan `{plan_id}` has no JSON output"
+                                      " yet.")
+        if self._cache is not None:
+            self._cache.put(key, r.content)
+        return r.json()
+
+    def iter_json_output(self, plan_id, chunk_size=TRANSFER_CHUNK_SIZE,
+                         retries=DEFAULT_UPLOAD_RETRIES):
+        """
+        Streams the JSON output of a Plan in chunks of `chunk_size`
+        bytes without decoding or holding it in memory. Interrupted
+        downloads resume with HTTP `Range` requests.
+
+        With a client cache the document is stored (under the same key
+        as `get_json_output`) once it has been read to the end. Raises
+        `PlanJsonUnavailable` if the Plan has no JSON output yet.
         """
+        key = PLAN_JSON_KEY.format(plan_id=plan_id)
+        if self._cache is not None:
+            with self._cache.open(key) as cached:
+                if cached is not None:
+                    self._logger.debug(f"Plan `{plan_id}` JSON read from"
+                                       " cache.")
+                    yield from iter(lambda: cached.read(chunk_size), b'')
+                    return
+
         path = f'/plans/{plan_id}/json-output'
-        return self._requestor.get(path=path).json()
\ No newline at end of file
+        self._logger.debug(f"Streaming Plan `{plan_id}` JSON.")
+        received = 0
+        with self._cache.writer(key) if self._cache is not None \
+                else contextlib.nullcontext() as cache_file:
+            for chunk in self._requestor.iter_get(
+                    path=path, chunk_size=chunk_size, retries=retries):
+                if cache_file is not None:
+                    cache_file.write(chunk)
+                received += len(chunk)
+                yield chunk
+            # An unfinished Plan answers 204 with no body; raising here
+            # also discards the (empty) cache entry.
+            if not received:
+                raise PlanJsonUnavailable(f"Plan `{plan_id}` has no JSON"
+                                          " output yet.")
+
+    def _finish(self, chunks):
+        if self._cache is not None:
+            # Read the rest of the document so that it gets cached.
+            for _ in chunks:
+                pass
+
+    def iter_resource_changes(self, plan_id, types=None, actions=None,
+                              values=True):
+        """
+        Yields the `resource_changes` of a Plan's JSON output one at a
+        time as it streams, optionally only those of the given resource
+        `types` and/or `actions` (`create`, `update`, `replace`,
+        `delete`, `read`, `no-op`). With `values=False` the
+        `before`/`after` values of each change are skipped.
+        """
+        chunks = self.iter_json_output(plan_id)
+        yield from plan_json.iter_resource_changes(
+            chunks, types=types, actions=actions, values=values)
+        self._finish(chunks)
+
+    def summarize(self, plan_id, types=None):
+        """
+        Summarizes a Plan's resource changes while its JSON output
+        streams: counts by action and resource type, and the replaced
+        and destroyed addresses. Returns a `pytfc.plan_json.PlanSummary`.
+        """
+        chunks = self.iter_json_output(plan_id)
+        summary = plan_json.summarize(chunks, types=types)
+        self._finish(chunks)
+        self._logger.debug(f"Plan `{plan_id}`: {summary!r}.")
+        return summary
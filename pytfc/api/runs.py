@@ -1,7 +1,9 @@
 """TFC/E Runs API endpoints module."""
+from pytfc.cache import PLAN_JSON_KEY, RUN_PLAN_KEY, cached_response
 from pytfc.tfc_api_base import TfcApiBase
 from .configuration_versions import ConfigurationVersions
 from pytfc.utils import validate_ws_id_is_set
+from pytfc.waiter import RUN_FINAL_STATUSES, RUN_WAITING_STATUSES, get_waiter
 
 
 class Runs(TfcApiBase):
@@ -116,6 +118,31 @@ class Runs(TfcApiBase):
         path = f'/runs/{run_id}'
         return self._requestor.get(path=path, include=include)
 
+    def wait(self, run_id, statuses=None, waiter=None, timeout=None,
+             on_change=None):
+        """
+        Polls the Run (one GET per poll) until its status is one of
+        `statuses`. By default waits until the Run is final or is
+        waiting for confirmation (`actions.is-confirmable`).
+        `on_change(previous, current)` is called on status changes.
+
+        Returns the final Run object (dict).
+        """
+        def done(run):
+            attributes = run['data']['attributes']
+            if statuses is not None:
+                return attributes['status'] in statuses
+            return attributes['status'] in RUN_FINAL_STATUSES or \
+                (attributes['status'] in RUN_WAITING_STATUSES and
+                 attributes.get('actions', {}).get('is-confirmable', False))
+
+        waiter = get_waiter(waiter, timeout=timeout, on_change=on_change,
+                            initial_delay=1, max_delay=15)
+        return waiter.wait(
+            poll=lambda: self.show(run_id=run_id).json(),
+            until=done,
+            key=lambda run: run['data']['attributes']['status'])
+
     def discard(self, run_id, comment='Discarded by pytfc'):
         """
         POST /runs/:run_id/actions/discard
@@ -161,9 +188,34 @@ class Runs(TfcApiBase):
     def get_plan_json_output(self, run_id):
         """
         GET /runs/:id/plan/json-output
+
+        With a client cache, the JSON is stored under the Run's Plan ID
+        (shared with `Plans.get_json_output`) and later reads return a
+        response built from the cached copy.
         """
         path = f'/runs/{run_id}/plan/json-output'
-        return self._requestor.get(path=path)
+        if self._cache is None:
+            return self._requestor.get(path=path)
+
+        run_key = RUN_PLAN_KEY.format(run_id=run_id)
+        plan_id = self._cache.get(run_key)
+        if plan_id is None:
+            plan_id = self.show(run_id=run_id).json()\
+                ['data']['relationships']['plan']['data']['id']
+            self._cache.put(run_key, plan_id.encode('utf-8'))
+        else:
+            plan_id = plan_id.decode('utf-8')
+
+        key = PLAN_JSON_KEY.format(plan_id=plan_id)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._logger.debug(f"Plan `{plan_id}` JSON read from cache.")
+            return cached_response(self._requestor.url_for(path), cached)
+
+        r = self._requestor.get(path=path)
+        if r.status_code == 200 and r.content:
+            self._cache.put(key, r.content)
+        return r
     
     @validate_ws_id_is_set
     def get_run_id_by_message(self, message, ws_id=None):
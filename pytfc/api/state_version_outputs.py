@@ -1,5 +1,13 @@
 """TFC/E State Version Outputs API endpoints module."""
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pytfc import deadline
+from pytfc.cache import OUTPUTS_KEY
+from pytfc.exceptions import FanOutError
+from pytfc.requestor import MAX_PAGE_SIZE
 from pytfc.tfc_api_base import TfcApiBase
+from pytfc.transfer import DEFAULT_RATE_LIMIT, RateLimiter, retry_call
 
 
 class StateVersionOutputs(TfcApiBase):
@@ -40,4 +48,103 @@ class StateVersionOutputs(TfcApiBase):
         GET /workspaces/:workspace_id/current-state-version-outputs
         """
         path = f'/workspaces/{ws_id}/current-state-version-outputs'
-        return self._requestor.get(path=path)
\ No newline at end of file
+        return self._requestor.get(path=path)
+
+    def _paged(self, path, limiter, retries, search=None):
+        """
+        Yields the items of every page of a list endpoint, each page
+        fetched under the rate limiter with 429/5xx retries.
+        """
+        page = 1
+        while page:
+            resp = retry_call(
+                lambda: self._requestor.get(path=path, page_number=page,
+                                            page_size=MAX_PAGE_SIZE,
+                                            search=search).json(),
+                retries=retries, limiter=limiter, logger=self._logger)
+            yield from resp['data']
+            page = resp.get('meta', {}).get('pagination', {}).get('next-page')
+
+    def _fetch_outputs(self, sv_id, limiter, retries):
+        return {o['attributes']['name']: o['attributes']['value']
+                for o in self._paged(f'/state-versions/{sv_id}/outputs',
+                                     limiter, retries)}
+
+    @deadline.with_deadline
+    def harvest(self, workspaces=None, search=None, max_workers=8,
+                rate_limit=DEFAULT_RATE_LIMIT, retries=5, cache=None):
+        """
+        Collects the current outputs of many Workspaces concurrently.
+
+        Workspaces are listed from the Organization (optionally narrowed
+        with `search`, e.g. `{'tags': 'prod'}`, and/or to the names or
+        IDs in `workspaces`); the listing already names each Workspace's
+        current State Version, so only the outputs of State Versions not
+        found in `cache` (a `pytfc.cache.DiskCache`, defaulting to the
+        client's cache) are fetched. State Versions are immutable, which
+        makes their ID a safe cache key; empty outputs are not cached, as
+        they are also what an unprocessed State Version reports.
+
+        All requests share a limiter of `rate_limit` requests per second
+        (or a `RateLimiter`), and 429/5xx responses are retried up to
+        `retries` times. Sensitive output values are `None`. Accepts an
+        optional `deadline` (seconds or `Deadline`).
+
+        Returns `{ws_name: {output_name: value}}`. Raises `FanOutError`
+        (with `.results` and `.errors` keyed by Workspace name) if any
+        Workspace fails.
+        """
+        cache = cache if cache is not None else self._cache
+        limiter = rate_limit if isinstance(rate_limit, RateLimiter) or \
+            rate_limit is None else RateLimiter(rate_limit)
+        wanted = set(workspaces) if workspaces is not None else None
+
+        results = {}
+        pending = {}
+        for ws in self._paged(f'/organizations/{self.org}/workspaces',
+                              limiter, retries, search=search):
+            name = ws['attributes']['name']
+            if wanted is not None and name not in wanted and \
+                    ws['id'] not in wanted:
+                continue
+            current = ws.get('relationships', {}) \
+                .get('current-state-version', {}).get('data')
+            if not current:
+                results[name] = {}
+                continue
+            cached = cache.get(OUTPUTS_KEY.format(sv_id=current['id'])) \
+                if cache is not None else None
+            if cached is not None:
+                results[name] = json.loads(cached)
+            else:
+                pending[name] = current['id']
+        self._logger.debug(f"Fetching outputs of {len(pending)} Workspaces"
+                           f" ({len(results)} unchanged or without state).")
+
+        errors = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                name: executor.submit(contextvars.copy_context().run,
+                                      self._fetch_outputs, sv_id, limiter,
+                                      retries)
+                for name, sv_id in pending.items()
+            }
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    self._logger.error(f"Failed to fetch outputs of"
+                                       f" Workspace `{name}`: {e}")
+                    errors[name] = e
+                    continue
+                # No outputs may only mean that TFC/E has not processed
+                # the State Version yet, so those are never cached.
+                if cache is not None and results[name]:
+                    cache.put(OUTPUTS_KEY.format(sv_id=pending[name]),
+                              json.dumps(results[name]).encode('utf-8'))
+
+        if errors:
+            raise FanOutError(f"Failed to fetch outputs of {len(errors)}"
+                              f" of {len(results) + len(errors)} Workspaces.",
+                              results=results, errors=errors)
+        return results
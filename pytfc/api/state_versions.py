@@ -1,7 +1,17 @@
 """TFC/E State Versions API endpoints module."""
+import contextlib
+import hashlib
+import os
+from pytfc import deadline
+from pytfc import json_stream
+from pytfc import state_diff
+from pytfc.exceptions import StateVersionDownloadError
+from pytfc.exceptions import StateVersionUploadError
+from pytfc.requestor import DEFAULT_TIMEOUT, DEFAULT_UPLOAD_RETRIES
+from pytfc.transfer import TRANSFER_CHUNK_SIZE
 from pytfc.tfc_api_base import TfcApiBase
 from pytfc.utils import validate_ws_id_is_set, validate_ws_is_set
-from urllib import request
+from pytfc.waiter import get_waiter
 
 
 class StateVersions(TfcApiBase):
@@ -12,6 +22,10 @@ class StateVersions(TfcApiBase):
     def create(self, serial, md5, state, lineage=None, run_id=None, ws_id=None):
         """
         POST /workspaces/:workspace_id/state-versions
+
+        With `state=None` the State Version is created pending and the
+        state must be uploaded to its `hosted-state-upload-url` (see
+        `upload`).
         """
         ws_id = ws_id if ws_id else self.ws_id
 
@@ -21,7 +35,8 @@ class StateVersions(TfcApiBase):
         attributes = {}
         attributes['serial'] = serial
         attributes['md5'] = md5
-        attributes['state'] = state
+        if state is not None:
+            attributes['state'] = state
         attributes['lineage'] = lineage
         attributes['json-state'] = None
         attributes['json-state-outputs'] = None
@@ -90,6 +105,29 @@ class StateVersions(TfcApiBase):
         path = f'/state-versions/{sv_id}'
         return self._requestor.get(path=path, include=include)
     
+    def wait_until_processed(self, sv_id, waiter=None, timeout=None,
+                             on_change=None):
+        """
+        Polls the State Version (one GET per poll) until TFC/E has
+        finished processing it (`resources-processed`), after which its
+        outputs and resources are available. `on_change(previous,
+        current)` is called when `(status, resources-processed)` changes.
+
+        Returns the final State Version object (dict).
+        """
+        def key(sv):
+            attributes = sv['data']['attributes']
+            return (attributes.get('status'),
+                    attributes.get('resources-processed'))
+
+        waiter = get_waiter(waiter, timeout=timeout, on_change=on_change,
+                            initial_delay=0.5, max_delay=10)
+        return waiter.wait(
+            poll=lambda: self.show(sv_id=sv_id).json(),
+            until=lambda sv: sv['data']['attributes']
+                .get('resources-processed') is True,
+            key=key)
+
     def get_download_url(self, sv_id=None):
         """
         Helper method to return
@@ -128,25 +166,297 @@ class StateVersions(TfcApiBase):
         return sv.json()\
             ['data']['attributes']['hosted-json-state-download-url']
     
-    def download(self, url, context=None, headers={}):
+    @deadline.with_deadline
+    def download(self, url, context=None, headers={}, sv_id=None):
         """
         Utility method to download a State Version
         based on the download URL that is specified.
         Returns raw state object in bytes.
+
+        When the client has a cache and the State Version ID is given
+        as `sv_id`, the state is served from (and stored in) the cache;
+        only a body matching the State Version's `size` and `md5` is
+        stored. A custom SSL `context` is only honored by the
+        legacy `urllib` code path. Accepts an optional
+        `deadline` (seconds or `Deadline`).
         """
-        state_dl_req = request.Request(url=url, headers=headers, data=None)
-        state_dl = request.urlopen(state_dl_req, context=context)
-        state_obj = state_dl.read()
-        return state_obj
+        return self._download(url=url, context=context, headers=headers,
+                              sv_id=sv_id)
+
+    def _download(self, url, context=None, headers={}, sv_id=None,
+                  attributes=None):
+        key = self._cache_key(sv_id) if sv_id else None
+        if key is not None and self._cache is not None:
+            state = self._cache.get(key)
+            if state is not None:
+                self._logger.debug(f"State Version `{sv_id}` read from cache.")
+                return state
+
+        if context is not None:
+            from urllib import request
+            active = deadline.current()
+            timeout = active.bound_timeout(DEFAULT_TIMEOUT[1]) if active \
+                else DEFAULT_TIMEOUT[1]
+            state_dl_req = request.Request(url=url, headers=headers, data=None)
+            state_dl = request.urlopen(state_dl_req, context=context,
+                                       timeout=timeout)
+            state = state_dl.read()
+        else:
+            state = self._requestor.download(url=url, headers=headers).content
+
+        if key is not None and self._cache is not None:
+            if attributes is None:
+                attributes = self.show(sv_id=sv_id).json()['data']['attributes']
+            if self._matches(state, attributes):
+                self._cache.put(key, state)
+            else:
+                self._logger.warning(f"Download of State Version `{sv_id}`"
+                                     " does not match its size and MD5;"
+                                     " not caching it.")
+        return state
+
+    @staticmethod
+    def _matches(state, attributes):
+        """
+        Whether `state` (bytes) is the raw state described by a State
+        Version's `size` and `md5`.
+        """
+        size = attributes.get('size')
+        md5 = attributes.get('md5')
+        if size is None or not md5:
+            return False
+        return len(state) == size and hashlib.md5(state).hexdigest() == md5
     
+    @deadline.with_deadline
     def download_current(self, context=None, headers={}):
         """
         Utility method to download the current
         State Version of the Workspace.
         Returns raw state object in bytes.
+
+        Accepts an optional `deadline` (seconds or `Deadline`).
+        """
+        sv = self.get_current().json()['data']
+        url = sv['attributes']['hosted-state-download-url']
+        return self._download(url=url, context=context, headers=headers,
+                              sv_id=sv['id'], attributes=sv['attributes'])
+
+    @staticmethod
+    def _cache_key(sv_id, json_state=False):
+        # State Versions are immutable, so the ID identifies the content.
+        return f"state-version{'-json' if json_state else ''}:{sv_id}"
+
+    def iter_download(self, sv_id=None, json_state=False,
+                      chunk_size=TRANSFER_CHUNK_SIZE,
+                      retries=DEFAULT_UPLOAD_RETRIES, progress=None):
+        """
+        Streams a State Version (current State Version of the Workspace
+        if `sv_id` is not specified) in chunks of `chunk_size` bytes
+        over the pooled session, without holding it in memory.
+
+        Interrupted transfers resume with HTTP `Range` requests. The raw
+        state is checked against the State Version's `size` and `md5`
+        as it streams; `StateVersionDownloadError` is raised after the
+        last chunk on a mismatch. `json_state=True` streams the JSON
+        state instead (not checksummed). `progress(received, total)` is
+        called after every chunk.
+        """
+        sv = self.show(sv_id=sv_id) if sv_id else self.get_current()
+        sv = sv.json()['data']
+        attributes = sv['attributes']
+        url = attributes['hosted-json-state-download-url' if json_state
+                         else 'hosted-state-download-url']
+        expected_size = None if json_state else attributes.get('size')
+        expected_md5 = None if json_state else attributes.get('md5')
+        key = self._cache_key(sv['id'], json_state)
+
+        if self._cache is not None:
+            with self._cache.open(key) as cached:
+                if cached is not None:
+                    self._logger.debug(f"State Version `{sv['id']}` read"
+                                       " from cache.")
+                    received = 0
+                    for chunk in iter(lambda: cached.read(chunk_size), b''):
+                        received += len(chunk)
+                        if progress is not None:
+                            progress(received, expected_size)
+                        yield chunk
+                    return
+
+        self._logger.debug(f"Streaming State Version `{sv['id']}`.")
+        md5 = hashlib.md5()
+        received = 0
+        with self._cache.writer(key) if self._cache is not None \
+                else contextlib.nullcontext() as cache_file:
+            for chunk in self._requestor.iter_download(
+                    url=url, chunk_size=chunk_size, retries=retries):
+                md5.update(chunk)
+                received += len(chunk)
+                if cache_file is not None:
+                    cache_file.write(chunk)
+                if progress is not None:
+                    progress(received, expected_size)
+                yield chunk
+
+            # Raising here also keeps a bad download out of the cache.
+            if expected_size is not None and received != expected_size:
+                raise StateVersionDownloadError(
+                    f"State Version `{sv['id']}` is {received} bytes;"
+                    f" expected {expected_size}.")
+            if expected_md5 and md5.hexdigest() != expected_md5:
+                raise StateVersionDownloadError(
+                    f"State Version `{sv['id']}` failed its MD5 check"
+                    f" ({md5.hexdigest()} != {expected_md5}).")
+
+    @deadline.with_deadline
+    def download_to(self, path, sv_id=None, json_state=False,
+                    chunk_size=TRANSFER_CHUNK_SIZE,
+                    retries=DEFAULT_UPLOAD_RETRIES, progress=None):
+        """
+        Streams a State Version to the file `path` (see `iter_download`).
+        Data is written to `<path>.part` and moved into place once it
+        has been verified, so `path` never holds a partial state.
+
+        Accepts an optional `deadline` (seconds or `Deadline`).
+        Returns `path`.
+        """
+        part = f'{path}.part'
+        try:
+            with open(part, 'wb') as f:
+                for chunk in self.iter_download(
+                        sv_id=sv_id, json_state=json_state,
+                        chunk_size=chunk_size, retries=retries,
+                        progress=progress):
+                    f.write(chunk)
+            os.replace(part, path)
+        except BaseException:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+        return path
+
+    def iter_resources(self, sv_id=None, types=None, addresses=None):
         """
-        url = self.get_download_url()
-        state_dl_req = request.Request(url=url, headers=headers, data=None)
-        state_dl = request.urlopen(state_dl_req, context=context)
-        state_obj = state_dl.read()
-        return state_obj
\ No newline at end of file
+        Streams a State Version (current State Version of the Workspace
+        if `sv_id` is not specified) and yields its resources, optionally
+        only those of the given `types` or `addresses` (see
+        `pytfc.json_stream.iter_resources`). Memory use is bounded by
+        the largest selected resource, not by the size of the state.
+        """
+        return json_stream.iter_resources(
+            self.iter_download(sv_id=sv_id), types=types, addresses=addresses)
+
+    def read_outputs(self, sv_id=None):
+        """
+        Returns the `outputs` block of a State Version's raw state,
+        reading only as much of the download as needed to reach it.
+        """
+        return json_stream.read_outputs(self.iter_download(sv_id=sv_id))
+
+    def extract(self, sv_id=None, outputs=True, resources=True, types=None,
+                addresses=None):
+        """
+        Reads the selected parts of a State Version in one streaming
+        pass (see `pytfc.json_stream.extract`).
+        """
+        return json_stream.extract(
+            self.iter_download(sv_id=sv_id), outputs=outputs,
+            resources=resources, types=types, addresses=addresses)
+
+    def diff(self, old_sv_id, new_sv_id=None, types=None):
+        """
+        Compares two State Versions (`new_sv_id` defaults to the current
+        State Version of the Workspace) by streaming both, and returns a
+        `pytfc.state_diff.StateDiff` of added, removed and changed
+        resource instances and outputs.
+        """
+        return state_diff.diff_states(self.iter_download(sv_id=old_sv_id),
+                                      self.iter_download(sv_id=new_sv_id),
+                                      types=types)
+
+    @validate_ws_is_set
+    def diff_previous(self, types=None, ws=None):
+        """
+        Compares the latest State Version of the Workspace with the one
+        before it. Returns `None` if there is no previous State Version.
+        """
+        ws = ws if ws else self.ws
+        svs = self.list(page_number=1, page_size=2, ws=ws).json()['data']
+        if len(svs) < 2:
+            return None
+        return self.diff(old_sv_id=svs[1]['id'], new_sv_id=svs[0]['id'],
+                         types=types)
+
+    @staticmethod
+    def inspect_state_file(path, chunk_size=TRANSFER_CHUNK_SIZE):
+        """
+        Computes the `md5`, `serial`, `lineage` and size of a state file
+        in a single streaming pass; the document is parsed only until
+        `serial` and `lineage` have been found (`None` if absent).
+
+        Returns a dict with those four keys.
+        """
+        md5 = hashlib.md5()
+        size = 0
+        with open(path, 'rb') as f:
+            def chunks():
+                nonlocal size
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    md5.update(chunk)
+                    size += len(chunk)
+                    yield chunk
+
+            reader = chunks()
+            info = json_stream.read_attributes(reader, ('serial', 'lineage'))
+            # Hash whatever the parser did not need to read.
+            for _ in reader:
+                pass
+        info.setdefault('serial', None)
+        info.setdefault('lineage', None)
+        info['md5'] = md5.hexdigest()
+        info['size'] = size
+        return info
+
+    @validate_ws_id_is_set
+    @deadline.with_deadline
+    def upload(self, path, serial=None, lineage=None, run_id=None,
+               ws_id=None, progress=None, bandwidth=None,
+               retries=DEFAULT_UPLOAD_RETRIES):
+        """
+        Creates a State Version from the state file at `path` and
+        streams the file to its `hosted-state-upload-url`, instead of
+        embedding it base64-encoded in the JSON payload. Memory use is
+        constant regardless of the size of the state.
+
+        `serial` and `lineage` default to the values in the file. The
+        Workspace must be locked, as for `create`. `progress(sent, total)`
+        and `bandwidth` (bytes per second) apply to the upload, which is
+        retried up to `retries` times on transient failures. Accepts an
+        optional `deadline` (seconds or `Deadline`).
+
+        Returns the created State Version object (dict).
+        """
+        ws_id = ws_id if ws_id else self.ws_id
+        info = self.inspect_state_file(path)
+        serial = serial if serial is not None else info['serial']
+        lineage = lineage if lineage is not None else info['lineage']
+        if serial is None:
+            raise StateVersionUploadError(f"State file `{path}` has no"
+                                          " `serial`; pass one explicitly.")
+        self._logger.debug(f"Creating State Version (serial {serial},"
+                           f" {info['size']} bytes) on Workspace `{ws_id}`.")
+
+        sv = self.create(serial=serial, md5=info['md5'], state=None,
+                         lineage=lineage, run_id=run_id,
+                         ws_id=ws_id).json()['data']
+        upload_url = sv['attributes'].get('hosted-state-upload-url')
+        if not upload_url:
+            raise StateVersionUploadError(
+                f"State Version `{sv['id']}` has no upload URL; this TFC/E"
+                " version may not support uploading state separately.")
+
+        with open(path, 'rb') as f:
+            self._requestor.upload(url=upload_url, data=f, progress=progress,
+                                   bandwidth=bandwidth, retries=retries)
+        self._logger.info(f"Uploaded state to State Version `{sv['id']}`.")
+        return sv
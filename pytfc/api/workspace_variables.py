@@ -2,7 +2,6 @@
 from pytfc.tfc_api_base import TfcApiBase
 from pytfc.utils import validate_ws_id_is_set
 import json
-import hcl as pyhcl
 
 
 class WorkspaceVariables(TfcApiBase):
@@ -88,6 +87,9 @@ class WorkspaceVariables(TfcApiBase):
         """
         ws_id = ws_id if ws_id else self.ws_id
         
+        # Imported here so that `import pytfc` does not load pyhcl.
+        import hcl as pyhcl
+
         try:
             with open(var_file, 'r') as fp:
                 tfvars = pyhcl.load(fp)
@@ -0,0 +1,539 @@
+"""
+Configuration bundle builder for Configuration Version uploads.
+
+Walks a Terraform configuration directory, optionally honoring
+`.terraformignore`, and produces the tar.gz bundle the Configuration
+Versions API expects, either as a stream of chunks (constant memory,
+no temporary file) or written to a file object.
+"""
+import hashlib
+import io
+import mmap
+import os
+import re
+import stat
+import struct
+import tarfile
+import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Constants
+CHUNK_SIZE = 64 * 1024
+DEFAULT_COMPRESSLEVEL = 6
+GZIP_BLOCK_SIZE = 1024 * 1024
+GZIP_WINDOW = 32 * 1024
+TERRAFORMIGNORE = '.terraformignore'
+# Same default exclusions Terraform applies (`.terraform/modules` is kept).
+DEFAULT_IGNORE_RULES = [
+    '**/.git/**',
+    '**/.terraform/**',
+    '!**/.terraform/modules/**',
+]
+
+
+def _translate(pattern):
+    """
+    Translates a gitignore-style glob to a regular expression body.
+    """
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            out.append('.*')
+            i += 2
+        elif c == '*':
+            out.append('[^/]*')
+            i += 1
+        elif c == '?':
+            out.append('[^/]')
+            i += 1
+        elif c == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append(f'[{body}]')
+                i = end + 1
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return ''.join(out)
+
+
+def _prefix_match(parts, segments, engaged=False):
+    """
+    Whether a rule split into `segments` could match something below
+    the directory `parts` (split path). A leading `**` alone does not
+    count: a literal segment has to match part of the directory, the
+    same way gitignore cannot re-include files under an excluded parent.
+    """
+    if not segments:
+        return True
+    if not parts:
+        return engaged
+    segment = segments[0]
+    if segment == '**':
+        return (_prefix_match(parts, segments[1:], engaged)
+                or _prefix_match(parts[1:], segments, engaged))
+    if segment.fullmatch(parts[0]):
+        return _prefix_match(parts[1:], segments[1:], True)
+    return False
+
+
+def _deflate_block(data, compresslevel, zdict, last):
+    """
+    Raw-deflates one block, primed with the previous block's tail.
+    Non-final blocks end on a byte boundary (sync flush) so the
+    compressed blocks can simply be concatenated.
+    """
+    if zdict:
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED,
+                                      -zlib.MAX_WBITS, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED,
+                                      -zlib.MAX_WBITS)
+    out = compressor.compress(data)
+    return out + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _iter_blocks(chunks, block_size):
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= block_size:
+            yield bytes(buffer[:block_size])
+            del buffer[:block_size]
+    yield bytes(buffer)
+
+
+def parallel_gzip(chunks, compresslevel=DEFAULT_COMPRESSLEVEL, workers=None,
+                  block_size=GZIP_BLOCK_SIZE, mtime=None):
+    """
+    Compresses an iterable of byte chunks into a standard, single-member
+    gzip stream using `workers` threads (pigz-style block compression).
+
+    Input is split into `block_size` blocks that are deflated
+    concurrently; each block uses the previous 32 KiB as a preset
+    dictionary, so the ratio stays close to single-threaded gzip.
+    Output is yielded in order and at most `2 * workers` blocks are
+    held in memory at once.
+    """
+    workers = workers if workers else (os.cpu_count() or 1)
+    mtime = int(time.time()) if mtime is None else int(mtime)
+    yield struct.pack('<BBBBLBB', 0x1f, 0x8b, 8, 0, mtime, 0, 255)
+
+    crc = 0
+    size = 0
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        blocks = _iter_blocks(chunks, block_size)
+        block = next(blocks)
+        zdict = b''
+        while block is not None:
+            following = next(blocks, None)
+            crc = zlib.crc32(block, crc)
+            size += len(block)
+            pending.append(executor.submit(
+                _deflate_block, block, compresslevel, zdict,
+                following is None))
+            zdict = block[-GZIP_WINDOW:]
+            block = following
+            while len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    yield struct.pack('<LL', crc & 0xffffffff, size & 0xffffffff)
+
+
+class BundleBuffer:
+    """
+    Read-only, memory-mapped copy of a built bundle that many uploads
+    can read concurrently; each `reader()` has its own position over
+    the same pages.
+    """
+    def __init__(self, fileobj):
+        self._file = fileobj
+        self._mmap = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+    def __len__(self):
+        return len(self._view)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reader(self):
+        """
+        Returns an independent file-like object over the buffer.
+        """
+        return _BufferReader(self._view)
+
+    def close(self):
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+class _BufferReader(io.RawIOBase):
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, min(offset, len(self._view)))
+        return self._position
+
+    def readinto(self, b):
+        data = self._view[self._position:self._position + len(b)]
+        size = len(data)
+        b[:size] = data
+        self._position += size
+        return size
+
+
+class IgnoreRule:
+    """
+    Single `.terraformignore` rule.
+    """
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.negated = pattern.startswith('!')
+        if self.negated:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        anchored = pattern.startswith('/') or '/' in pattern
+        prefix = '' if anchored else '(?:.*/)?'
+        pattern = pattern.lstrip('/')
+        body = _translate(pattern)
+        # A rule matching a directory also matches everything below it.
+        self._regex = re.compile(f'^{prefix}{body}(?P<below>/.*)?$')
+        self._segments = [] if anchored else ['**']
+        self._segments += [
+            s if s == '**' else re.compile(_translate(s))
+            for s in pattern.split('/')
+        ]
+
+    def matches(self, path, is_dir):
+        m = self._regex.match(path)
+        if m is None:
+            return False
+        if self.dir_only and m.group('below') is None and not is_dir:
+            return False
+        return True
+
+    def may_match_below(self, dir_path):
+        """
+        Whether this rule could match `dir_path` or any path below it.
+        """
+        return _prefix_match(dir_path.split('/'), self._segments)
+
+
+class TerraformIgnore:
+    """
+    `.terraformignore` rule set with Terraform's default exclusions.
+    The last matching rule wins; `!` rules re-include paths.
+    """
+    def __init__(self, patterns=None, defaults=True):
+        lines = list(DEFAULT_IGNORE_RULES) if defaults else []
+        lines += patterns or []
+        self.rules = []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            self.rules.append(IgnoreRule(line))
+
+    @classmethod
+    def from_dir(cls, source_dir):
+        """
+        Loads `.terraformignore` from the root of `source_dir`, falling
+        back to the default exclusions when the file does not exist.
+        """
+        path = os.path.join(source_dir, TERRAFORMIGNORE)
+        patterns = []
+        if os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as fp:
+                patterns = fp.read().splitlines()
+        return cls(patterns)
+
+    def excluded(self, path, is_dir=False):
+        """
+        Whether the `/`-separated path relative to the root is excluded.
+        """
+        excluded = False
+        for rule in self.rules:
+            if rule.matches(path, is_dir):
+                excluded = not rule.negated
+        return excluded
+
+    def prune(self, path):
+        """
+        Whether a directory can be skipped entirely, i.e. nothing
+        below it could be re-included by a later `!` rule.
+        """
+        if not self.excluded(path + '/', is_dir=True):
+            return False
+        return not any(rule.negated and rule.may_match_below(path)
+                       for rule in self.rules)
+
+
+class ConfigurationBundle:
+    """
+    tar.gz bundle of a Terraform configuration directory.
+
+    Entries are produced lazily while walking the directory, so
+    iterating `iter_gzip()` uses constant memory regardless of the
+    size of the tree or of individual files. `skipped` lists paths
+    excluded by `.terraformignore` once the walk has run.
+
+    `workers` > 1 (or `None` for one per CPU) compresses with
+    `parallel_gzip`; `workers=1` uses a single zlib stream.
+
+    With `deterministic=True` owners and timestamps are zeroed and
+    modes normalized (0755/0644), so identical content always produces
+    an identical archive; `digest` is the SHA-256 of the uncompressed
+    tar stream once it has been fully generated (see `content_hash`).
+
+    `exclude` lists files that are never bundled, e.g. earlier bundles
+    written into the tree.
+    """
+    def __init__(self, source_dir, terraformignore=True,
+                 compresslevel=DEFAULT_COMPRESSLEVEL, workers=None,
+                 deterministic=True, exclude=None):
+        if not os.path.isdir(source_dir):
+            raise FileNotFoundError(f"Path `{source_dir}` not found.")
+        self.source_dir = source_dir
+        if not 0 <= compresslevel <= 9:
+            raise ValueError("`compresslevel` must be between 0 and 9.")
+        self.compresslevel = compresslevel
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.deterministic = deterministic
+        self.digest = None
+        if terraformignore is True:
+            self.ignore = TerraformIgnore.from_dir(source_dir)
+        elif terraformignore:
+            self.ignore = terraformignore
+        else:
+            self.ignore = None
+        self.skipped = []
+        self.file_count = 0
+        self.size = 0
+        self.compressed_size = 0
+        self._exclude = {os.path.abspath(path) for path in exclude or ()}
+
+    def walk(self):
+        """
+        Yields `(arcname, path, stat_result)` for every entry to
+        bundle, in sorted order, skipping ignored paths.
+        """
+        self.skipped = []
+        for root, dirs, files in os.walk(self.source_dir):
+            rel_root = os.path.relpath(root, self.source_dir)
+            rel_root = '' if rel_root == '.' else \
+                rel_root.replace(os.sep, '/') + '/'
+            dirs.sort()
+            kept_dirs = []
+            for name in dirs:
+                arcname = rel_root + name
+                path = os.path.join(root, name)
+                st = os.lstat(path)
+                if stat.S_ISLNK(st.st_mode):
+                    # Symlinked directories are stored as links.
+                    if not self._skip(arcname, False):
+                        yield arcname, path, st
+                    continue
+                if self.ignore is not None and self.ignore.prune(arcname):
+                    self.skipped.append(arcname + '/')
+                    continue
+                kept_dirs.append(name)
+                # Walked but excluded directories (whose contents may be
+                # re-included) are left out of the archive, not reported.
+                if self.ignore is None or \
+                        not self.ignore.excluded(arcname + '/', is_dir=True):
+                    yield arcname, path, st
+            dirs[:] = kept_dirs
+            for name in sorted(files):
+                arcname = rel_root + name
+                path = os.path.join(root, name)
+                if os.path.abspath(path) in self._exclude:
+                    continue
+                if self._skip(arcname, False):
+                    continue
+                yield arcname, path, os.lstat(path)
+
+    def _skip(self, arcname, is_dir):
+        if self.ignore is not None and self.ignore.excluded(arcname, is_dir):
+            self.skipped.append(arcname)
+            return True
+        return False
+
+    def _tarinfo(self, arcname, path, st):
+        info = tarfile.TarInfo(arcname)
+        if self.deterministic:
+            executable = st.st_mode & 0o111 or stat.S_ISDIR(st.st_mode)
+            info.mode = 0o755 if executable else 0o644
+            info.mtime = 0
+        else:
+            info.mode = stat.S_IMODE(st.st_mode)
+            info.mtime = int(st.st_mtime)
+            info.uid = st.st_uid
+            info.gid = st.st_gid
+        if stat.S_ISDIR(st.st_mode):
+            info.type = tarfile.DIRTYPE
+        elif stat.S_ISLNK(st.st_mode):
+            info.type = tarfile.SYMTYPE
+            info.linkname = os.readlink(path)
+        elif stat.S_ISREG(st.st_mode):
+            info.type = tarfile.REGTYPE
+            info.size = st.st_size
+        else:
+            return None
+        return info
+
+    def iter_tar(self, chunk_size=CHUNK_SIZE):
+        """
+        Yields the uncompressed tar stream in chunks.
+        """
+        hasher = hashlib.sha256()
+        for chunk in self._iter_tar(chunk_size):
+            hasher.update(chunk)
+            yield chunk
+        self.digest = hasher.hexdigest()
+
+    def _iter_tar(self, chunk_size):
+        self.file_count = 0
+        self.size = 0
+        offset = 0
+        for arcname, path, st in self.walk():
+            info = self._tarinfo(arcname, path, st)
+            if info is None:
+                continue
+            header = info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+            offset += len(header)
+            yield header
+            if info.type != tarfile.REGTYPE:
+                continue
+            self.file_count += 1
+            remaining = info.size
+            with open(path, 'rb') as fp:
+                while remaining > 0:
+                    data = fp.read(min(chunk_size, remaining))
+                    if not data:
+                        # File shrank while reading; pad to declared size.
+                        data = b'\0' * remaining
+                    remaining -= len(data)
+                    offset += len(data)
+                    yield data
+            padding = -info.size % tarfile.BLOCKSIZE
+            if padding:
+                offset += padding
+                yield b'\0' * padding
+        trailer = tarfile.BLOCKSIZE * 2
+        trailer += -(offset + trailer) % tarfile.RECORDSIZE
+        offset += trailer
+        self.size = offset
+        yield b'\0' * trailer
+
+    def iter_gzip(self, chunk_size=CHUNK_SIZE):
+        """
+        Yields the gzip-compressed tar stream in chunks.
+        """
+        self.compressed_size = 0
+        tar_stream = self.iter_tar(chunk_size=chunk_size)
+        if self.workers > 1:
+            mtime = 0 if self.deterministic else None
+            for out in parallel_gzip(tar_stream, self.compresslevel,
+                                     workers=self.workers, mtime=mtime):
+                self.compressed_size += len(out)
+                yield out
+            return
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, 31)
+        for block in tar_stream:
+            out = compressor.compress(block)
+            if out:
+                self.compressed_size += len(out)
+                yield out
+        out = compressor.flush()
+        self.compressed_size += len(out)
+        yield out
+
+    def content_hash(self, chunk_size=CHUNK_SIZE):
+        """
+        Returns the SHA-256 of the uncompressed tar stream, walking
+        the tree (without compressing) if no full pass has run yet.
+        """
+        if self.digest is None:
+            for _ in self.iter_tar(chunk_size=chunk_size):
+                pass
+        return self.digest
+
+    def to_buffer(self, chunk_size=CHUNK_SIZE):
+        """
+        Builds the bundle once into an anonymous temporary file and
+        returns it as a memory-mapped `BundleBuffer`.
+        """
+        fileobj = tempfile.TemporaryFile()
+        try:
+            self.write_to(fileobj, chunk_size=chunk_size)
+            fileobj.flush()
+            return BundleBuffer(fileobj)
+        except BaseException:
+            fileobj.close()
+            raise
+
+    def write_to(self, fileobj, chunk_size=CHUNK_SIZE):
+        """
+        Writes the tar.gz bundle to a binary file object.
+        Returns the number of compressed bytes written.
+        """
+        # Never bundle the output file itself if it lives in the tree.
+        name = getattr(fileobj, 'name', None)
+        if isinstance(name, str):
+            self._exclude.add(os.path.abspath(name))
+        for chunk in self.iter_gzip(chunk_size=chunk_size):
+            fileobj.write(chunk)
+        return self.compressed_size
+
+    def summary(self):
+        """
+        Returns what the last build bundled and skipped.
+        """
+        return {
+            'digest': self.digest,
+            'files': self.file_count,
+            'size': self.size,
+            'compressed_size': self.compressed_size,
+            'skipped': list(self.skipped),
+        }
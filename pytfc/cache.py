@@ -0,0 +1,237 @@
+"""
+Size-bounded on-disk cache for immutable TFC/E artifacts.
+
+`DiskCache` stores one file per key (e.g. a State Version ID) in a
+directory, optionally gzip-compressed, and evicts the least recently
+used entries once the total size exceeds `max_size`. Entries are
+written to a temporary file and moved into place with `os.replace`, and
+reads only ever see complete files, so several processes can share one
+cache directory without locking. Recency is tracked through the file
+modification time, which is bumped on every hit.
+
+    cache = DiskCache('~/.cache/pytfc', max_size=2 * 1024 ** 3)
+    client = pytfc.Client(org='my-org', cache=cache)
+    client.state_versions.download_current()   # network
+    client.state_versions.download_current()   # local disk
+"""
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pytfc.utils import get_logger, DEFAULT_LOG_LEVEL
+
+# Constants
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024
+DEFAULT_CACHE_DIR = os.path.join('~', '.cache', 'pytfc')
+READ_SIZE = 64 * 1024
+# Temporary files older than this are left over from a writer that
+# crashed or was killed, and are removed by `evict()`.
+TEMP_GRACE_PERIOD = 60 * 60
+_TEMP_PREFIX = '.tmp-'
+# Key formats shared by the endpoint classes that use the cache.
+PLAN_JSON_KEY = 'plan-json:{plan_id}'
+RUN_PLAN_KEY = 'run-plan:{run_id}'
+SENTINEL_MOCKS_KEY = 'sentinel-mocks:{id}'
+OUTPUTS_KEY = 'outputs:{sv_id}'
+
+
+class DiskCache:
+    """
+    LRU cache of bytes values on disk, bounded to `max_size` bytes
+    (as stored, i.e. after compression).
+    """
+    def __init__(self, directory=DEFAULT_CACHE_DIR,
+                 max_size=DEFAULT_CACHE_SIZE, compress=False, compresslevel=6,
+                 log_level=DEFAULT_LOG_LEVEL):
+        self._logger = get_logger(self.__class__.__name__, log_level)
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_size = max_size
+        self.compress = compress
+        self.compresslevel = compresslevel
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + ('.gz' if self.compress
+                                                      else '.bin'))
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _open_entry(self, key):
+        path = self._path(key)
+        try:
+            raw = open(path, 'rb')
+        except FileNotFoundError:
+            return None, None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        if self.compress:
+            return gzip.GzipFile(fileobj=raw, mode='rb'), raw
+        return raw, raw
+
+    @contextmanager
+    def open(self, key):
+        """
+        Context manager yielding a binary file object for the cached
+        value of `key`, or `None` on a miss.
+        """
+        f, raw = self._open_entry(key)
+        self._count(f is not None)
+        try:
+            yield f
+        finally:
+            if f is not None:
+                f.close()
+                raw.close()
+
+    def get(self, key):
+        """
+        Returns the cached value (bytes) of `key`, or `None`.
+        Corrupt entries are discarded and reported as misses.
+        """
+        try:
+            with self.open(key) as f:
+                return f.read() if f is not None else None
+        except (OSError, EOFError, zlib.error) as e:
+            self._logger.warning(f"Discarding corrupt cache entry `{key}`:"
+                                 f" {e}")
+            self.discard(key)
+            return None
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    @contextmanager
+    def writer(self, key):
+        """
+        Context manager yielding a binary file object; whatever is
+        written becomes the value of `key` when the block exits without
+        an exception, and is discarded otherwise.
+        """
+        fd, temp_path = tempfile.mkstemp(prefix=_TEMP_PREFIX,
+                                         dir=self.directory)
+        raw = os.fdopen(fd, 'wb')
+        f = gzip.GzipFile(fileobj=raw, mode='wb', mtime=0,
+                          compresslevel=self.compresslevel) \
+            if self.compress else raw
+        try:
+            yield f
+            f.close()
+            raw.close()
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            f.close()
+            raw.close()
+            os.remove(temp_path)
+            raise
+        self.evict()
+
+    def put(self, key, value):
+        """
+        Stores `value` (bytes or a readable binary file object).
+        """
+        with self.writer(key) as f:
+            if hasattr(value, 'read'):
+                shutil.copyfileobj(value, f, READ_SIZE)
+            else:
+                f.write(value)
+
+    def discard(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _scan(self):
+        """
+        Returns `(entries, temp_files)`, each a list of
+        `(mtime, size, path)`.
+        """
+        entries = []
+        temp_files = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                found = temp_files if entry.name.startswith(_TEMP_PREFIX) \
+                    else entries
+                found.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries, temp_files
+
+    def _entries(self):
+        return self._scan()[0]
+
+    def size(self):
+        """
+        Total stored size of all entries in bytes.
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in
+        `max_size`, and temporary files abandoned by crashed writers
+        (older than `TEMP_GRACE_PERIOD`). Safe to run concurrently from
+        several processes.
+        """
+        entries, temp_files = self._scan()
+        stale = time.time() - TEMP_GRACE_PERIOD
+        for mtime, _, path in temp_files:
+            if mtime < stale:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_size:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_size:
+                return
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def cached_response(url, content, content_type='application/json'):
+    """
+    Builds a `requests.Response` (HTTP 200) around cached `content`,
+    for endpoint methods that return responses.
+    """
+    import requests
+    from requests.structures import CaseInsensitiveDict
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = 'OK'
+    response.url = url
+    response.headers = CaseInsensitiveDict({'Content-Type': content_type,
+                                            'X-Pytfc-Cache': 'hit'})
+    response._content = content
+    response._content_consumed = True
+    return response
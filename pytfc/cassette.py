@@ -0,0 +1,295 @@
+"""
+Record/replay transport for deterministic offline runs.
+
+A `Cassette` records every HTTP interaction made through a pytfc
+client session (API calls as well as archivist uploads/downloads)
+to a compact gzip-compressed JSON-lines file, and replays them later
+through the same `Requestor` code paths without touching the network.
+
+Recording:
+    cassette = Cassette('nightly.cassette')
+    client = pytfc.Client(org='my-org', session=cassette.recording_session())
+    ...
+    cassette.save()
+
+Replaying:
+    cassette = Cassette.load('nightly.cassette')
+    client = pytfc.Client(org='my-org', token='replay',
+                          session=cassette.replay_session(realtime=False))
+"""
+import base64
+import gzip
+import io
+import json
+import re
+import threading
+import time
+from datetime import timedelta
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from pytfc.exceptions import CassetteMismatch
+
+# Constants
+CASSETTE_VERSION = 1
+REDACTED = 'REDACTED'
+JSONAPI_CONTENT_TYPE = 'application/vnd.api+json'
+REDACTED_HEADERS = {'authorization', 'cookie', 'set-cookie'}
+REDACTED_KEYS = {'token', 'access-token', 'access_token', 'hmac-key',
+                 'hmac_key'}
+# Attributes holding pre-signed archivist URLs; their object token grants
+# access without any other credential.
+SIGNED_URL_KEYS = {'upload-url', 'hosted-state-download-url',
+                   'hosted-json-state-download-url',
+                   'hosted-state-upload-url',
+                   'hosted-json-state-upload-url'}
+SIGNED_URL_TOKEN = re.compile(r'(/v1/object/)[^/?#]+(\?[^#]*)?')
+KEPT_RESPONSE_HEADERS = {'content-type', 'location', 'retry-after',
+                         'content-range', 'content-length',
+                         'x-ratelimit-limit', 'x-ratelimit-remaining',
+                         'x-ratelimit-reset'}
+
+
+def _redact_url(url):
+    """
+    Replaces the object token (and query) of a pre-signed archivist
+    URL. Replay matches URLs in this form, so a recorded upload or
+    download still pairs with the request made from a redacted URL.
+    """
+    return SIGNED_URL_TOKEN.sub(r'\g<1>' + REDACTED, url)
+
+
+def _redact_item(key, value):
+    if key in REDACTED_KEYS and value is not None:
+        return REDACTED
+    if key in SIGNED_URL_KEYS and isinstance(value, str):
+        return _redact_url(value)
+    return _redact_json(value)
+
+
+def _redact_json(obj):
+    if isinstance(obj, dict):
+        return {k: _redact_item(k, v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_redact_json(i) for i in obj]
+    return obj
+
+
+def _encode_body(body, content_type=''):
+    """
+    Encodes a body for storage. JSON:API bodies (API metadata) are
+    redacted; any other body (state, plan JSON, bundles) is stored
+    verbatim so that replay returns the recorded bytes.
+    """
+    if body is None or body == b'':
+        return None
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if JSONAPI_CONTENT_TYPE in content_type:
+        try:
+            return {'json': _redact_json(json.loads(body))}
+        except ValueError:
+            pass
+    try:
+        return {'text': body.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'b64': base64.b64encode(body).decode('ascii')}
+
+
+def _decode_body(stored):
+    if stored is None:
+        return b''
+    if 'json' in stored:
+        return json.dumps(stored['json']).encode('utf-8')
+    if 'text' in stored:
+        return stored['text'].encode('utf-8')
+    return base64.b64decode(stored['b64'])
+
+
+def _request_body_bytes(request):
+    body = request.body
+    if body is None or isinstance(body, (bytes, str)):
+        return body
+    # Streamed (file-like or generator) bodies are not stored.
+    return None
+
+
+class _RecordingAdapter(HTTPAdapter):
+    """
+    Transport adapter that performs real requests and
+    appends each interaction to a `Cassette`.
+    """
+    def __init__(self, cassette, **kwargs):
+        super().__init__(**kwargs)
+        self._cassette = cassette
+
+    def send(self, request, **kwargs):
+        started = time.monotonic()
+        response = super().send(request, **kwargs)
+        content = response.content
+        self._cassette._append(request, response, content, started,
+                               time.monotonic() - started)
+        return response
+
+
+class _ReplayAdapter(BaseAdapter):
+    """
+    Transport adapter that answers requests from a `Cassette`.
+    """
+    def __init__(self, cassette, realtime=False, match='sequence'):
+        super().__init__()
+        self._cassette = cassette
+        self._realtime = realtime
+        self._match = match
+        self._position = 0
+        self._used = set()
+        self._lock = threading.Lock()
+
+    def _next(self, method, url):
+        interactions = self._cassette.interactions
+        url = _redact_url(url)
+        with self._lock:
+            if self._match == 'sequence':
+                if self._position >= len(interactions):
+                    raise CassetteMismatch(
+                        f"No recorded interaction left for {method} {url}.")
+                interaction = interactions[self._position]
+                if (interaction['method'],
+                        _redact_url(interaction['url'])) != (method, url):
+                    raise CassetteMismatch(
+                        f"Expected {interaction['method']} "
+                        f"{interaction['url']} but got {method} {url}.")
+                self._position += 1
+                return interaction
+            for index, interaction in enumerate(interactions):
+                if index in self._used:
+                    continue
+                if (interaction['method'],
+                        _redact_url(interaction['url'])) == (method, url):
+                    self._used.add(index)
+                    return interaction
+        raise CassetteMismatch(f"No recorded interaction for {method} {url}.")
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        interaction = self._next(request.method, request.url)
+        if self._realtime:
+            time.sleep(interaction['elapsed'])
+
+        body = _decode_body(interaction['response'])
+        response = requests.Response()
+        response.status_code = interaction['status']
+        response.reason = interaction.get('reason')
+        response.headers = CaseInsensitiveDict(interaction['headers'])
+        response.headers['Content-Length'] = str(len(body))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=interaction['elapsed'])
+        response.raw = io.BytesIO(body)
+        response._content = body
+        response._content_consumed = True
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+class Cassette:
+    """
+    An ordered list of recorded HTTP interactions
+    that can be saved to and loaded from disk.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.interactions = []
+        self._started = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a cassette file written by `save()`.
+        """
+        cassette = cls(path)
+        with gzip.open(path, 'rt', encoding='utf-8') as fp:
+            header = json.loads(fp.readline())
+            if header.get('version') != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version in `{path}`.")
+            for line in fp:
+                cassette.interactions.append(json.loads(line))
+        return cassette
+
+    def save(self, path=None):
+        """
+        Writes the recorded interactions as gzip-compressed JSON lines.
+        """
+        path = path if path else self.path
+        with gzip.open(path, 'wt', encoding='utf-8') as fp:
+            fp.write(json.dumps({'version': CASSETTE_VERSION,
+                                 'interactions': len(self.interactions)}))
+            fp.write('\n')
+            for interaction in self.interactions:
+                fp.write(json.dumps(interaction, separators=(',', ':')))
+                fp.write('\n')
+        return path
+
+    def _append(self, request, response, content, started, elapsed):
+        request_headers = {
+            k: (REDACTED if k.lower() in REDACTED_HEADERS else v)
+            for k, v in request.headers.items()
+            if k.lower() in REDACTED_HEADERS or k.lower() == 'content-type'
+        }
+        response_headers = {
+            k: (_redact_url(v) if k.lower() == 'location' else v)
+            for k, v in response.headers.items()
+            if k.lower() in KEPT_RESPONSE_HEADERS
+        }
+        with self._lock:
+            if self._started is None:
+                self._started = started
+            self.interactions.append({
+                'offset': round(started - self._started, 6),
+                'elapsed': round(elapsed, 6),
+                'method': request.method,
+                'url': _redact_url(request.url),
+                'request_headers': request_headers,
+                'request': _encode_body(
+                    _request_body_bytes(request),
+                    request.headers.get('Content-Type', '')),
+                'status': response.status_code,
+                'reason': response.reason,
+                'headers': response_headers,
+                'response': _encode_body(
+                    content, response.headers.get('Content-Type', '')),
+            })
+
+    def recording_session(self, session=None):
+        """
+        Returns a `requests.Session` that records
+        every interaction into this cassette.
+        """
+        session = session if session is not None else requests.Session()
+        adapter = _RecordingAdapter(self)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def replay_session(self, realtime=False, match='sequence'):
+        """
+        Returns a `requests.Session` that answers from this cassette.
+
+        `realtime=True` sleeps for each interaction's recorded latency,
+        otherwise responses are returned immediately. `match='sequence'`
+        requires requests in the recorded order; `match='request'`
+        pairs requests by method and URL, for concurrent workflows.
+        """
+        if match not in ('sequence', 'request'):
+            raise ValueError("`match` must be 'sequence' or 'request'.")
+        session = requests.Session()
+        adapter = _ReplayAdapter(self, realtime=realtime, match=match)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
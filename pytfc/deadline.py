@@ -0,0 +1,155 @@
+"""
+Deadline propagation for pytfc operations.
+
+A deadline bounds the total time of an operation. While a deadline is
+active (see `deadline_scope`), every request sent by `Requestor` has its
+connect/read timeouts capped to the time remaining and every `sleep`
+is shortened to it, so a helper either finishes or raises
+`DeadlineExceeded` within the bound.
+
+The active deadline is held in a `contextvars.ContextVar`; code that
+hands work to other threads should run it via
+`contextvars.copy_context().run` to carry the deadline along.
+"""
+import contextvars
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from pytfc.exceptions import DeadlineExceeded
+
+_current = contextvars.ContextVar('pytfc_deadline', default=None)
+
+
+class Deadline:
+    """
+    Point in (monotonic) time by which an operation must complete.
+    """
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def __repr__(self):
+        return f'Deadline(remaining={self.remaining():.3f})'
+
+    def remaining(self):
+        """
+        Seconds left before the deadline (never negative).
+        """
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        """
+        Raises `DeadlineExceeded` if the deadline has passed.
+        """
+        if self.expired():
+            raise DeadlineExceeded(
+                f"Operation exceeded its {self.seconds}s deadline.")
+
+    def bound_timeout(self, timeout):
+        """
+        Caps a requests-style `timeout` (None, a number or a
+        `(connect, read)` tuple) to the time remaining. Raises
+        `DeadlineExceeded` rather than returning a zero timeout, which
+        requests would reject.
+        """
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(
+                f"Operation exceeded its {self.seconds}s deadline.")
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(remaining if t is None else min(t, remaining)
+                         for t in timeout)
+        return min(timeout, remaining)
+
+
+def current():
+    """
+    Returns the active `Deadline`, or `None`.
+    """
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """
+    Activates `deadline` (a `Deadline` or a number of seconds) for
+    the enclosed block. Nested scopes never extend an outer deadline.
+    `None` leaves the current deadline unchanged.
+    """
+    if deadline is None:
+        yield current()
+        return
+    if not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    outer = current()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def _iter_with_deadline(generator, deadline):
+    """
+    Drives `generator` with `deadline` active while its body runs,
+    but not while the consumer holds a yielded value.
+    """
+    value = None
+    while True:
+        with deadline_scope(deadline):
+            try:
+                item = generator.send(value)
+            except StopIteration as e:
+                return e.value
+        try:
+            value = yield item
+        except GeneratorExit:
+            with deadline_scope(deadline):
+                generator.close()
+            raise
+
+
+def with_deadline(func):
+    """
+    Decorator that adds a `deadline` keyword argument (a `Deadline`
+    or seconds) to a helper and activates it for the call.
+
+    For generator functions the deadline starts when the generator is
+    created and bounds its whole iteration; it is only active while
+    the generator itself runs.
+    """
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(*args, deadline=None, **kwargs):
+            if deadline is not None and not isinstance(deadline, Deadline):
+                deadline = Deadline(deadline)
+            return _iter_with_deadline(func(*args, **kwargs), deadline)
+        return generator_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, deadline=None, **kwargs):
+        with deadline_scope(deadline):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def sleep(seconds):
+    """
+    Like `time.sleep`, but never sleeps past the active deadline
+    and raises `DeadlineExceeded` once it has passed.
+    """
+    deadline = current()
+    if deadline is None:
+        time.sleep(seconds)
+        return
+    deadline.check()
+    time.sleep(min(seconds, deadline.remaining()))
+    deadline.check()
@@ -41,6 +41,11 @@ class MissingPlan(Exception):
     pass
 
 
+class SpeculativePlanError(Exception):
+    """Speculative plan Run did not finish planning."""
+    pass
+
+
 class ConfigurationVersionUploadError(Exception):
     """Error uploading Terraform tar.gz to Configuration Version."""
     pass
@@ -53,4 +58,37 @@ class InvalidQueryParam(Exception):
 
 class PlanExportDownloadError(Exception):
     """Error downloading Plan Export"""
-    pass
\ No newline at end of file
+    pass
+
+
+class PlanJsonUnavailable(Exception):
+    """Plan JSON output is not available (the Plan has not finished)."""
+    pass
+
+
+class StateVersionDownloadError(Exception):
+    """Downloaded State Version failed its size or checksum check."""
+    pass
+
+
+class StateVersionUploadError(Exception):
+    """Error uploading state to a State Version."""
+    pass
+
+
+class CassetteMismatch(Exception):
+    """Request does not match the recorded cassette interactions."""
+    pass
+
+
+class DeadlineExceeded(Exception):
+    """Operation did not complete before its deadline."""
+    pass
+
+
+class FanOutError(Exception):
+    """One or more Workspaces failed during a fan-out operation."""
+    def __init__(self, message, results=None, errors=None):
+        super().__init__(message)
+        self.results = results if results is not None else {}
+        self.errors = errors if errors is not None else {}
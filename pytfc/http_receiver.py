@@ -0,0 +1,189 @@
+"""
+Embedded HTTP server for HMAC-signed JSON deliveries from TFC/E.
+
+`SignedJsonReceiver` is the base of `pytfc.webhooks.WebhookReceiver`
+and `pytfc.run_task_server.RunTaskServer`. It runs a threaded HTTP
+server on a background thread, validates each POST (path, a present
+and sane `Content-Length`, body size) and passes the raw body and the
+signature header to the subclass's `handle(body, signature)`, which
+returns the HTTP status to answer with. Servers bind to the loopback
+interface unless another `host` is given explicitly.
+"""
+import hashlib
+import hmac
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pytfc.utils import get_logger, DEFAULT_LOG_LEVEL
+
+# Constants
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_BACKLOG = 128
+MAX_BODY_SIZE = 1024 * 1024
+
+
+def sign(body, key):
+    """
+    Returns the hex HMAC-SHA512 signature TFC/E sends for `body`.
+    """
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    return hmac.new(key, body, hashlib.sha512).hexdigest()
+
+
+def verify_signature(body, signature, key):
+    """
+    Constant-time check of a delivery signature.
+    """
+    if not signature:
+        return False
+    return hmac.compare_digest(sign(body, key), signature)
+
+
+class SignedJsonReceiver:
+    """
+    Base class for receivers of signed JSON deliveries. Subclasses set
+    `signature_header` and implement `handle(body, signature)`.
+
+    `key` is the HMAC key deliveries are signed with and is required;
+    unsigned deliveries are only accepted with an explicit
+    `verify=False`. `backlog` is the listen queue size of the socket.
+    """
+    signature_header = None
+    thread_name = 'pytfc-receiver'
+
+    def __init__(self, key=None, verify=True, host=DEFAULT_HOST, port=0,
+                 path='/', backlog=DEFAULT_BACKLOG, max_body_size=MAX_BODY_SIZE,
+                 log_level=DEFAULT_LOG_LEVEL):
+        if verify and not key:
+            raise ValueError("An HMAC key is required to verify signatures;"
+                             " pass `verify=False` to accept unsigned"
+                             " deliveries.")
+        self._logger = get_logger(self.__class__.__name__, log_level)
+        self.verify = verify
+        self.host = host
+        self.port = port
+        self.path = path
+        self.backlog = backlog
+        self.max_body_size = max_body_size
+        self._key = key
+        self._counter_lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    def _count(self, name):
+        # Counters are updated from concurrent handler threads.
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def verify_signature(self, body, signature):
+        """
+        Whether `signature` is valid for `body` (always true with
+        `verify=False`).
+        """
+        if not self.verify:
+            return True
+        return verify_signature(body, signature, self._key)
+
+    def handle(self, body, signature=None):
+        raise NotImplementedError
+
+    # ------------------------------------------------------------------
+    # Embedded HTTP server
+    # ------------------------------------------------------------------
+    @property
+    def url(self):
+        """
+        URL of the embedded server (replace the host with an address
+        reachable from TFC/E when registering it).
+        """
+        host = '127.0.0.1' if self.host in ('0.0.0.0', '') else self.host
+        return f'http://{host}:{self.port}{self.path}'
+
+    def start(self):
+        """
+        Starts the HTTP server on a background thread.
+        """
+        class Handler(_SignedJsonRequestHandler):
+            pass
+        Handler.receiver = self
+
+        # The listen backlog is fixed by `server_activate()`, so the
+        # server is bound and activated only after it has been set.
+        httpd = ThreadingHTTPServer((self.host, self.port), Handler,
+                                    bind_and_activate=False)
+        httpd.daemon_threads = True
+        httpd.request_queue_size = self.backlog
+        try:
+            httpd.server_bind()
+            httpd.server_activate()
+        except BaseException:
+            httpd.server_close()
+            raise
+        self._httpd = httpd
+        self.port = httpd.server_address[1]
+        self._thread = threading.Thread(target=httpd.serve_forever,
+                                        name=self.thread_name, daemon=True)
+        self._thread.start()
+        self._logger.info(f"Listening on {self.url}")
+        return self
+
+    def stop(self):
+        """
+        Stops the HTTP server.
+        """
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _SignedJsonRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    receiver = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _content_length(self):
+        """
+        Validated request body length, or the HTTP status to reject the
+        request with: 411 without a length, 400 for an invalid one and
+        413 above the receiver's `max_body_size`.
+        """
+        value = self.headers.get('Content-Length')
+        if value is None:
+            return None, 411
+        try:
+            length = int(value)
+        except ValueError:
+            return None, 400
+        if length < 0:
+            return None, 400
+        if length > self.receiver.max_body_size:
+            return None, 413
+        return length, None
+
+    def do_POST(self):
+        length, status = self._content_length()
+        if self.path.split('?')[0] != self.receiver.path:
+            status = 404
+        if status is not None:
+            self.close_connection = True
+        else:
+            body = self.rfile.read(length)
+            try:
+                status = self.receiver.handle(
+                    body, self.headers.get(self.receiver.signature_header))
+            except Exception as e:
+                self.receiver._logger.error(f"Failed to handle delivery: {e}")
+                status = 500
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
@@ -0,0 +1,375 @@
+"""
+Incremental reader for Terraform state documents.
+
+Walks a state file as a stream of chunks (bytes) and only decodes the
+parts that were asked for: top-level attributes, `outputs` and the
+resources matching a type or address filter. Resources are decoded one
+at a time and the `instances` of non-matching resources are skipped
+without being decoded, so memory use is bounded by the selected data
+rather than the size of the state. Reading stops as soon as everything
+requested has been found; since `outputs` precede `resources` in state
+files, `read_outputs()` usually only consumes the head of the stream.
+
+    chunks = client.state_versions.iter_download()
+    for resource in iter_resources(chunks, types=['aws_instance']):
+        ...
+"""
+import codecs
+import json
+import re
+
+# Constants
+READ_SIZE = 64 * 1024
+COMPACT_SIZE = 1024 * 1024
+STATE_ATTRIBUTES = ('version', 'terraform_version', 'serial', 'lineage')
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_STRING_TAIL = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_INDEX = re.compile(r'^(?P<resource>.+?)\[(?P<key>[^\[\]]+)\]$')
+
+
+def _iter_chunks(source):
+    if isinstance(source, (bytes, bytearray, memoryview, str)):
+        yield source
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(READ_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        yield from source
+
+
+class Reader:
+    """
+    Buffered JSON token reader over an iterator of chunks, shared by
+    the state and plan (`pytfc.plan_json`) stream parsers. Walk
+    containers with `iter_object()`/`iter_array()` and consume each
+    value with `read_value()` or `skip_value()`. `kind` names the
+    document in parse errors (e.g. "Invalid JSON plan: ...").
+    """
+    def __init__(self, source, kind='state'):
+        self.kind = kind
+        self._chunks = iter(_iter_chunks(source))
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._eof = False
+        self.buf = ''
+        self.pos = 0
+
+    def _more(self):
+        """
+        Reads until the unread part of the buffer has at least doubled,
+        so retrying a decode on a large value stays linear overall.
+        Returns `False` at the end of the stream.
+        """
+        if self._eof:
+            return False
+        target = max(len(self.buf) - self.pos, READ_SIZE)
+        added = 0
+        parts = [self.buf]
+        while added < target:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                parts.append(self._utf8.decode(b'', final=True))
+                break
+            text = chunk if isinstance(chunk, str) \
+                else self._utf8.decode(bytes(chunk))
+            parts.append(text)
+            added += len(text)
+        self.buf = ''.join(parts)
+        return added > 0 or not self._eof
+
+    def _compact(self):
+        if self.pos > COMPACT_SIZE:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+
+    def _error(self, message):
+        return ValueError(f"Invalid JSON {self.kind}: {message}.")
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character ('' at EOF).
+        """
+        self._compact()
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise self._error(f"expected `{char}` at offset {self.pos}")
+        self.pos += 1
+
+    def read_value(self):
+        """
+        Decodes the next value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if not self._more():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk.
+            if end == len(self.buf) and self._more():
+                continue
+            self.pos = end
+            return value
+
+    def read_buffered(self):
+        """
+        Decodes the next container (object or array) if it is complete
+        within the current buffer, without reading further. Returns
+        `None` (and leaves the position unchanged) otherwise.
+        """
+        if self.peek() not in ('{', '['):
+            return None
+        try:
+            value, self.pos = self._decoder.raw_decode(self.buf, self.pos)
+        except ValueError:
+            return None
+        return value
+
+    def skip_value(self):
+        """
+        Moves past the next value without decoding containers that run
+        past the buffer.
+        """
+        if self.peek() not in ('{', '['):
+            self.read_value()
+            return
+        # A value that is already buffered is discarded fastest by the C
+        # decoder; scanning is for values that run past the buffer.
+        if self.read_buffered() is not None:
+            return
+        depth = 0
+        while True:
+            self._compact()
+            match = _STRUCTURAL.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self._more():
+                    raise self._error("unexpected end of stream")
+                continue
+            char = match.group()
+            if char == '"':
+                tail = _STRING_TAIL.match(self.buf, match.end())
+                if tail is None:
+                    self.pos = match.start()
+                    if not self._more():
+                        raise self._error("unterminated string")
+                    continue
+                self.pos = tail.end()
+                continue
+            self.pos = match.end()
+            depth += 1 if char in ('{', '[') else -1
+            if depth == 0:
+                return
+
+    def _separator(self, closing):
+        char = self.peek()
+        if char == ',':
+            self.pos += 1
+            return True
+        if char == closing:
+            self.pos += 1
+            return False
+        raise self._error(f"expected `,` or `{closing}` at offset {self.pos}")
+
+    def iter_object(self):
+        """
+        Yields the keys of the next object. The caller must consume
+        each key's value before advancing.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(':')
+            yield key
+            if not self._separator('}'):
+                return
+
+    def iter_array(self):
+        """
+        Yields once per element of the next array. The caller must
+        consume each element before advancing.
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            if not self._separator(']'):
+                return
+
+
+def resource_address(resource):
+    """
+    Terraform address of a state resource, e.g.
+    `module.vpc.aws_subnet.private` or `data.aws_ami.ubuntu`.
+    """
+    address = f"{resource['type']}.{resource['name']}"
+    if resource.get('mode') == 'data':
+        address = f'data.{address}'
+    if resource.get('module'):
+        address = f"{resource['module']}.{address}"
+    return address
+
+
+class _ResourceFilter:
+    def __init__(self, types=None, addresses=None):
+        self.types = set(types) if types else None
+        # Resource address -> selected instance keys (None for all).
+        self.index_keys = {}
+        for address in addresses or []:
+            match = _INDEX.match(address)
+            if match is None:
+                self.index_keys[address] = None
+                continue
+            address = match.group('resource')
+            keys = self.index_keys.get(address, set())
+            if keys is not None:
+                keys.add(json.loads(match.group('key')))
+                self.index_keys[address] = keys
+        self.addresses = set(self.index_keys) if addresses else None
+
+    def __bool__(self):
+        return self.types is not None or self.addresses is not None
+
+    def matches(self, resource):
+        if self.types is not None and resource.get('type') not in self.types:
+            return False
+        return self.addresses is None or \
+            resource_address(resource) in self.addresses
+
+    def select(self, resource):
+        keys = self.index_keys.get(resource_address(resource)) \
+            if self.addresses is not None else None
+        if keys is not None:
+            resource['instances'] = [i for i in resource.get('instances', [])
+                                     if i.get('index_key') in keys]
+        return resource
+
+
+def _read_resource(reader, selector):
+    resource = {}
+    skipped = False
+    for key in reader.iter_object():
+        if key == 'instances' and selector and \
+                {'type', 'name'} <= resource.keys() and \
+                not selector.matches(resource):
+            reader.skip_value()
+            skipped = True
+        else:
+            resource[key] = reader.read_value()
+    if skipped or (selector and not selector.matches(resource)):
+        return None
+    return selector.select(resource)
+
+
+def walk(source, outputs=False, resources=False, types=None,
+          addresses=None):
+    """
+    Yields `(key, value)` for top-level state attributes, `outputs`
+    (if requested) and one `('resource', resource)` per selected
+    resource (if requested), stopping once nothing else is needed.
+    """
+    reader = Reader(source)
+    selector = _ResourceFilter(types, addresses)
+    for key in reader.iter_object():
+        if key in STATE_ATTRIBUTES:
+            yield key, reader.read_value()
+        elif key == 'outputs' and outputs:
+            yield key, reader.read_value()
+            outputs = False
+        elif key == 'resources' and resources:
+            for _ in reader.iter_array():
+                resource = _read_resource(reader, selector)
+                if resource is not None:
+                    yield 'resource', resource
+            resources = False
+        else:
+            reader.skip_value()
+        if not outputs and not resources:
+            return
+
+
+def read_attributes(source, keys=STATE_ATTRIBUTES):
+    """
+    Returns the top-level attributes named in `keys` (as a dict, absent
+    ones omitted), skipping every other value and reading only until
+    all of them have been found, whatever their order in the document.
+    """
+    keys = set(keys)
+    result = {}
+    reader = Reader(source)
+    for key in reader.iter_object():
+        if key in keys:
+            result[key] = reader.read_value()
+            if len(result) == len(keys):
+                break
+        else:
+            reader.skip_value()
+    return result
+
+
+def iter_resources(source, types=None, addresses=None):
+    """
+    Yields the resources (dicts, as in the state file) of a state
+    stream, optionally only those of the given `types` or
+    `addresses`. Addresses may include an instance key, e.g.
+    `aws_instance.web[0]` or `module.app.aws_s3_bucket.b["logs"]`,
+    in which case only that instance is kept.
+
+    `source` is bytes, a file object or an iterable of chunks.
+    """
+    for key, value in walk(source, resources=True, types=types,
+                            addresses=addresses):
+        if key == 'resource':
+            yield value
+
+
+def read_outputs(source):
+    """
+    Returns the `outputs` of a state stream without reading past them.
+    """
+    for key, value in walk(source, outputs=True):
+        if key == 'outputs':
+            return value
+    return {}
+
+
+def extract(source, outputs=True, resources=True, types=None,
+            addresses=None):
+    """
+    Reads the selected parts of a state stream in one pass. Returns a
+    dict with the top-level attributes (`serial`, `lineage`, ...) seen
+    before reading stopped, plus `outputs` and `resources` (a list of
+    selected resources) as requested.
+    """
+    result = {}
+    if outputs:
+        result['outputs'] = {}
+    if resources:
+        result['resources'] = []
+    for key, value in walk(source, outputs=outputs, resources=resources,
+                            types=types, addresses=addresses):
+        if key == 'resource':
+            result['resources'].append(value)
+        else:
+            result[key] = value
+    return result
@@ -0,0 +1,172 @@
+"""
+Streaming analysis of Terraform plan JSON (`terraform show -json`).
+
+A plan's `resource_changes` are read from a stream of chunks one entry
+at a time (see `pytfc.json_stream`); everything before them
+(`planned_values`, `resource_drift`, ...) is skipped without being
+decoded and reading stops once they have been consumed. `PlanSummary`
+folds the entries into counts as they arrive, so summarizing a plan
+touching tens of thousands of resources only keeps the summary itself
+in memory.
+
+    summary = summarize(client.plans.iter_json_output(plan_id))
+    summary.actions    # {'create': 3, 'update': 1, 'replace': 1, ...}
+    summary.replaced   # ['aws_instance.web[0]']
+"""
+from pytfc.json_stream import Reader
+
+# Constants
+# Values of a change (`change.before`, `change.after`, ...); these hold
+# whole resource objects and are skipped when `values=False`.
+CHANGE_VALUES = ('before', 'after', 'after_unknown', 'before_sensitive',
+                 'after_sensitive', 'generated_config')
+NO_CHANGE_ACTIONS = ('no-op', 'read')
+
+
+def change_action(resource_change):
+    """
+    Single action name of a resource change: `create`, `update`,
+    `delete`, `read`, `no-op` or `replace` (for `["delete", "create"]`
+    and `["create", "delete"]`).
+    """
+    actions = resource_change.get('change', {}).get('actions') or ['no-op']
+    return 'replace' if len(actions) > 1 else actions[0]
+
+
+def _read_change_body(reader):
+    change = {}
+    for key in reader.iter_object():
+        if key in CHANGE_VALUES:
+            reader.skip_value()
+        else:
+            change[key] = reader.read_value()
+    return change
+
+
+def _select(resource_change, types, values):
+    if types is not None and resource_change.get('type') not in types:
+        return None
+    if not values and 'change' in resource_change:
+        resource_change['change'] = {
+            key: value for key, value in resource_change['change'].items()
+            if key not in CHANGE_VALUES}
+    return resource_change
+
+
+def _read_resource_change(reader, types, values):
+    # Entries that are already buffered are decoded in one go; larger
+    # ones key by key, skipping what was not asked for.
+    resource_change = reader.read_buffered()
+    if resource_change is not None:
+        return _select(resource_change, types, values)
+    resource_change = {}
+    skipped = False
+    for key in reader.iter_object():
+        if key == 'change' and types is not None and \
+                'type' in resource_change and \
+                resource_change['type'] not in types:
+            reader.skip_value()
+            skipped = True
+        elif key == 'change' and not values:
+            resource_change[key] = _read_change_body(reader)
+        else:
+            resource_change[key] = reader.read_value()
+    if skipped or (types is not None and
+                   resource_change.get('type') not in types):
+        return None
+    return resource_change
+
+
+def iter_resource_changes(source, types=None, actions=None, values=True):
+    """
+    Yields the entries of a plan's `resource_changes` one at a time,
+    optionally only those of the given resource `types` and/or
+    `actions` (names as returned by `change_action`). With
+    `values=False` the `before`/`after` values of each change are
+    skipped rather than decoded, leaving `actions` and the other
+    small fields.
+
+    `source` is bytes, a file object or an iterable of chunks.
+    """
+    types = set(types) if types else None
+    actions = set(actions) if actions else None
+    reader = Reader(source, kind='plan')
+    for key in reader.iter_object():
+        if key != 'resource_changes':
+            reader.skip_value()
+            continue
+        for _ in reader.iter_array():
+            resource_change = _read_resource_change(reader, types, values)
+            if resource_change is None:
+                continue
+            if actions is None or change_action(resource_change) in actions:
+                yield resource_change
+        return
+
+
+class PlanSummary:
+    """
+    Incremental summary of a plan's resource changes: counts by action
+    (`actions`) and by resource type and action (`types`), plus the
+    addresses of replaced and destroyed resources. Feed it resource
+    changes with `add()`; `summarize()` returns the addresses sorted.
+    """
+    def __init__(self):
+        self.total = 0
+        self.actions = {}
+        self.types = {}
+        self.replaced = []
+        self.destroyed = []
+
+    def add(self, resource_change):
+        action = change_action(resource_change)
+        self.total += 1
+        self.actions[action] = self.actions.get(action, 0) + 1
+        by_action = self.types.setdefault(resource_change.get('type'), {})
+        by_action[action] = by_action.get(action, 0) + 1
+        if action == 'replace':
+            self.replaced.append(resource_change['address'])
+        elif action == 'delete':
+            self.destroyed.append(resource_change['address'])
+
+    @property
+    def changes(self):
+        """
+        Number of resources the plan would create, update, replace or
+        delete.
+        """
+        return sum(count for action, count in self.actions.items()
+                   if action not in NO_CHANGE_ACTIONS)
+
+    def __bool__(self):
+        return self.changes > 0
+
+    def __repr__(self):
+        return (f"<PlanSummary +{self.actions.get('create', 0)}"
+                f" ~{self.actions.get('update', 0)}"
+                f" -/+{self.actions.get('replace', 0)}"
+                f" -{self.actions.get('delete', 0)}>")
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'changes': self.changes,
+            'actions': self.actions,
+            'types': self.types,
+            'replaced': sorted(self.replaced),
+            'destroyed': sorted(self.destroyed),
+        }
+
+
+def summarize(source, types=None):
+    """
+    Streams a plan JSON document and returns its `PlanSummary`,
+    optionally limited to the given resource `types`.
+    """
+    summary = PlanSummary()
+    for resource_change in iter_resource_changes(source, types=types,
+                                                 values=False):
+        summary.add(resource_change)
+    summary.replaced.sort()
+    summary.destroyed.sort()
+    return summary
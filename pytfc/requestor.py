@@ -1,14 +1,20 @@
 """
 Module for HTTP verb functions against TFC/E API.
 """
-import requests
 import json
-import logging
-import sys
 from abc import ABCMeta, abstractmethod
+from pytfc import deadline as _deadline
+from pytfc import transfer as _transfer
+from pytfc.exceptions import DeadlineExceeded
+from pytfc.utils import get_logger
 
 # Constants
 MAX_PAGE_SIZE = 100
+DEFAULT_TIMEOUT = (10, 60) # (connect, read) in seconds
+DEFAULT_UPLOAD_RETRIES = 3
+# Connections kept per host; at least the `max_workers` of concurrent
+# helpers so their threads do not discard and reopen connections.
+DEFAULT_POOL_SIZE = 32
 
 
 class Requestor:
@@ -20,23 +26,62 @@ class Requestor:
     
     __metaclass__ = ABCMeta
     
-    def __init__(self, headers, base_uri, verify, log_level):
-        self._logger = logging.getLogger(self.__class__.__name__)
-        self._logger.setLevel(log_level)
-        self._logger.addHandler(logging.StreamHandler(sys.stdout))
-        
+    def __init__(self, headers, base_uri, verify, log_level, session=None,
+                 timeout=DEFAULT_TIMEOUT, pool_size=DEFAULT_POOL_SIZE):
+        self._logger = get_logger(self.__class__.__name__, log_level)
+
         self._headers = headers
         self._base_uri = base_uri
         self._verify = verify
-        
+        self._timeout = timeout
+        if session is None:
+            # Imported here so that `import pytfc` stays cheap.
+            import requests
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self._session = session
+        self._session.verify = verify
+
+    def _send(self, method, url, headers=None, **kwargs):
+        """
+        Sends a request through the shared session
+        and raises on any HTTP error status.
+
+        The configured timeout is capped to the remaining
+        time of the active deadline, if there is one.
+        """
+        deadline = _deadline.current()
+        timeout = self._timeout
+        if deadline is not None:
+            timeout = deadline.bound_timeout(timeout)
+
+        try:
+            r = self._session.request(method=method, url=url, headers=headers,
+                                      timeout=timeout, **kwargs)
+        except OSError as e:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(f"Deadline exceeded during HTTP"
+                                       f" {method} to {url}.") from e
+            raise
+        r.raise_for_status()
+        return r
+
+    def url_for(self, path):
+        """
+        Absolute URL of an API path.
+        """
+        return self._base_uri + path
 
     def post(self, path, payload):
         r = None
         url = self._base_uri + path
         self._logger.debug(f"Sending HTTP POST to {url}")
         self._logger.debug(json.dumps(payload, indent=2))
-        r = requests.post(url=url, headers=self._headers, data=json.dumps(payload))
-        r.raise_for_status()
+        r = self._send('POST', url=url, headers=self._headers,
+                       data=json.dumps(payload))
         return r
 
     def get(self, path, filters=None, page_number=None, page_size=None,
@@ -94,8 +139,7 @@ class Requestor:
             url += '?' + '&'.join(query_params)
         
         self._logger.debug(f"Sending HTTP GET to {url}")
-        r = requests.get(url=url, headers=self._headers)
-        r.raise_for_status()
+        r = self._send('GET', url=url, headers=self._headers)
         return r
 
     def patch(self, path, payload):
@@ -103,18 +147,149 @@ class Requestor:
         url = self._base_uri + path
         self._logger.debug(f"Sending HTTP PATCH to {url}")
         self._logger.debug(json.dumps(payload, indent=2))
-        r = requests.patch(url=url, headers=self._headers, data=json.dumps(payload))
-        r.raise_for_status()
+        r = self._send('PATCH', url=url, headers=self._headers,
+                       data=json.dumps(payload))
         return r
 
     def delete(self, path, payload=None):
         r = None
         url = self._base_uri + path
         self._logger.debug(f"Sending HTTP DELETE to {url}")
-        r = requests.delete(url=url, headers=self._headers, data=json.dumps(payload))
-        r.raise_for_status()
+        r = self._send('DELETE', url=url, headers=self._headers,
+                       data=json.dumps(payload))
         return r
 
+    def upload(self, url, data, headers=None, progress=None, bandwidth=None,
+               retries=DEFAULT_UPLOAD_RETRIES, backoff=1):
+        """
+        Sends an HTTP PUT to an absolute (pre-signed) URL, such as
+        an archivist `upload-url`. API headers are not sent.
+
+        `data` may be bytes, a file object (streamed from its current
+        position) or an iterable of chunks. `progress(sent, total)` is
+        called as the body is read and `bandwidth` (bytes per second or
+        a shared `BandwidthLimiter`) throttles it.
+
+        Transient failures (connection errors, timeouts, 408/429/5xx)
+        are retried up to `retries` times with exponential backoff. The
+        archivist only accepts whole-object PUTs, so a retry restarts
+        the body from the beginning; iterables cannot be rewound and
+        are therefore not retried.
+        """
+        limiter = _transfer.as_limiter(bandwidth)
+        body, rewindable = _transfer.wrap_body(data, progress=progress,
+                                               limiter=limiter)
+        attempt = 0
+        while True:
+            self._logger.debug(f"Sending HTTP PUT to {url}")
+            try:
+                return self._send('PUT', url=url, headers=headers, data=body)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if not (rewindable and attempt < retries
+                        and _transfer.is_transient(e)):
+                    raise
+                wait = _transfer.retry_after(e, backoff * 2 ** attempt)
+                attempt += 1
+                self._logger.warning(f"Upload to {url} failed ({e});"
+                                     f" retry {attempt}/{retries} in {wait}s.")
+                _deadline.sleep(wait)
+                body.rewind()
+
+    def get_redirect(self, path):
+        """
+        Sends an HTTP GET to an API path that redirects to a download
+        (e.g. an archivist URL) without following the redirect.
+
+        Returns the redirect target, or the request URL if the API
+        answered directly.
+        """
+        url = self._base_uri + path
+        self._logger.debug(f"Sending HTTP GET to {url} (not following"
+                           " redirects)")
+        with self._send('GET', url=url, headers=self._headers, stream=True,
+                        allow_redirects=False) as r:
+            if r.is_redirect:
+                return r.headers['Location']
+            return r.url
+
+    def download(self, url, headers=None, stream=False):
+        """
+        Sends an HTTP GET to an absolute (pre-signed) URL, such as
+        an archivist download URL. API headers are not sent.
+        """
+        self._logger.debug(f"Sending HTTP GET to {url}")
+        return self._send('GET', url=url, headers=headers, stream=stream)
+
+    def iter_download(self, url, headers=None,
+                      chunk_size=_transfer.TRANSFER_CHUNK_SIZE,
+                      retries=DEFAULT_UPLOAD_RETRIES, backoff=1, offset=0):
+        """
+        Streams an absolute (pre-signed) URL in chunks of `chunk_size`
+        bytes, starting at byte `offset`. API headers are not sent.
+
+        If the transfer fails part way (connection reset, truncated
+        body, transient HTTP status), it is resumed from the last byte
+        received with an HTTP `Range` request, up to `retries` times.
+        Servers that ignore `Range` are handled by skipping the bytes
+        already yielded. Only attempts that made no progress count
+        against `retries` and back off; a transfer cut after receiving
+        data resumes immediately.
+        """
+        attempt = 0
+        while True:
+            started_at = offset
+            request_headers = dict(headers or {})
+            if offset:
+                request_headers['Range'] = f'bytes={offset}-'
+            self._logger.debug(f"Sending HTTP GET to {url}"
+                               + (f" from byte {offset}" if offset else ''))
+            try:
+                r = self._send('GET', url=url, headers=request_headers,
+                               stream=True)
+                skip = offset if offset and r.status_code != 206 else 0
+                with r:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        if skip:
+                            if len(chunk) <= skip:
+                                skip -= len(chunk)
+                                continue
+                            chunk, skip = chunk[skip:], 0
+                        offset += len(chunk)
+                        yield chunk
+                return
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if offset > started_at:
+                    attempt = 0
+                if attempt >= retries or not _transfer.is_transient(e):
+                    raise
+                wait = 0 if offset > started_at else \
+                    _transfer.retry_after(e, backoff * 2 ** attempt)
+                attempt += 1
+                self._logger.warning(f"Download from {url} interrupted at"
+                                     f" byte {offset} ({e}); resuming"
+                                     f" {attempt}/{retries} in {wait}s.")
+                _deadline.sleep(wait)
+
+    def iter_get(self, path, chunk_size=_transfer.TRANSFER_CHUNK_SIZE,
+                 retries=DEFAULT_UPLOAD_RETRIES, backoff=1):
+        """
+        Streams the body of an API path that may redirect to a download
+        (e.g. `/plans/:id/json-output` and an archivist URL) in chunks
+        of `chunk_size` bytes, resuming like `iter_download`.
+
+        API headers are sent to the API only, never to the redirect
+        target.
+        """
+        url = self.get_redirect(path)
+        headers = self._headers if url.startswith(self._base_uri) else None
+        yield from self.iter_download(url, headers=headers,
+                                      chunk_size=chunk_size, retries=retries,
+                                      backoff=backoff)
+
     def list_all(self, path, filters=None, include=None, search=None,
                  query=None, since=None):
         """
@@ -0,0 +1,326 @@
+"""
+Framework for implementing TFC/E Run Task services.
+
+`RunTaskServer` accepts run task requests from TFC/E, verifies their
+`X-TFC-Task-Signature` HMAC, acknowledges them immediately and runs the
+user's handler on a worker pool. The handler's `RunTaskResult` is then
+sent back with `PATCH <task_result_callback_url>` over a pooled session,
+retrying transient failures.
+
+    def check(request):
+        plan = request.plan_json()
+        ...
+        return RunTaskResult('passed', message='All good')
+
+    with RunTaskServer(check, hmac_key='secret', port=8080) as server:
+        server.serve_forever()
+
+Handlers may also be `async def` coroutines; they then run on a shared
+asyncio event loop instead of the thread pool.
+"""
+import asyncio
+import contextvars
+import inspect
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pytfc import deadline
+from pytfc import transfer
+from pytfc.http_receiver import (DEFAULT_BACKLOG, DEFAULT_HOST,
+                                 SignedJsonReceiver)
+from pytfc.utils import DEFAULT_LOG_LEVEL
+
+# Constants
+SIGNATURE_HEADER = 'X-TFC-Task-Signature'
+VERIFICATION_TOKEN = 'verification-token'
+TASK_RESULT_STATUSES = ('passed', 'failed', 'running')
+CALLBACK_TIMEOUT = (10, 30)
+
+
+class RunTaskRequest:
+    """
+    Run task request payload sent by TFC/E. Payload keys are available
+    as attributes (e.g. `request.run_id`, `request.stage`).
+    """
+    def __init__(self, payload, session=None):
+        self.payload = payload
+        self._session = session
+
+    def __getattr__(self, name):
+        try:
+            return self.payload[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def is_verification(self):
+        """
+        Whether this is the verification request TFC/E sends when
+        the run task is created or updated.
+        """
+        return self.payload.get('access_token') == VERIFICATION_TOKEN
+
+    def _get(self, url):
+        resp = self._session.get(
+            url, timeout=CALLBACK_TIMEOUT,
+            headers={'Authorization': f"Bearer {self.payload['access_token']}"})
+        resp.raise_for_status()
+        return resp
+
+    def plan_json(self):
+        """
+        Downloads the plan's JSON output (post-plan stages only)
+        using the request's short-lived access token.
+        """
+        return self._get(self.payload['plan_json_api_url']).json()
+
+    def configuration_version(self):
+        """
+        Downloads the configuration version tar.gz (bytes).
+        """
+        return self._get(
+            self.payload['configuration_version_download_url']).content
+
+
+class RunTaskResult:
+    """
+    Result reported back to TFC/E for a run task.
+    """
+    def __init__(self, status, message=None, url=None, outcomes=None):
+        if status not in TASK_RESULT_STATUSES:
+            raise ValueError(
+                f"`status` must be one of {', '.join(TASK_RESULT_STATUSES)}.")
+        self.status = status
+        self.message = message
+        self.url = url
+        self.outcomes = outcomes
+
+    @classmethod
+    def from_value(cls, value):
+        """
+        Accepts a `RunTaskResult`, a bool (passed/failed) or a dict of
+        `RunTaskResult` keyword arguments.
+        """
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, bool):
+            return cls('passed' if value else 'failed')
+        if isinstance(value, dict):
+            return cls(**value)
+        raise TypeError("Run task handlers must return a RunTaskResult,"
+                        " a bool or a dict.")
+
+    def to_payload(self):
+        attributes = {'status': self.status}
+        if self.message is not None:
+            attributes['message'] = self.message
+        if self.url is not None:
+            attributes['url'] = self.url
+        data = {'type': 'task-results', 'attributes': attributes}
+        if self.outcomes:
+            data['relationships'] = {'outcomes': {'data': self.outcomes}}
+        return {'data': data}
+
+
+class RunTaskServer(SignedJsonReceiver):
+    """
+    Embeddable HTTP server for a TFC/E run task.
+
+    `handler(request)` receives a `RunTaskRequest` and returns a
+    `RunTaskResult` (or bool/dict). Up to `max_workers` handlers run
+    concurrently; an exception in a handler is reported as 'failed'.
+    Callbacks use a connection pool of `max_workers` connections and
+    are retried up to `retries` times on transient failures.
+
+    `hmac_key` is required unless `verify=False` is passed explicitly;
+    the embedded server listens on `host` (loopback by default).
+    """
+    signature_header = SIGNATURE_HEADER
+    thread_name = 'pytfc-run-task-server'
+
+    def __init__(self, handler, hmac_key=None, host=DEFAULT_HOST, port=0,
+                 path='/', max_workers=64, retries=5, backoff=1,
+                 session=None, verify=True, log_level=DEFAULT_LOG_LEVEL):
+        super().__init__(key=hmac_key, verify=verify, host=host, port=port,
+                         path=path, backlog=max(max_workers, DEFAULT_BACKLOG),
+                         log_level=log_level)
+        self.handler = handler
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.accepted = 0
+        self.completed = 0
+        self.failed_callbacks = 0
+        self._session = session if session is not None else \
+            self._new_session(max_workers)
+        # `handle()` may run on many handler threads at once; the
+        # executor and event loop are created lazily under this lock.
+        self._setup_lock = threading.Lock()
+        self._executor = None
+        self._loop = None
+        self._inflight = set()
+        self._inflight_lock = threading.Lock()
+
+    @staticmethod
+    def _new_session(pool_size):
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+    def handle(self, body, signature=None):
+        """
+        Processes one run task request (raw `body` bytes and the
+        `X-TFC-Task-Signature` header value) and schedules the handler.
+        Use this to embed the server in another web framework.
+
+        Returns the HTTP status code to answer with.
+        """
+        if not self.verify_signature(body, signature):
+            self._logger.warning("Rejected run task request with an invalid"
+                                 " signature.")
+            return 401
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400
+        if not isinstance(payload, dict):
+            return 400
+        request = RunTaskRequest(payload, session=self._session)
+        if request.is_verification:
+            self._logger.info("Answered run task verification request.")
+            return 200
+        if 'task_result_callback_url' not in request.payload:
+            return 422
+        self._count('accepted')
+        self._submit(request)
+        return 200
+
+    def _submit(self, request):
+        if inspect.iscoroutinefunction(self.handler):
+            future = asyncio.run_coroutine_threadsafe(
+                self._run_async(request), self._get_loop())
+        else:
+            future = self._get_executor().submit(
+                contextvars.copy_context().run, self._run, request)
+        with self._inflight_lock:
+            self._inflight.add(future)
+        future.add_done_callback(self._discard_future)
+
+    def _discard_future(self, future):
+        with self._inflight_lock:
+            self._inflight.discard(future)
+
+    def _get_executor(self):
+        with self._setup_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='pytfc-run-task')
+            return self._executor
+
+    def _get_loop(self):
+        with self._setup_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever,
+                                 name='pytfc-run-task-loop',
+                                 daemon=True).start()
+            return self._loop
+
+    def _evaluate(self, request):
+        try:
+            return RunTaskResult.from_value(self.handler(request))
+        except Exception as e:
+            self._logger.error(f"Run task handler failed for Run"
+                               f" `{request.payload.get('run_id')}`: {e}")
+            return RunTaskResult('failed', message=f'Run task error: {e}')
+
+    def _run(self, request):
+        self.send_result(request, self._evaluate(request))
+
+    async def _run_async(self, request):
+        try:
+            result = RunTaskResult.from_value(await self.handler(request))
+        except Exception as e:
+            self._logger.error(f"Run task handler failed for Run"
+                               f" `{request.payload.get('run_id')}`: {e}")
+            result = RunTaskResult('failed', message=f'Run task error: {e}')
+        await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), self.send_result, request, result)
+
+    def send_result(self, request, result):
+        """
+        PATCH the result to the request's `task_result_callback_url`,
+        retrying transient failures with exponential backoff.
+        """
+        url = request.payload['task_result_callback_url']
+        headers = {
+            'Authorization': f"Bearer {request.payload['access_token']}",
+            'Content-Type': 'application/vnd.api+json',
+        }
+        body = json.dumps(result.to_payload())
+        attempt = 0
+        while True:
+            try:
+                resp = self._session.patch(url, data=body, headers=headers,
+                                           timeout=CALLBACK_TIMEOUT)
+                resp.raise_for_status()
+                self._count('completed')
+                return resp
+            except Exception as e:
+                if attempt >= self.retries or not transfer.is_transient(e):
+                    self._count('failed_callbacks')
+                    self._logger.error(f"Run task callback to {url} failed:"
+                                       f" {e}")
+                    return None
+                wait = transfer.retry_after(e, self.backoff * 2 ** attempt)
+                attempt += 1
+                self._logger.warning(f"Run task callback failed ({e});"
+                                     f" retry {attempt}/{self.retries}.")
+                deadline.sleep(wait)
+
+    def join(self, timeout=None):
+        """
+        Waits until all accepted tasks have reported their results.
+        """
+        with deadline.deadline_scope(timeout):
+            while True:
+                with self._inflight_lock:
+                    pending = list(self._inflight)
+                if not pending:
+                    return
+                deadline.sleep(0.05)
+
+    # ------------------------------------------------------------------
+    # Embedded HTTP server
+    # ------------------------------------------------------------------
+    def serve_forever(self):
+        """
+        Blocks the calling thread while the server runs.
+        """
+        if self._thread is None:
+            self.start()
+        self._thread.join()
+
+    def stop(self, wait=True):
+        """
+        Stops accepting requests and, with `wait=True`, finishes
+        in-flight tasks before returning.
+        """
+        super().stop()
+        if wait:
+            self.join()
+        with self._setup_lock:
+            executor, self._executor = self._executor, None
+            loop, self._loop = self._loop, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,314 @@
+"""
+Multiplexed watcher that tracks many Runs to completion.
+
+Instead of one `GET /runs/:id` per Run per interval, `RunWatcher`
+refreshes tracked Runs in bulk from Run listings filtered to active
+statuses:
+
+- `mode='admin'` (Terraform Enterprise): pages through
+  `GET /admin/runs?filter[status]=<active statuses>` once per tick,
+  regardless of how many Runs or Workspaces are tracked.
+- `mode='workspace'`: one `GET /workspaces/:id/runs` per Workspace with
+  tracked Runs, with per-Workspace backoff while nothing changes.
+
+A tracked Run missing from the listing has left the active statuses,
+so it is fetched once with `GET /runs/:id` to learn its final status.
+Status transitions are delivered as `RunEvent`s to a callback and/or
+via the `events()` iterator. Pushed updates (see `push()`, e.g. from
+`pytfc.webhooks.WebhookReceiver`) are applied immediately and wake a
+waiting `events()` loop, so polling only acts as a fallback.
+"""
+import contextvars
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pytfc import deadline
+from pytfc.utils import get_logger, DEFAULT_LOG_LEVEL
+from pytfc.waiter import RUN_FINAL_STATUSES, RUN_WAITING_STATUSES
+
+# Constants
+RUN_ACTIVE_STATUSES = (
+    'pending', 'fetching', 'fetching_completed', 'pre_plan_running',
+    'pre_plan_completed', 'queuing', 'plan_queued', 'planning', 'planned',
+    'cost_estimating', 'cost_estimated', 'policy_checking', 'policy_override',
+    'policy_checked', 'confirmed', 'post_plan_running', 'post_plan_completed',
+    'apply_queued', 'queuing_apply', 'pre_apply_running',
+    'pre_apply_completed', 'applying', 'post_apply_running',
+)
+LIST_PAGE_SIZE = 100
+
+RunEvent = namedtuple('RunEvent',
+                      ['run_id', 'ws_id', 'previous', 'status', 'run'])
+RunEvent.__doc__ = """
+Status transition of a watched Run. `previous` is `None` for the first
+observation; `run` is the Run resource (dict) the status came from.
+"""
+
+
+def _is_done(run):
+    attributes = run['attributes']
+    status = attributes['status']
+    if status in RUN_FINAL_STATUSES:
+        return True
+    return status in RUN_WAITING_STATUSES and \
+        attributes.get('actions', {}).get('is-confirmable', False)
+
+
+class _Tracked:
+    def __init__(self, run_id, ws_id=None):
+        self.run_id = run_id
+        self.ws_id = ws_id
+        self.status = None
+        self.run = None
+        self.done = False
+
+
+class RunWatcher:
+    """
+    Tracks a set of Run IDs until each is final (or awaiting
+    confirmation) and emits a `RunEvent` on every status change.
+    """
+    def __init__(self, client, run_ids=None, mode='workspace', interval=5,
+                 max_interval=60, callback=None, max_workers=8,
+                 log_level=DEFAULT_LOG_LEVEL):
+        if mode not in ('workspace', 'admin'):
+            raise ValueError("`mode` must be 'workspace' or 'admin'.")
+        self._logger = get_logger(self.__class__.__name__, log_level)
+        self._client = client
+        self.mode = mode
+        self.interval = interval
+        self.max_interval = max_interval
+        self.callback = callback
+        self.max_workers = max_workers
+        self.requests = 0
+        self._runs = {}
+        self._ws_next_poll = {}
+        self._ws_delay = {}
+        self._lock = threading.RLock()
+        self._pushed = []
+        self._wake = threading.Event()
+        for run_id in run_ids or []:
+            self.add(run_id)
+
+    def add(self, run_id, ws_id=None):
+        """
+        Starts tracking `run_id`. Passing its `ws_id` saves a lookup
+        in workspace mode.
+        """
+        with self._lock:
+            if run_id not in self._runs:
+                self._runs[run_id] = _Tracked(run_id, ws_id)
+
+    @property
+    def pending(self):
+        """
+        IDs of tracked Runs that are not done yet.
+        """
+        with self._lock:
+            return [t.run_id for t in self._runs.values() if not t.done]
+
+    @property
+    def statuses(self):
+        """
+        Last known status of every tracked Run.
+        """
+        with self._lock:
+            return {t.run_id: t.status for t in self._runs.values()}
+
+    def run(self, run_id):
+        """
+        Last known Run resource (dict) of a tracked Run, or `None`
+        before its first observation.
+        """
+        with self._lock:
+            return self._runs[run_id].run
+
+    def _update(self, tracked, run):
+        status = run['attributes']['status']
+        workspace = run.get('relationships', {}).get('workspace', {})
+        if tracked.ws_id is None and workspace.get('data'):
+            tracked.ws_id = workspace['data']['id']
+        tracked.run = run
+        tracked.done = _is_done(run)
+        if status == tracked.status:
+            return None
+        event = RunEvent(tracked.run_id, tracked.ws_id, tracked.status,
+                         status, run)
+        tracked.status = status
+        return event
+
+    def push(self, run_id, status, ws_id=None, needs_attention=False):
+        """
+        Applies a status update received out of band (e.g. a webhook).
+        Updates for untracked Runs are ignored. `needs_attention` marks
+        a Run waiting for confirmation as done.
+        """
+        with self._lock:
+            tracked = self._runs.get(run_id)
+            if tracked is None or tracked.done:
+                return None
+            run = {'id': run_id, 'type': 'runs',
+                   'attributes': {'status': status,
+                                  'actions': {'is-confirmable':
+                                              bool(needs_attention)}}}
+            if ws_id is not None:
+                run['relationships'] = {
+                    'workspace': {'data': {'id': ws_id, 'type': 'workspaces'}}}
+            event = self._update(tracked, run)
+            if event is not None:
+                self._pushed.append(event)
+        self._wake.set()
+        return event
+
+    def _count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def _show(self, run_id):
+        self._count_request()
+        return self._client.runs.show(run_id=run_id).json()['data']
+
+    def _list_page(self, ws_id=None, page_number=1):
+        self._count_request()
+        filters = ['[status]=' + ','.join(RUN_ACTIVE_STATUSES)]
+        if ws_id is None:
+            resp = self._client.admin_runs.list(
+                filters=filters, page_number=page_number,
+                page_size=LIST_PAGE_SIZE)
+        else:
+            resp = self._client.runs.list(
+                filters=filters, page_number=page_number,
+                page_size=LIST_PAGE_SIZE, ws_id=ws_id)
+        return resp.json()
+
+    def _list_active(self, ws_id=None):
+        """
+        All active Runs (of a Workspace, or of the whole installation
+        without `ws_id`) by ID, following `next-page`.
+        """
+        runs = {}
+        page = 1
+        while True:
+            resp = self._list_page(ws_id=ws_id, page_number=page)
+            runs.update({r['id']: r for r in resp['data']})
+            pagination = resp.get('meta', {}).get('pagination', {})
+            if not pagination.get('next-page'):
+                return runs
+            page = pagination['next-page']
+
+    def _refresh_workspace(self, ws_id, tracked):
+        listed = self._list_active(ws_id=ws_id)
+        results = []
+        for t in tracked:
+            run = listed.get(t.run_id)
+            results.append((t, run if run is not None else self._show(t.run_id)))
+        return ws_id, results
+
+    def _schedule(self, ws_id, changed):
+        delay = self.interval if changed else min(
+            self._ws_delay.get(ws_id, self.interval) * 2, self.max_interval)
+        self._ws_delay[ws_id] = delay
+        self._ws_next_poll[ws_id] = time.monotonic() + \
+            delay * random.uniform(0.8, 1.2)
+
+    def refresh(self):
+        """
+        Refreshes all tracked Runs once and returns the resulting
+        `RunEvent`s (also passed to `callback`).
+        """
+        with self._lock:
+            active = [t for t in self._runs.values() if not t.done]
+            events, self._pushed = self._pushed, []
+
+        if self.mode == 'admin':
+            if active:
+                listed = self._list_active()
+                for t in active:
+                    run = listed.get(t.run_id)
+                    events.append(self._update(
+                        t, run if run is not None else self._show(t.run_id)))
+        else:
+            # Runs added without a Workspace ID are looked up once.
+            looked_up = [t for t in active if t.ws_id is None]
+            for t in looked_up:
+                events.append(self._update(t, self._show(t.run_id)))
+            by_ws = {}
+            now = time.monotonic()
+            for t in active:
+                if t.done or t in looked_up or t.ws_id is None or \
+                        self._ws_next_poll.get(t.ws_id, 0) > now:
+                    continue
+                by_ws.setdefault(t.ws_id, []).append(t)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(contextvars.copy_context().run,
+                                           self._refresh_workspace, ws_id, ts)
+                           for ws_id, ts in by_ws.items()]
+                for future in futures:
+                    ws_id, results = future.result()
+                    changed = False
+                    for t, run in results:
+                        event = self._update(t, run)
+                        changed = changed or event is not None
+                        events.append(event)
+                    self._schedule(ws_id, changed)
+
+        events = [e for e in events if e is not None]
+        for event in events:
+            self._logger.debug(f"Run `{event.run_id}`: {event.previous}"
+                               f" -> {event.status}")
+            if self.callback is not None:
+                self.callback(event)
+        return events
+
+    def _next_delay(self):
+        if self.mode == 'admin' or not self._ws_next_poll:
+            return self.interval
+        with self._lock:
+            due = [self._ws_next_poll.get(t.ws_id, 0)
+                   for t in self._runs.values() if not t.done]
+        if not due:
+            return 0
+        return max(min(due) - time.monotonic(), 0)
+
+    def _sleep(self, seconds):
+        """
+        Sleeps until the next poll, a pushed update or the deadline.
+        """
+        active = deadline.current()
+        if active is not None:
+            active.check()
+            seconds = min(seconds, active.remaining())
+        self._wake.wait(seconds)
+        self._wake.clear()
+        if active is not None:
+            active.check()
+
+    def events(self, timeout=None):
+        """
+        Yields `RunEvent`s as tracked Runs change status, until all
+        of them are done. Raises `DeadlineExceeded` after `timeout`.
+
+        The deadline bounds the watcher's own requests and sleeps; it
+        is not active in the caller's code between events.
+        """
+        active = deadline.Deadline(timeout) if timeout is not None else None
+        while True:
+            with deadline.deadline_scope(active):
+                events = self.refresh()
+            for event in events:
+                yield event
+            if not self.pending:
+                return
+            with deadline.deadline_scope(active):
+                self._sleep(self._next_delay())
+
+    def wait(self, timeout=None):
+        """
+        Blocks until all tracked Runs are done.
+        Returns a dict of Run ID -> final status.
+        """
+        for _ in self.events(timeout=timeout):
+            pass
+        return self.statuses
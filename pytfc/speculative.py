@@ -0,0 +1,189 @@
+"""
+Speculative plans of one configuration across many Workspaces.
+
+`iter_speculative_plans` builds the bundle once and, concurrently for
+every Workspace, creates a speculative Configuration Version, uploads
+the shared bundle and queues a plan-only Run. The Runs are tracked
+together by a `RunWatcher` and as soon as a Run finishes its plan JSON
+is streamed into a `pytfc.plan_json.PlanSummary`. Results are yielded
+in completion order, so slow Workspaces do not hold back the others.
+
+    for result in iter_speculative_plans(client, './modules/vpc', ws_ids):
+        print(result.ws_id, result.status, result.summary)
+"""
+import contextvars
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pytfc import deadline
+from pytfc.exceptions import FanOutError, SpeculativePlanError
+from pytfc.run_watcher import RunWatcher
+from pytfc.transfer import as_limiter
+from pytfc.utils import get_logger, DEFAULT_LOG_LEVEL
+
+# Constants
+PLAN_FINISHED_STATUS = 'planned_and_finished'
+DEFAULT_MESSAGE = 'Speculative plan queued by pytfc'
+
+SpeculativePlan = namedtuple('SpeculativePlan',
+                             ['ws_id', 'run_id', 'status', 'summary', 'error'])
+SpeculativePlan.__doc__ = """
+Outcome of the speculative plan of one Workspace. `summary` is the
+`PlanSummary` of a finished plan; `error` is set (and `summary` is
+`None`) if the upload, the Run or reading the plan failed.
+"""
+
+
+def _plan_id(client, run):
+    plan = run.get('relationships', {}).get('plan', {}).get('data')
+    if plan:
+        return plan['id']
+    return client.plans.get_plan_id_from_run(run_id=run['id'])
+
+
+def iter_speculative_plans(client, source_tf_dir, ws_ids,
+                           message=DEFAULT_MESSAGE, types=None,
+                           terraformignore=True, compresslevel=6,
+                           compress_workers=None, max_workers=8,
+                           mode='workspace', interval=5, max_interval=60,
+                           bandwidth=None, timeout=None,
+                           log_level=DEFAULT_LOG_LEVEL):
+    """
+    Runs a speculative plan of `source_tf_dir` in every Workspace ID in
+    `ws_ids` and yields one `SpeculativePlan` per Workspace as it
+    completes. `types` limits the plan summaries to those resource
+    types.
+
+    Uploads, Run creation and plan reads share a pool of `max_workers`
+    threads; `bandwidth` (bytes per second) caps the combined upload
+    throughput. Runs are polled by a `RunWatcher` in `mode` ('workspace'
+    or 'admin') every `interval` seconds (backing off to
+    `max_interval`). Raises `DeadlineExceeded` after `timeout` seconds.
+    """
+    logger = get_logger('SpeculativePlans', log_level)
+    ws_ids = list(dict.fromkeys(ws_ids))
+    cvs = client.configuration_versions
+    limiter = as_limiter(bandwidth)
+    watcher = RunWatcher(client, mode=mode, interval=interval,
+                         max_interval=max_interval, max_workers=max_workers,
+                         log_level=log_level)
+    # The deadline is only entered around work done here and captured by
+    # the tasks; it must not leak into the caller's code between yields.
+    active = deadline.Deadline(timeout) if timeout is not None else None
+
+    def queue_plan(ws_id, buffer):
+        cv_id = cvs.upload_buffer(ws_id, buffer, auto_queue_runs=False,
+                                  speculative=True, bandwidth=limiter)
+        run = client.runs.create(message=message, plan_only=True,
+                                 ws_id=ws_id, cv_id=cv_id)
+        return run.json()['data']['id']
+
+    def summarize(run):
+        return client.plans.summarize(_plan_id(client, run), types=types)
+
+    with cvs.build_buffer(source_tf_dir, terraformignore=terraformignore,
+                          compresslevel=compresslevel,
+                          compress_workers=compress_workers) as buffer, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+        def submit(func, *args):
+            # Each task runs in a copy of the context with the deadline
+            # active so it applies to the worker threads too.
+            with deadline.deadline_scope(active):
+                return executor.submit(contextvars.copy_context().run,
+                                       func, *args)
+
+        uploads = {submit(queue_plan, ws_id, buffer): ws_id
+                   for ws_id in ws_ids}
+        summaries = {}
+        runs = {}
+        next_poll = time.monotonic()
+
+        def collect():
+            # One pass over finished tasks and Runs; returns the results
+            # to yield.
+            nonlocal next_poll
+            results = []
+            for future in [f for f in uploads if f.done()]:
+                ws_id = uploads.pop(future)
+                try:
+                    run_id = future.result()
+                except Exception as e:
+                    logger.error(f"Workspace `{ws_id}`: {e}")
+                    results.append(SpeculativePlan(ws_id, None, None, None, e))
+                    continue
+                logger.debug(f"Queued speculative Run `{run_id}` in"
+                             f" Workspace `{ws_id}`.")
+                runs[run_id] = ws_id
+                watcher.add(run_id, ws_id=ws_id)
+
+            if watcher.pending and time.monotonic() >= next_poll:
+                watcher.refresh()
+                next_poll = time.monotonic() + watcher.interval
+            for run_id in [r for r in runs if r not in watcher.pending]:
+                ws_id = runs.pop(run_id)
+                run = watcher.run(run_id)
+                status = run['attributes']['status']
+                if status != PLAN_FINISHED_STATUS:
+                    results.append(SpeculativePlan(
+                        ws_id, run_id, status, None,
+                        SpeculativePlanError(f"Run `{run_id}` ended with"
+                                             f" status `{status}`.")))
+                    continue
+                summaries[submit(summarize, run)] = (ws_id, run_id, status)
+
+            for future in [f for f in summaries if f.done()]:
+                ws_id, run_id, status = summaries.pop(future)
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    logger.error(f"Workspace `{ws_id}`: {e}")
+                    results.append(
+                        SpeculativePlan(ws_id, run_id, status, None, e))
+                    continue
+                results.append(
+                    SpeculativePlan(ws_id, run_id, status, summary, None))
+            return results
+
+        while True:
+            with deadline.deadline_scope(active):
+                results = collect()
+            yield from results
+
+            if not (uploads or summaries or watcher.pending):
+                return
+            # Wake up for the next poll or as soon as a task completes.
+            delay = max(next_poll - time.monotonic(), 0) \
+                if watcher.pending else None
+            with deadline.deadline_scope(active) as current:
+                if current is not None:
+                    current.check()
+                    delay = current.remaining() if delay is None \
+                        else min(delay, current.remaining())
+                if uploads or summaries:
+                    wait(list(uploads) + list(summaries), timeout=delay,
+                         return_when=FIRST_COMPLETED)
+                else:
+                    deadline.sleep(delay)
+
+
+def speculative_plans(client, source_tf_dir, ws_ids, **kwargs):
+    """
+    Runs `iter_speculative_plans` to completion. Returns a dict of
+    Workspace ID -> `SpeculativePlan`, or raises `FanOutError`
+    (carrying `results` and `errors` dicts) if any Workspace failed;
+    the others are still completed.
+    """
+    results = {}
+    errors = {}
+    for result in iter_speculative_plans(client, source_tf_dir, ws_ids,
+                                         **kwargs):
+        if result.error is not None:
+            errors[result.ws_id] = result.error
+        else:
+            results[result.ws_id] = result
+    if errors:
+        raise FanOutError(
+            f"{len(errors)} of {len(results) + len(errors)} Workspaces"
+            " failed.", results=results, errors=errors)
+    return results
@@ -0,0 +1,164 @@
+"""
+Linear-time diff of two Terraform states.
+
+The old state is streamed once (see `pytfc.json_stream`) and reduced to
+an index of resource instance address -> per-attribute digests; the new
+state is then streamed and compared against that index entry by entry.
+Only the index is kept in memory, never either full document, so two
+large states can be compared in one pass each.
+
+    diff = diff_states(old_chunks, new_chunks)
+    for address, attributes in diff.changed.items():
+        print(f'~ {address}: {", ".join(attributes)}')
+"""
+import hashlib
+import json
+from pytfc import json_stream
+
+# Constants
+DIGEST_SIZE = 8
+INSTANCE_FIELDS = ('sensitive_attributes', 'status')
+
+
+def _digest(value):
+    data = json.dumps(value, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(data.encode('utf-8'),
+                           digest_size=DIGEST_SIZE).digest()
+
+
+def instance_address(resource, instance):
+    """
+    Address of one resource instance, e.g. `aws_instance.web[0]` or
+    `module.app.aws_s3_bucket.b["logs"]`.
+    """
+    address = json_stream.resource_address(resource)
+    if 'index_key' in instance:
+        address += f"[{json.dumps(instance['index_key'])}]"
+    return address
+
+
+def _fingerprint(instance):
+    """
+    Digest of every attribute (plus a few instance fields) so that a
+    change can be reported down to the attribute name.
+    """
+    fingerprint = {name: _digest(value) for name, value in
+                   (instance.get('attributes') or {}).items()}
+    for field in INSTANCE_FIELDS:
+        if field in instance:
+            fingerprint[f'<{field}>'] = _digest(instance[field])
+    return fingerprint
+
+
+def _changed_keys(old, new):
+    return sorted(key for key in old.keys() | new.keys()
+                  if old.get(key) != new.get(key))
+
+
+class StateDiff:
+    """
+    Differences between two states. `added`/`removed` are sorted lists
+    of instance addresses (output names for the `outputs_*` variants);
+    `changed` and `outputs_changed` map each address to the sorted
+    names of the attributes that differ.
+    """
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.changed = {}
+        self.outputs_added = []
+        self.outputs_removed = []
+        self.outputs_changed = {}
+        self.old_serial = None
+        self.new_serial = None
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or
+                    self.outputs_added or self.outputs_removed or
+                    self.outputs_changed)
+
+    def __repr__(self):
+        return (f'<StateDiff +{len(self.added)} -{len(self.removed)}'
+                f' ~{len(self.changed)} outputs +{len(self.outputs_added)}'
+                f' -{len(self.outputs_removed)}'
+                f' ~{len(self.outputs_changed)}>')
+
+    def to_dict(self):
+        return {
+            'old_serial': self.old_serial,
+            'new_serial': self.new_serial,
+            'added': self.added,
+            'removed': self.removed,
+            'changed': self.changed,
+            'outputs_added': self.outputs_added,
+            'outputs_removed': self.outputs_removed,
+            'outputs_changed': self.outputs_changed,
+        }
+
+
+def _outputs_index(outputs):
+    return {name: {field: _digest(output.get(field))
+                   for field in ('value', 'type', 'sensitive')}
+            for name, output in (outputs or {}).items()}
+
+
+def _index(source, types=None):
+    """
+    Streams a state into `(serial, outputs index, instances index)`.
+    """
+    serial = None
+    outputs = {}
+    instances = {}
+    for key, value in json_stream.walk(source, outputs=True, resources=True,
+                                       types=types):
+        if key == 'serial':
+            serial = value
+        elif key == 'outputs':
+            outputs = _outputs_index(value)
+        elif key == 'resource':
+            for instance in value.get('instances') or []:
+                instances[instance_address(value, instance)] = \
+                    _fingerprint(instance)
+    return serial, outputs, instances
+
+
+def diff_states(old, new, types=None):
+    """
+    Compares two states (bytes, file objects or iterables of chunks,
+    e.g. `StateVersions.iter_download()`) and returns a `StateDiff`.
+    `types` limits the comparison to those resource types.
+
+    Runs in time linear in the size of both states; memory holds one
+    small digest per attribute of the old state.
+    """
+    diff = StateDiff()
+    diff.old_serial, old_outputs, old_instances = _index(old, types=types)
+
+    new_outputs = {}
+    for key, value in json_stream.walk(new, outputs=True, resources=True,
+                                       types=types):
+        if key == 'serial':
+            diff.new_serial = value
+        elif key == 'outputs':
+            new_outputs = _outputs_index(value)
+        elif key == 'resource':
+            for instance in value.get('instances') or []:
+                address = instance_address(value, instance)
+                # Whatever is left in the index afterwards was removed.
+                previous = old_instances.pop(address, None)
+                if previous is None:
+                    diff.added.append(address)
+                    continue
+                changed = _changed_keys(previous, _fingerprint(instance))
+                if changed:
+                    diff.changed[address] = changed
+
+    diff.added.sort()
+    diff.removed = sorted(old_instances)
+    diff.outputs_added = sorted(new_outputs.keys() - old_outputs.keys())
+    diff.outputs_removed = sorted(old_outputs.keys() - new_outputs.keys())
+    for name in sorted(old_outputs.keys() & new_outputs.keys()):
+        changed = _changed_keys(old_outputs[name], new_outputs[name])
+        if changed:
+            diff.outputs_changed[name] = changed
+    return diff
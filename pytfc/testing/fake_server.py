@@ -0,0 +1,1513 @@
+"""
+In-process fake of the TFC/E API v2 for offline tests and benchmarks.
+
+The fake serves the subset of the API surface that pytfc uses over
+plain HTTP on localhost, including the archivist object store that
+Configuration Versions, State Versions and Plan Exports upload to and
+download from. Responses follow the JSON:API document layout and
+pagination rules of the real API closely enough for pytfc's helpers.
+"""
+import base64
+import hashlib
+import io
+import json
+import re
+import tarfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Constants
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+RUN_STATUS_FLOW = ['pending', 'planning', 'planned']
+RUN_APPLY_FLOW = ['applying', 'applied']
+# Statuses in which a Run's plan JSON is not available yet (HTTP 204).
+PLAN_PENDING_STATUSES = ['pending', 'fetching', 'plan_queued', 'planning']
+RUN_FINAL_STATUSES = ['applied', 'planned_and_finished', 'errored',
+                      'discarded', 'canceled', 'force_canceled']
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def _new_id(prefix):
+    return f'{prefix}-{uuid.uuid4().hex[:16]}'
+
+
+class _Route:
+    """
+    Single routing table entry of the fake server.
+    """
+    def __init__(self, method, pattern, handler):
+        self.method = method
+        self.regex = re.compile('^' + pattern + '$')
+        self.handler = handler
+
+
+class _FakeRequest:
+    """
+    Parsed HTTP request handed to route handlers.
+    """
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        if not self.body:
+            return {}
+        return json.loads(self.body)
+
+    def param(self, name, default=None):
+        values = self.query.get(name)
+        return values[0] if values else default
+
+
+class FakeTfcServer:
+    """
+    Threaded HTTP server that emulates TFC/E on `127.0.0.1`.
+
+    Use as a context manager or call `start()` and `stop()`.
+    `latency` adds a fixed delay (in seconds) to every response and
+    `rate_limit_every` answers every Nth API request with a 429.
+    """
+    def __init__(self, host='127.0.0.1', port=0, token='fake-token',
+                 latency=0, rate_limit_every=None, retry_after=1,
+                 run_step_seconds=0, cv_process_seconds=0):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.run_step_seconds = run_step_seconds
+        self.cv_process_seconds = cv_process_seconds
+
+        self.request_count = 0
+        self.request_log = []
+        self.log_requests = False
+        self._pending_429 = 0
+        self._pending_object_errors = []
+        self._pending_truncations = []
+        self._default_run_status = None
+        self._default_plan_json = None
+        self._lock = threading.RLock()
+        self._httpd = None
+        self._thread = None
+
+        self.organizations = {}
+        self.workspaces = {}
+        self._ws_by_org = {}
+        self._ws_by_name = {}
+        self.projects = {}
+        self.configuration_versions = {}
+        self.runs = {}
+        self.plans = {}
+        self.applies = {}
+        self.plan_exports = {}
+        self.state_versions = {}
+        self.state_version_outputs = {}
+        self.vars = {}
+        self.varsets = {}
+        self.teams = {}
+        self.users = {}
+        self.terraform_versions = {}
+        self.notification_configurations = {}
+        self.task_results = {}
+        self.objects = {}
+
+        self._routes = []
+        self._register_routes()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        """
+        Starts serving requests on a background daemon thread.
+        """
+        fake = self
+
+        class Handler(_FakeRequestHandler):
+            server_fake = fake
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name='FakeTfcServer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the server and joins the serving thread.
+        """
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def hostname(self):
+        """
+        Value to pass as `hostname` to `pytfc.Client`.
+        """
+        return f'http://{self.host}:{self.port}'
+
+    @property
+    def base_uri(self):
+        return f'{self.hostname}/api/v2'
+
+    def client(self, **kwargs):
+        """
+        Returns a `pytfc.Client` pointed at this server.
+        """
+        import pytfc
+        kwargs.setdefault('token', self.token)
+        return pytfc.Client(hostname=self.hostname, **kwargs)
+
+    def inject_429(self, count=1):
+        """
+        Answers the next `count` API requests with HTTP 429.
+        """
+        with self._lock:
+            self._pending_429 += count
+
+    def inject_object_error(self, count=1, status=503):
+        """
+        Answers the next `count` archivist object requests (uploads and
+        downloads) with `status`, to simulate transient storage failures.
+        """
+        with self._lock:
+            self._pending_object_errors += [status] * count
+
+    def inject_object_truncation(self, count=1, at=1024):
+        """
+        Cuts the connection after `at` body bytes on the next `count`
+        archivist object downloads, to simulate interrupted transfers.
+        """
+        with self._lock:
+            self._pending_truncations += [at] * count
+
+    # ------------------------------------------------------------------
+    # Seeding helpers
+    # ------------------------------------------------------------------
+    def seed_organization(self, name, email='admin@example.com'):
+        """
+        Creates an Organization if it does not already exist.
+        """
+        with self._lock:
+            if name not in self.organizations:
+                self.organizations[name] = {
+                    'id': name,
+                    'name': name,
+                    'email': email,
+                    'created-at': _now(),
+                }
+                self._ws_by_org[name] = []
+                self.seed_project(org=name, name='Default Project')
+            return self.organizations[name]
+
+    def seed_project(self, org, name):
+        with self._lock:
+            prj_id = _new_id('prj')
+            self.projects[prj_id] = {'id': prj_id, 'org': org, 'name': name}
+            return prj_id
+
+    def seed_workspace(self, org, name, **attributes):
+        """
+        Creates a Workspace and returns its ID.
+        """
+        with self._lock:
+            self.seed_organization(org)
+            ws_id = _new_id('ws')
+            ws = {
+                'id': ws_id,
+                'org': org,
+                'name': name,
+                'created-at': _now(),
+                'auto-apply': False,
+                'execution-mode': 'remote',
+                'terraform-version': '1.5.7',
+                'working-directory': None,
+                'locked': False,
+                'tag-names': [],
+                'project-id': None,
+                'current-run-id': None,
+                'current-state-version-id': None,
+            }
+            ws.update(attributes)
+            self.workspaces[ws_id] = ws
+            self._ws_by_org[org].append(ws)
+            self._ws_by_name[(org, name)] = ws
+            return ws_id
+
+    def seed_workspaces(self, org, count, prefix='ws', **attributes):
+        """
+        Synthesizes `count` Workspaces named `<prefix>-<n>` in an
+        Organization. Returns the list of new Workspace IDs.
+        """
+        return [self.seed_workspace(org, f'{prefix}-{i:06d}', **attributes)
+                for i in range(count)]
+
+    def seed_state_version(self, ws_id, state, serial=None, lineage=None,
+                           parse_outputs=True):
+        """
+        Stores `state` (bytes) as the current State Version of a
+        Workspace. Returns the new State Version ID.
+        """
+        if isinstance(state, str):
+            state = state.encode('utf-8')
+        with self._lock:
+            sv_id = _new_id('sv')
+            ws = self.workspaces[ws_id]
+            outputs = {}
+            if parse_outputs:
+                try:
+                    doc = json.loads(state)
+                    outputs = doc.get('outputs', {})
+                    serial = doc.get('serial') if serial is None else serial
+                    lineage = doc.get('lineage') if lineage is None else lineage
+                except ValueError:
+                    pass
+            sv = {
+                'id': sv_id,
+                'ws_id': ws_id,
+                'created-at': _now(),
+                'serial': serial if serial is not None else 1,
+                'lineage': lineage,
+                'md5': hashlib.md5(state).hexdigest(),
+                'size': len(state),
+                'download_token': self._put_object(state),
+                'output_ids': [],
+            }
+            self._add_sv_outputs(sv, outputs)
+            self.state_versions[sv_id] = sv
+            ws['current-state-version-id'] = sv_id
+            return sv_id
+
+    def _add_sv_outputs(self, sv, outputs):
+        for name, output in outputs.items():
+            svo_id = _new_id('wsout')
+            self.state_version_outputs[svo_id] = {
+                'id': svo_id,
+                'name': name,
+                'sensitive': output.get('sensitive', False),
+                'type': output.get('type'),
+                'value': output.get('value'),
+            }
+            sv['output_ids'].append(svo_id)
+
+    def seed_run(self, ws_id, status=None, cv_id=None, **attributes):
+        """
+        Creates a Run (with its Plan and Apply). Returns the Run ID.
+        """
+        with self._lock:
+            run_id = _new_id('run')
+            plan_id = _new_id('plan')
+            apply_id = _new_id('apply')
+            run = {
+                'id': run_id,
+                'ws_id': ws_id,
+                'cv_id': cv_id,
+                'plan_id': plan_id,
+                'apply_id': apply_id,
+                'created-at': _now(),
+                'started': time.monotonic(),
+                'message': 'Queued by fake',
+                'auto-apply': False,
+                'plan-only': False,
+                'is-destroy': False,
+                'status': status if status is not None
+                else self._default_run_status,
+                'applied_at': None,
+            }
+            run.update(attributes)
+            self.runs[run_id] = run
+            self.plans[plan_id] = {'id': plan_id, 'run_id': run_id,
+                                   'export_ids': [], 'json': None}
+            self.applies[apply_id] = {'id': apply_id, 'run_id': run_id}
+            self.workspaces[ws_id]['current-run-id'] = run_id
+            return run_id
+
+    def set_run_status(self, run_id, status):
+        """
+        Pins the status of a Run, overriding the simulated lifecycle.
+        """
+        with self._lock:
+            self.runs[run_id]['status'] = status
+
+    def set_plan_json(self, plan_id, plan_json):
+        """
+        Sets the document returned by `/plans/:id/json-output`.
+        """
+        with self._lock:
+            self.plans[plan_id]['json'] = plan_json
+
+    def set_default_run_status(self, status):
+        """
+        Pins the status of every Run created from now on (seeded or
+        through the API); `None` restores the simulated lifecycle.
+        """
+        with self._lock:
+            self._default_run_status = status
+
+    def set_default_plan_json(self, plan_json):
+        """
+        Sets the document returned by `/plans/:id/json-output` for Plans
+        without their own (see `set_plan_json()`).
+        """
+        with self._lock:
+            self._default_plan_json = plan_json
+
+    def _put_object(self, data=b'', on_upload=None):
+        token = uuid.uuid4().hex
+        self.objects[token] = {'data': data, 'on_upload': on_upload}
+        return token
+
+    def object_url(self, token):
+        return f'{self.hostname}/_archivist/v1/object/{token}'
+
+    # ------------------------------------------------------------------
+    # Simulated lifecycles
+    # ------------------------------------------------------------------
+    def run_status(self, run):
+        """
+        Returns the current status of a Run, advancing it through
+        its lifecycle by `run_step_seconds` per step.
+        """
+        if run['status'] is not None:
+            return run['status']
+        if run['plan-only']:
+            flow = RUN_STATUS_FLOW[:-1] + ['planned_and_finished']
+        elif run['auto-apply'] or run['applied_at'] is not None:
+            flow = RUN_STATUS_FLOW + RUN_APPLY_FLOW
+        else:
+            flow = RUN_STATUS_FLOW
+        if self.run_step_seconds <= 0:
+            return flow[-1]
+        step = int((time.monotonic() - run['started']) / self.run_step_seconds)
+        return flow[min(step, len(flow) - 1)]
+
+    def _cv_status(self, cv):
+        if cv['uploaded_at'] is None:
+            return 'pending'
+        if time.monotonic() - cv['uploaded_at'] < self.cv_process_seconds:
+            return 'pending'
+        return 'uploaded'
+
+    def _on_cv_upload(self, cv_id, data):
+        with self._lock:
+            cv = self.configuration_versions[cv_id]
+            cv['uploaded_at'] = time.monotonic()
+            cv['size'] = len(data)
+            if cv['auto-queue-runs']:
+                self.seed_run(cv['ws_id'], cv_id=cv_id,
+                              **{'plan-only': cv['speculative'],
+                                 'message': 'Triggered via API'})
+
+    # ------------------------------------------------------------------
+    # Serializers
+    # ------------------------------------------------------------------
+    def _rel(self, type_, id_):
+        return {'data': {'id': id_, 'type': type_} if id_ else None}
+
+    def _ser_org(self, org):
+        return {
+            'id': org['name'],
+            'type': 'organizations',
+            'attributes': {
+                'name': org['name'],
+                'email': org['email'],
+                'created-at': org['created-at'],
+            },
+        }
+
+    def _ser_ws(self, ws):
+        return {
+            'id': ws['id'],
+            'type': 'workspaces',
+            'attributes': {
+                'name': ws['name'],
+                'created-at': ws['created-at'],
+                'auto-apply': ws['auto-apply'],
+                'execution-mode': ws['execution-mode'],
+                'terraform-version': ws['terraform-version'],
+                'working-directory': ws['working-directory'],
+                'locked': ws['locked'],
+                'tag-names': ws['tag-names'],
+            },
+            'relationships': {
+                'organization': self._rel('organizations', ws['org']),
+                'project': self._rel('projects', ws['project-id']),
+                'current-run': self._rel('runs', ws['current-run-id']),
+                'current-state-version': self._rel(
+                    'state-versions', ws['current-state-version-id']),
+            },
+            'links': {'self': f"/api/v2/organizations/{ws['org']}"
+                              f"/workspaces/{ws['name']}"},
+        }
+
+    def _ser_cv(self, cv):
+        status = self._cv_status(cv)
+        attributes = {
+            'auto-queue-runs': cv['auto-queue-runs'],
+            'speculative': cv['speculative'],
+            'source': 'tfe-api',
+            'status': status,
+            'status-timestamps': {},
+        }
+        if status == 'pending':
+            attributes['upload-url'] = self.object_url(cv['upload_token'])
+        return {
+            'id': cv['id'],
+            'type': 'configuration-versions',
+            'attributes': attributes,
+        }
+
+    def _ser_run(self, run):
+        status = self.run_status(run)
+        confirmable = status == 'planned' and not run['auto-apply'] and \
+            run['applied_at'] is None
+        return {
+            'id': run['id'],
+            'type': 'runs',
+            'attributes': {
+                'status': status,
+                'actions': {
+                    'is-confirmable': confirmable,
+                    'is-discardable': confirmable,
+                    'is-cancelable': status in ('pending', 'planning',
+                                                'applying'),
+                },
+                'message': run['message'],
+                'created-at': run['created-at'],
+                'auto-apply': run['auto-apply'],
+                'plan-only': run['plan-only'],
+                'is-destroy': run['is-destroy'],
+                'has-changes': True,
+            },
+            'relationships': {
+                'workspace': self._rel('workspaces', run['ws_id']),
+                'configuration-version': self._rel(
+                    'configuration-versions', run['cv_id']),
+                'plan': self._rel('plans', run['plan_id']),
+                'apply': self._rel('applies', run['apply_id']),
+            },
+        }
+
+    def _ser_plan(self, plan):
+        run = self.runs[plan['run_id']]
+        run_status = self.run_status(run)
+        if run_status in ('pending',):
+            status = 'pending'
+        elif run_status == 'planning':
+            status = 'running'
+        elif run_status == 'errored':
+            status = 'errored'
+        else:
+            status = 'finished'
+        return {
+            'id': plan['id'],
+            'type': 'plans',
+            'attributes': {'status': status, 'has-changes': True},
+            'relationships': {
+                'run': self._rel('runs', run['id']),
+                'exports': {'data': [{'id': i, 'type': 'plan-exports'}
+                                     for i in plan['export_ids']]},
+            },
+        }
+
+    def _ser_apply(self, apply):
+        run_status = self.run_status(self.runs[apply['run_id']])
+        status = {'applying': 'running', 'applied': 'finished',
+                  'errored': 'errored'}.get(run_status, 'unreachable')
+        return {
+            'id': apply['id'],
+            'type': 'applies',
+            'attributes': {'status': status},
+        }
+
+    def _ser_sv(self, sv):
+        outputs = [{'id': i, 'type': 'state-version-outputs'}
+                   for i in sv['output_ids']]
+        attributes = {
+            'created-at': sv['created-at'],
+            'serial': sv['serial'],
+            'lineage': sv['lineage'],
+            'md5': sv['md5'],
+            'size': sv['size'],
+            'status': 'finalized' if sv['download_token'] else 'pending',
+            'resources-processed': sv['download_token'] is not None,
+            'hosted-state-download-url': None,
+            'hosted-json-state-download-url': None,
+        }
+        if sv['download_token']:
+            url = self.object_url(sv['download_token'])
+            attributes['hosted-state-download-url'] = url
+            attributes['hosted-json-state-download-url'] = url
+        if sv.get('upload_token'):
+            attributes['hosted-state-upload-url'] = \
+                self.object_url(sv['upload_token'])
+        return {
+            'id': sv['id'],
+            'type': 'state-versions',
+            'attributes': attributes,
+            'relationships': {
+                'workspace': self._rel('workspaces', sv['ws_id']),
+                'outputs': {'data': outputs},
+            },
+        }
+
+    def _ser_svo(self, svo):
+        return {
+            'id': svo['id'],
+            'type': 'state-version-outputs',
+            'attributes': {
+                'name': svo['name'],
+                'sensitive': svo['sensitive'],
+                'type': svo['type'],
+                'value': None if svo['sensitive'] else svo['value'],
+                'detailed-type': svo['type'],
+            },
+        }
+
+    def _ser_var(self, var):
+        attributes = dict(var['attributes'])
+        if attributes.get('sensitive') in (True, 'true'):
+            attributes['value'] = None
+        return {'id': var['id'], 'type': 'vars', 'attributes': attributes}
+
+    def _ser_varset(self, vs):
+        return {
+            'id': vs['id'],
+            'type': 'varsets',
+            'attributes': {
+                'name': vs['name'],
+                'description': vs['description'],
+                'global': vs['global'],
+            },
+            'relationships': {
+                'workspaces': {'data': [{'id': i, 'type': 'workspaces'}
+                                        for i in vs['workspace_ids']]},
+                'projects': {'data': [{'id': i, 'type': 'projects'}
+                                      for i in vs['project_ids']]},
+                'vars': {'data': [{'id': i, 'type': 'vars'}
+                                  for i in vs['var_ids']]},
+            },
+        }
+
+    def _ser_team(self, team):
+        return {
+            'id': team['id'],
+            'type': 'teams',
+            'attributes': {'name': team['name'],
+                           'users-count': len(team.get('user_ids', []))},
+        }
+
+    def _ser_project(self, prj):
+        return {'id': prj['id'], 'type': 'projects',
+                'attributes': {'name': prj['name']}}
+
+    def _ser_pe(self, pe):
+        return {
+            'id': pe['id'],
+            'type': 'plan-exports',
+            'attributes': {'data-type': 'sentinel-mock-bundle-v0',
+                           'status': 'finished'},
+            'relationships': {'plan': self._rel('plans', pe['plan_id'])},
+        }
+
+    def _ser_nc(self, nc):
+        return {'id': nc['id'], 'type': 'notification-configurations',
+                'attributes': nc['attributes'],
+                'relationships': {
+                    'subscribable': self._rel('workspaces', nc['ws_id'])}}
+
+    # ------------------------------------------------------------------
+    # Response helpers
+    # ------------------------------------------------------------------
+    def _page(self, req, items, serializer):
+        """
+        Paginates `items` following the JSON:API pagination
+        parameters of the request.
+        """
+        page_number = max(int(req.param('page[number]', 1)), 1)
+        page_size = int(req.param('page[size]', DEFAULT_PAGE_SIZE))
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        total = len(items)
+        total_pages = max((total + page_size - 1) // page_size, 1)
+        start = (page_number - 1) * page_size
+        window = items[start:start + page_size]
+        base = f'{self.base_uri}{req.path}?page%5Bsize%5D={page_size}'
+        return 200, {
+            'data': [serializer(i) for i in window],
+            'links': {
+                'self': f'{base}&page%5Bnumber%5D={page_number}',
+                'first': f'{base}&page%5Bnumber%5D=1',
+                'prev': f'{base}&page%5Bnumber%5D={page_number - 1}'
+                        if page_number > 1 else None,
+                'next': f'{base}&page%5Bnumber%5D={page_number + 1}'
+                        if page_number < total_pages else None,
+                'last': f'{base}&page%5Bnumber%5D={total_pages}',
+            },
+            'meta': {
+                'pagination': {
+                    'current-page': page_number,
+                    'page-size': page_size,
+                    'prev-page': page_number - 1 if page_number > 1 else None,
+                    'next-page': page_number + 1
+                                 if page_number < total_pages else None,
+                    'total-pages': total_pages,
+                    'total-count': total,
+                }
+            },
+        }
+
+    @staticmethod
+    def _not_found():
+        return 404, {'errors': [{'status': '404', 'title': 'not found'}]}
+
+    @staticmethod
+    def _unprocessable(detail):
+        return 422, {'errors': [{'status': '422',
+                                 'title': 'invalid attribute',
+                                 'detail': detail}]}
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+    def _register_routes(self):
+        add = self._routes.append
+        seg = '([^/]+)'
+        v2 = '/api/v2'
+        # archivist object store
+        add(_Route('GET', f'/_archivist/v1/object/{seg}', self._h_object_get))
+        add(_Route('PUT', f'/_archivist/v1/object/{seg}', self._h_object_put))
+        # organizations
+        add(_Route('GET', f'{v2}/organizations', self._h_org_list))
+        add(_Route('GET', f'{v2}/organizations/{seg}', self._h_org_show))
+        # workspaces
+        add(_Route('GET', f'{v2}/organizations/{seg}/workspaces/?',
+                   self._h_ws_list))
+        add(_Route('POST', f'{v2}/organizations/{seg}/workspaces/?',
+                   self._h_ws_create))
+        add(_Route('GET', f'{v2}/organizations/{seg}/workspaces/{seg}',
+                   self._h_ws_show_by_name))
+        add(_Route('PATCH', f'{v2}/organizations/{seg}/workspaces/{seg}',
+                   self._h_ws_update))
+        add(_Route('DELETE', f'{v2}/organizations/{seg}/workspaces/{seg}',
+                   self._h_ws_delete))
+        add(_Route('GET', f'{v2}/workspaces/{seg}', self._h_ws_show))
+        add(_Route('POST', f'{v2}/workspaces/{seg}/actions/(lock|unlock|force-unlock)',
+                   self._h_ws_lock))
+        # configuration versions
+        add(_Route('GET', f'{v2}/workspaces/{seg}/configuration-versions',
+                   self._h_cv_list))
+        add(_Route('POST', f'{v2}/workspaces/{seg}/configuration-versions',
+                   self._h_cv_create))
+        add(_Route('GET', f'{v2}/configuration-versions/{seg}',
+                   self._h_cv_show))
+        # runs, plans, applies and plan exports
+        add(_Route('POST', f'{v2}/runs', self._h_run_create))
+        add(_Route('GET', f'{v2}/runs/{seg}', self._h_run_show))
+        add(_Route('GET', f'{v2}/workspaces/{seg}/runs', self._h_run_list))
+        add(_Route('POST', f'{v2}/runs/{seg}/actions/([a-z-]+)',
+                   self._h_run_action))
+        add(_Route('GET', f'{v2}/runs/{seg}/plan/json-output',
+                   self._h_run_plan_json))
+        add(_Route('GET', f'{v2}/plans/{seg}', self._h_plan_show))
+        add(_Route('GET', f'{v2}/plans/{seg}/json-output',
+                   self._h_plan_json))
+        add(_Route('GET', f'{v2}/applies/{seg}', self._h_apply_show))
+        add(_Route('POST', f'{v2}/plan-exports', self._h_pe_create))
+        add(_Route('GET', f'{v2}/plan-exports/{seg}', self._h_pe_show))
+        add(_Route('GET', f'{v2}/plan-exports/{seg}/download',
+                   self._h_pe_download))
+        add(_Route('DELETE', f'{v2}/plan-exports/{seg}', self._h_pe_delete))
+        # state versions
+        add(_Route('GET', f'{v2}/state-versions', self._h_sv_list))
+        add(_Route('GET', f'{v2}/state-versions/{seg}', self._h_sv_show))
+        add(_Route('POST', f'{v2}/workspaces/{seg}/state-versions',
+                   self._h_sv_create))
+        add(_Route('GET', f'{v2}/workspaces/{seg}/current-state-version',
+                   self._h_sv_current))
+        add(_Route('GET', f'{v2}/state-versions/{seg}/outputs',
+                   self._h_svo_list))
+        add(_Route('GET', f'{v2}/state-version-outputs/{seg}',
+                   self._h_svo_show))
+        add(_Route('GET',
+                   f'{v2}/workspaces/{seg}/current-state-version-outputs',
+                   self._h_svo_current))
+        # workspace variables
+        add(_Route('GET', f'{v2}/workspaces/{seg}/vars', self._h_var_list))
+        add(_Route('POST', f'{v2}/workspaces/{seg}/vars', self._h_var_create))
+        add(_Route('DELETE', f'{v2}/workspaces/{seg}/vars/{seg}',
+                   self._h_var_delete))
+        # variable sets
+        add(_Route('GET', f'{v2}/organizations/{seg}/varsets',
+                   self._h_varset_list))
+        add(_Route('POST', f'{v2}/organizations/{seg}/varsets',
+                   self._h_varset_create))
+        add(_Route('GET', f'{v2}/varsets/{seg}', self._h_varset_show))
+        add(_Route('DELETE', f'{v2}/varsets/{seg}', self._h_varset_delete))
+        add(_Route('POST', f'{v2}/varsets/{seg}/relationships/(workspaces|projects)',
+                   self._h_varset_relate))
+        add(_Route('DELETE', f'{v2}/varsets/{seg}/relationships/(workspaces|projects)',
+                   self._h_varset_unrelate))
+        # projects and teams
+        add(_Route('GET', f'{v2}/organizations/{seg}/projects',
+                   self._h_project_list))
+        add(_Route('POST', f'{v2}/organizations/{seg}/projects',
+                   self._h_project_create))
+        add(_Route('DELETE', f'{v2}/projects/{seg}', self._h_project_delete))
+        add(_Route('GET', f'{v2}/organizations/{seg}/teams',
+                   self._h_team_list))
+        add(_Route('GET', f'{v2}/teams/{seg}', self._h_team_show))
+        # notification configurations
+        add(_Route('POST',
+                   f'{v2}/workspaces/{seg}/notification-configurations',
+                   self._h_nc_create))
+        add(_Route('GET',
+                   f'{v2}/workspaces/{seg}/notification-configurations',
+                   self._h_nc_list))
+        # run task results
+        add(_Route('PATCH', f'{v2}/task-results/{seg}/callback',
+                   self._h_task_result_callback))
+        # admin
+        add(_Route('GET', f'{v2}/admin/organizations',
+                   self._h_admin_org_list))
+        add(_Route('GET', f'{v2}/admin/workspaces', self._h_admin_ws_list))
+        add(_Route('GET', f'{v2}/admin/workspaces/{seg}',
+                   self._h_admin_ws_show))
+        add(_Route('GET', f'{v2}/admin/runs', self._h_admin_run_list))
+        add(_Route('GET', f'{v2}/admin/users', self._h_admin_user_list))
+        add(_Route('GET', f'{v2}/admin/terraform-versions',
+                   self._h_admin_tfv_list))
+
+    def dispatch(self, req):
+        """
+        Routes a parsed request. Returns `(status, body, headers)`.
+        """
+        with self._lock:
+            self.request_count += 1
+            if self.log_requests:
+                self.request_log.append((req.method, req.path))
+            is_api = req.path.startswith('/api/v2')
+            throttled = False
+            if is_api and self._pending_429 > 0:
+                self._pending_429 -= 1
+                throttled = True
+            elif (is_api and self.rate_limit_every and
+                  self.request_count % self.rate_limit_every == 0):
+                throttled = True
+            object_error = None
+            if req.path.startswith('/_archivist/') and \
+                    self._pending_object_errors:
+                object_error = self._pending_object_errors.pop(0)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if throttled:
+            return 429, {'errors': [{'status': '429',
+                                     'title': 'Too many requests'}]}, \
+                {'Retry-After': str(self.retry_after)}
+
+        if object_error is not None:
+            return object_error, b'', {}
+
+        if req.path.startswith('/api/v2'):
+            auth = req.headers.get('Authorization', '')
+            if auth != f'Bearer {self.token}':
+                return 401, {'errors': [{'status': '401',
+                                         'title': 'unauthorized'}]}, {}
+
+        for route in self._routes:
+            if route.method != req.method:
+                continue
+            match = route.regex.match(req.path)
+            if match:
+                with self._lock:
+                    result = route.handler(req, *match.groups())
+                if len(result) == 2:
+                    return result[0], result[1], {}
+                return result
+        return 404, {'errors': [{'status': '404',
+                                 'title': 'route not found'}]}, {}
+
+    # ------------------------------------------------------------------
+    # Handlers: archivist
+    # ------------------------------------------------------------------
+    def _h_object_get(self, req, token):
+        obj = self.objects.get(token)
+        if obj is None:
+            return 404, b''
+        data = obj['data']
+        headers = {'Content-Type': 'application/octet-stream',
+                   'Accept-Ranges': 'bytes'}
+        status = 200
+        match = re.match(r'^bytes=(\d+)-(\d*)$', req.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(data) - 1
+            if start >= len(data):
+                return 416, b'', {'Content-Range': f'bytes */{len(data)}'}
+            end = min(end, len(data) - 1)
+            headers['Content-Range'] = f'bytes {start}-{end}/{len(data)}'
+            data = data[start:end + 1]
+            status = 206
+        if self._pending_truncations:
+            headers['X-Fake-Truncate-At'] = self._pending_truncations.pop(0)
+        return status, data, headers
+
+    def _h_object_put(self, req, token):
+        obj = self.objects.get(token)
+        if obj is None:
+            return 404, b''
+        obj['data'] = req.body
+        status = None
+        if obj['on_upload'] is not None:
+            # Upload hooks may reject the body by returning a status.
+            status = obj['on_upload'](req.body)
+        return status or 200, b''
+
+    # ------------------------------------------------------------------
+    # Handlers: organizations and workspaces
+    # ------------------------------------------------------------------
+    def _h_org_list(self, req):
+        return self._page(req, list(self.organizations.values()),
+                          self._ser_org)
+
+    def _h_org_show(self, req, org):
+        if org not in self.organizations:
+            return self._not_found()
+        return 200, {'data': self._ser_org(self.organizations[org])}
+
+    def _filter_ws(self, req, items):
+        name = req.param('search[name]')
+        if name:
+            items = [i for i in items if name in i['name']]
+        tags = req.param('search[tags]')
+        if tags:
+            wanted = set(tags.split(','))
+            items = [i for i in items if wanted.issubset(i['tag-names'])]
+        exclude = req.param('search[exclude-tags]')
+        if exclude:
+            unwanted = set(exclude.split(','))
+            items = [i for i in items if not unwanted & set(i['tag-names'])]
+        return items
+
+    def _h_ws_list(self, req, org):
+        if org not in self.organizations:
+            return self._not_found()
+        items = self._filter_ws(req, self._ws_by_org[org])
+        return self._page(req, items, self._ser_ws)
+
+    def _h_ws_create(self, req, org):
+        if org not in self.organizations:
+            return self._not_found()
+        data = req.json()['data']
+        attributes = data.get('attributes', {})
+        name = attributes.get('name')
+        if not name or (org, name) in self._ws_by_name:
+            return self._unprocessable('Name has already been taken')
+        extra = {}
+        for key in ('auto_apply', 'execution_mode', 'terraform_version',
+                    'working_directory'):
+            if key in attributes:
+                extra[key.replace('_', '-')] = attributes[key]
+        project = data.get('relationships', {}).get('project')
+        if project:
+            extra['project-id'] = project['data']['id']
+        ws_id = self.seed_workspace(org, name, **extra)
+        return 201, {'data': self._ser_ws(self.workspaces[ws_id])}
+
+    def _h_ws_show_by_name(self, req, org, name):
+        ws = self._ws_by_name.get((org, name))
+        if ws is None:
+            return self._not_found()
+        return 200, {'data': self._ser_ws(ws)}
+
+    def _h_ws_update(self, req, org, name):
+        ws = self._ws_by_name.get((org, name))
+        if ws is None:
+            return self._not_found()
+        attributes = req.json()['data'].get('attributes', {})
+        for key, value in attributes.items():
+            key = key.replace('_', '-')
+            if key == 'name':
+                del self._ws_by_name[(org, ws['name'])]
+                self._ws_by_name[(org, value)] = ws
+            if key in ws:
+                ws[key] = value
+        return 200, {'data': self._ser_ws(ws)}
+
+    def _h_ws_delete(self, req, org, name):
+        ws = self._ws_by_name.pop((org, name), None)
+        if ws is None:
+            return self._not_found()
+        del self.workspaces[ws['id']]
+        self._ws_by_org[org].remove(ws)
+        return 204, b''
+
+    def _h_ws_show(self, req, ws_id):
+        ws = self.workspaces.get(ws_id)
+        if ws is None:
+            return self._not_found()
+        return 200, {'data': self._ser_ws(ws)}
+
+    def _h_ws_lock(self, req, ws_id, action):
+        ws = self.workspaces.get(ws_id)
+        if ws is None:
+            return self._not_found()
+        if action == 'lock' and ws['locked']:
+            return 409, {'errors': [{'status': '409',
+                                     'title': 'conflict'}]}
+        ws['locked'] = action == 'lock'
+        return 200, {'data': self._ser_ws(ws)}
+
+    # ------------------------------------------------------------------
+    # Handlers: configuration versions
+    # ------------------------------------------------------------------
+    def _h_cv_list(self, req, ws_id):
+        if ws_id not in self.workspaces:
+            return self._not_found()
+        items = [cv for cv in self.configuration_versions.values()
+                 if cv['ws_id'] == ws_id]
+        items.reverse()
+        return self._page(req, items, self._ser_cv)
+
+    def _h_cv_create(self, req, ws_id):
+        if ws_id not in self.workspaces:
+            return self._not_found()
+        attributes = req.json().get('data', {}).get('attributes', {})
+        cv_id = _new_id('cv')
+        cv = {
+            'id': cv_id,
+            'ws_id': ws_id,
+            'auto-queue-runs': attributes.get('auto-queue-runs', True),
+            'speculative': attributes.get('speculative', False),
+            'uploaded_at': None,
+            'size': None,
+        }
+        cv['upload_token'] = self._put_object(
+            on_upload=lambda data: self._on_cv_upload(cv_id, data))
+        self.configuration_versions[cv_id] = cv
+        return 201, {'data': self._ser_cv(cv)}
+
+    def _h_cv_show(self, req, cv_id):
+        cv = self.configuration_versions.get(cv_id)
+        if cv is None:
+            return self._not_found()
+        return 200, {'data': self._ser_cv(cv)}
+
+    # ------------------------------------------------------------------
+    # Handlers: runs, plans, applies and plan exports
+    # ------------------------------------------------------------------
+    def _h_run_create(self, req):
+        data = req.json()['data']
+        attributes = data.get('attributes', {})
+        relationships = data.get('relationships', {})
+        ws_id = relationships['workspace']['data']['id']
+        if ws_id not in self.workspaces:
+            return self._not_found()
+        cv = relationships.get('configuration-version', {}).get('data')
+        extra = {}
+        for key in ('message', 'auto-apply', 'plan-only', 'is-destroy'):
+            if attributes.get(key) is not None:
+                extra[key] = attributes[key]
+        run_id = self.seed_run(ws_id, cv_id=cv['id'] if cv else None,
+                               **extra)
+        return 201, {'data': self._ser_run(self.runs[run_id])}
+
+    def _h_run_show(self, req, run_id):
+        run = self.runs.get(run_id)
+        if run is None:
+            return self._not_found()
+        return 200, {'data': self._ser_run(run)}
+
+    def _filter_runs(self, req, items):
+        status = req.param('filter[status]')
+        if status:
+            wanted = set(status.split(','))
+            items = [r for r in items if self.run_status(r) in wanted]
+        return items
+
+    def _h_run_list(self, req, ws_id):
+        if ws_id not in self.workspaces:
+            return self._not_found()
+        items = [r for r in self.runs.values() if r['ws_id'] == ws_id]
+        items.reverse()
+        return self._page(req, self._filter_runs(req, items), self._ser_run)
+
+    def _h_run_action(self, req, run_id, action):
+        run = self.runs.get(run_id)
+        if run is None:
+            return self._not_found()
+        if action == 'apply':
+            if self.run_status(run) != 'planned':
+                return 409, {'errors': [{'status': '409',
+                                         'title': 'transition not allowed'}]}
+            run['applied_at'] = time.monotonic()
+            run['started'] = time.monotonic() - \
+                self.run_step_seconds * len(RUN_STATUS_FLOW)
+        elif action == 'discard':
+            run['status'] = 'discarded'
+        elif action in ('cancel', 'force-cancel'):
+            run['status'] = 'canceled'
+        return 202, b''
+
+    def _plan_json(self, plan):
+        if plan['json'] is not None:
+            return plan['json']
+        if self._default_plan_json is not None:
+            return self._default_plan_json
+        return {'format_version': '1.2', 'resource_changes': [],
+                'output_changes': {}}
+
+    def _h_run_plan_json(self, req, run_id):
+        run = self.runs.get(run_id)
+        if run is None:
+            return self._not_found()
+        if self.run_status(run) in PLAN_PENDING_STATUSES:
+            return 204, b''
+        return 200, self._plan_json(self.plans[run['plan_id']])
+
+    def _h_plan_show(self, req, plan_id):
+        plan = self.plans.get(plan_id)
+        if plan is None:
+            return self._not_found()
+        return 200, {'data': self._ser_plan(plan)}
+
+    def _h_plan_json(self, req, plan_id):
+        plan = self.plans.get(plan_id)
+        if plan is None:
+            return self._not_found()
+        if self.run_status(self.runs[plan['run_id']]) in \
+                PLAN_PENDING_STATUSES:
+            return 204, b''
+        return 200, self._plan_json(plan)
+
+    def _h_apply_show(self, req, apply_id):
+        apply = self.applies.get(apply_id)
+        if apply is None:
+            return self._not_found()
+        return 200, {'data': self._ser_apply(apply)}
+
+    def _mock_bundle(self, plan_id):
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+            for name in ('mock-tfconfig-v2.sentinel', 'mock-tfplan-v2.sentinel',
+                         'mock-tfrun.sentinel', 'mock-tfstate-v2.sentinel',
+                         'sentinel.hcl'):
+                content = f'# {name} for {plan_id}\n'.encode('utf-8')
+                info = tarfile.TarInfo(name=name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+        return buf.getvalue()
+
+    def _h_pe_create(self, req):
+        data = req.json()['data']
+        plan_id = data['relationships']['plan']['data']['id']
+        plan = self.plans.get(plan_id)
+        if plan is None:
+            return self._not_found()
+        pe_id = _new_id('pe')
+        self.plan_exports[pe_id] = {
+            'id': pe_id,
+            'plan_id': plan_id,
+            'token': self._put_object(self._mock_bundle(plan_id)),
+        }
+        plan['export_ids'].append(pe_id)
+        return 201, {'data': self._ser_pe(self.plan_exports[pe_id])}
+
+    def _h_pe_show(self, req, pe_id):
+        pe = self.plan_exports.get(pe_id)
+        if pe is None:
+            return self._not_found()
+        return 200, {'data': self._ser_pe(pe)}
+
+    def _h_pe_download(self, req, pe_id):
+        pe = self.plan_exports.get(pe_id)
+        if pe is None:
+            return self._not_found()
+        return 302, b'', {'Location': self.object_url(pe['token'])}
+
+    def _h_pe_delete(self, req, pe_id):
+        pe = self.plan_exports.pop(pe_id, None)
+        if pe is None:
+            return self._not_found()
+        self.plans[pe['plan_id']]['export_ids'].remove(pe_id)
+        return 204, b''
+
+    # ------------------------------------------------------------------
+    # Handlers: state versions and outputs
+    # ------------------------------------------------------------------
+    def _h_sv_list(self, req):
+        org = req.param('filter[organization][name]')
+        name = req.param('filter[workspace][name]')
+        ws = self._ws_by_name.get((org, name))
+        if ws is None:
+            return self._not_found()
+        items = [sv for sv in self.state_versions.values()
+                 if sv['ws_id'] == ws['id']]
+        items.reverse()
+        return self._page(req, items, self._ser_sv)
+
+    def _h_sv_show(self, req, sv_id):
+        sv = self.state_versions.get(sv_id)
+        if sv is None:
+            return self._not_found()
+        return 200, {'data': self._ser_sv(sv)}
+
+    def _h_sv_create(self, req, ws_id):
+        if ws_id not in self.workspaces:
+            return self._not_found()
+        attributes = req.json()['data']['attributes']
+        state = attributes.get('state')
+        if state is None:
+            return self._sv_create_pending(ws_id, attributes)
+        raw = base64.b64decode(state)
+        if hashlib.md5(raw).hexdigest() != attributes.get('md5'):
+            return self._unprocessable('md5 does not match state')
+        sv_id = self.seed_state_version(ws_id, raw,
+                                        serial=attributes.get('serial'),
+                                        lineage=attributes.get('lineage'))
+        return 201, {'data': self._ser_sv(self.state_versions[sv_id])}
+
+    def _sv_create_pending(self, ws_id, attributes):
+        """
+        State Version created without `state`: the body is uploaded
+        afterwards to its `hosted-state-upload-url`.
+        """
+        if not attributes.get('md5') or attributes.get('serial') is None:
+            return self._unprocessable('md5 and serial are required')
+        sv_id = _new_id('sv')
+        sv = {
+            'id': sv_id,
+            'ws_id': ws_id,
+            'created-at': _now(),
+            'serial': attributes['serial'],
+            'lineage': attributes.get('lineage'),
+            'md5': attributes['md5'],
+            'size': None,
+            'download_token': None,
+            'output_ids': [],
+        }
+        sv['upload_token'] = self._put_object(
+            on_upload=lambda data: self._on_sv_upload(sv_id, data))
+        self.state_versions[sv_id] = sv
+        return 201, {'data': self._ser_sv(sv)}
+
+    def _on_sv_upload(self, sv_id, data):
+        sv = self.state_versions[sv_id]
+        if hashlib.md5(data).hexdigest() != sv['md5']:
+            return 422
+        try:
+            outputs = json.loads(data).get('outputs', {})
+        except ValueError:
+            outputs = {}
+        sv['size'] = len(data)
+        sv['download_token'] = self._put_object(data)
+        sv['upload_token'] = None
+        self._add_sv_outputs(sv, outputs)
+        self.workspaces[sv['ws_id']]['current-state-version-id'] = sv_id
+        return None
+
+    def _h_sv_current(self, req, ws_id):
+        ws = self.workspaces.get(ws_id)
+        if ws is None or ws['current-state-version-id'] is None:
+            return self._not_found()
+        sv = self.state_versions[ws['current-state-version-id']]
+        return 200, {'data': self._ser_sv(sv)}
+
+    def _h_svo_list(self, req, sv_id):
+        sv = self.state_versions.get(sv_id)
+        if sv is None:
+            return self._not_found()
+        items = [self.state_version_outputs[i] for i in sv['output_ids']]
+        return self._page(req, items, self._ser_svo)
+
+    def _h_svo_show(self, req, svo_id):
+        svo = self.state_version_outputs.get(svo_id)
+        if svo is None:
+            return self._not_found()
+        return 200, {'data': self._ser_svo(svo)}
+
+    def _h_svo_current(self, req, ws_id):
+        ws = self.workspaces.get(ws_id)
+        if ws is None or ws['current-state-version-id'] is None:
+            return self._not_found()
+        sv = self.state_versions[ws['current-state-version-id']]
+        items = [self.state_version_outputs[i] for i in sv['output_ids']]
+        return self._page(req, items, self._ser_svo)
+
+    # ------------------------------------------------------------------
+    # Handlers: workspace variables and variable sets
+    # ------------------------------------------------------------------
+    def _h_var_list(self, req, ws_id):
+        if ws_id not in self.workspaces:
+            return self._not_found()
+        items = [v for v in self.vars.values() if v['ws_id'] == ws_id]
+        return 200, {'data': [self._ser_var(v) for v in items]}
+
+    def _h_var_create(self, req, ws_id):
+        if ws_id not in self.workspaces:
+            return self._not_found()
+        attributes = req.json()['data']['attributes']
+        key = attributes.get('key')
+        if any(v['ws_id'] == ws_id and v['attributes']['key'] == key
+               for v in self.vars.values()):
+            return self._unprocessable('Key has already been taken')
+        var_id = _new_id('var')
+        self.vars[var_id] = {'id': var_id, 'ws_id': ws_id,
+                             'attributes': attributes}
+        return 201, {'data': self._ser_var(self.vars[var_id])}
+
+    def _h_var_delete(self, req, ws_id, var_id):
+        var = self.vars.get(var_id)
+        if var is None or var['ws_id'] != ws_id:
+            return self._not_found()
+        del self.vars[var_id]
+        return 204, b''
+
+    def _h_varset_list(self, req, org):
+        items = [vs for vs in self.varsets.values() if vs['org'] == org]
+        return self._page(req, items, self._ser_varset)
+
+    def _h_varset_create(self, req, org):
+        data = req.json()['data']
+        attributes = data['attributes']
+        relationships = data.get('relationships', {})
+        varset_id = _new_id('varset')
+        var_ids = []
+        for var in relationships.get('vars', {}).get('data', []):
+            var_id = _new_id('var')
+            self.vars[var_id] = {'id': var_id, 'ws_id': None,
+                                 'attributes': var['attributes']}
+            var_ids.append(var_id)
+        self.varsets[varset_id] = {
+            'id': varset_id,
+            'org': org,
+            'name': attributes['name'],
+            'description': attributes.get('description'),
+            'global': attributes.get('global', False),
+            'workspace_ids': [w['id'] for w in relationships.get(
+                'workspaces', {}).get('data', [])],
+            'project_ids': [],
+            'var_ids': var_ids,
+        }
+        return 201, {'data': self._ser_varset(self.varsets[varset_id])}
+
+    def _h_varset_show(self, req, varset_id):
+        vs = self.varsets.get(varset_id)
+        if vs is None:
+            return self._not_found()
+        return 200, {'data': self._ser_varset(vs)}
+
+    def _h_varset_delete(self, req, varset_id):
+        vs = self.varsets.pop(varset_id, None)
+        if vs is None:
+            return self._not_found()
+        for var_id in vs['var_ids']:
+            self.vars.pop(var_id, None)
+        return 204, b''
+
+    def _h_varset_relate(self, req, varset_id, kind):
+        vs = self.varsets.get(varset_id)
+        if vs is None:
+            return self._not_found()
+        ids = vs['workspace_ids' if kind == 'workspaces' else 'project_ids']
+        for item in req.json()['data']:
+            if item['id'] not in ids:
+                ids.append(item['id'])
+        return 204, b''
+
+    def _h_varset_unrelate(self, req, varset_id, kind):
+        vs = self.varsets.get(varset_id)
+        if vs is None:
+            return self._not_found()
+        ids = vs['workspace_ids' if kind == 'workspaces' else 'project_ids']
+        for item in req.json()['data']:
+            if item['id'] in ids:
+                ids.remove(item['id'])
+        return 204, b''
+
+    # ------------------------------------------------------------------
+    # Handlers: projects, teams and notification configurations
+    # ------------------------------------------------------------------
+    def _h_project_list(self, req, org):
+        items = [p for p in self.projects.values() if p['org'] == org]
+        query = req.param('q')
+        if query:
+            items = [p for p in items if query in p['name']]
+        return self._page(req, items, self._ser_project)
+
+    def _h_project_create(self, req, org):
+        name = req.json()['data']['attributes']['name']
+        prj_id = self.seed_project(org=org, name=name)
+        return 201, {'data': self._ser_project(self.projects[prj_id])}
+
+    def _h_project_delete(self, req, prj_id):
+        if self.projects.pop(prj_id, None) is None:
+            return self._not_found()
+        return 204, b''
+
+    def seed_team(self, org, name):
+        with self._lock:
+            team_id = _new_id('team')
+            self.teams[team_id] = {'id': team_id, 'org': org, 'name': name}
+            return team_id
+
+    def _h_team_list(self, req, org):
+        items = [t for t in self.teams.values() if t['org'] == org]
+        names = req.param('filter[names]')
+        if names:
+            wanted = set(names.split(','))
+            items = [t for t in items if t['name'] in wanted]
+        return self._page(req, items, self._ser_team)
+
+    def _h_team_show(self, req, team_id):
+        team = self.teams.get(team_id)
+        if team is None:
+            return self._not_found()
+        return 200, {'data': self._ser_team(team)}
+
+    def _h_nc_create(self, req, ws_id):
+        if ws_id not in self.workspaces:
+            return self._not_found()
+        attributes = req.json()['data']['attributes']
+        nc_id = _new_id('nc')
+        self.notification_configurations[nc_id] = {
+            'id': nc_id, 'ws_id': ws_id, 'attributes': attributes}
+        return 201, {'data': self._ser_nc(
+            self.notification_configurations[nc_id])}
+
+    def _h_nc_list(self, req, ws_id):
+        items = [nc for nc in self.notification_configurations.values()
+                 if nc['ws_id'] == ws_id]
+        return self._page(req, items, self._ser_nc)
+
+    def _h_task_result_callback(self, req, result_id):
+        attributes = req.json().get('data', {}).get('attributes', {})
+        self.task_results.setdefault(result_id, []).append(attributes)
+        return 200, b''
+
+    # ------------------------------------------------------------------
+    # Handlers: admin
+    # ------------------------------------------------------------------
+    def _h_admin_org_list(self, req):
+        items = list(self.organizations.values())
+        query = req.param('q')
+        if query:
+            items = [o for o in items if query in o['name']]
+        return self._page(req, items, self._ser_org)
+
+    def _h_admin_ws_list(self, req):
+        items = list(self.workspaces.values())
+        query = req.param('q')
+        if query:
+            items = [w for w in items if query in w['name']]
+        return self._page(req, items, self._ser_ws)
+
+    def _h_admin_ws_show(self, req, ws_id):
+        return self._h_ws_show(req, ws_id)
+
+    def _h_admin_run_list(self, req):
+        items = list(self.runs.values())
+        items.reverse()
+        return self._page(req, self._filter_runs(req, items), self._ser_run)
+
+    def _h_admin_user_list(self, req):
+        items = list(self.users.values())
+        return self._page(req, items, lambda u: {
+            'id': u['id'], 'type': 'users',
+            'attributes': {'username': u['username']}})
+
+    def _h_admin_tfv_list(self, req):
+        items = list(self.terraform_versions.values())
+        return self._page(req, items, lambda v: {
+            'id': v['id'], 'type': 'terraform-versions',
+            'attributes': {'version': v['version']}})
+
+
+class _FakeRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP/1.1 request handler that delegates to a `FakeTfcServer`.
+    """
+    protocol_version = 'HTTP/1.1'
+    server_fake = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b''.join(chunks)
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _handle(self):
+        parts = urlsplit(self.path)
+        req = _FakeRequest(
+            method=self.command,
+            path=parts.path,
+            query=parse_qs(parts.query),
+            headers=self.headers,
+            body=self._read_body(),
+        )
+        try:
+            status, body, headers = self.server_fake.dispatch(req)
+        except Exception as e:
+            status, body, headers = 500, {'errors': [{
+                'status': '500', 'title': type(e).__name__,
+                'detail': str(e)}]}, {}
+
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+            headers.setdefault('Content-Type', 'application/vnd.api+json')
+        truncate_at = headers.pop('X-Fake-Truncate-At', None)
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+        if truncate_at is not None:
+            self.wfile.write(body[:truncate_at])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_PUT = _handle
+    do_PATCH = _handle
+    do_DELETE = _handle
@@ -1,7 +1,6 @@
 """Base module used by all pytfc api 'child' modules."""
-import logging
-import sys
 from abc import ABCMeta
+from pytfc.utils import get_logger
 
 #logger = logging.getLogger(__name__)
 
@@ -13,16 +12,32 @@ class TfcApiBase:
 
     __metaclass__ = ABCMeta
 
-    def __init__(self, requestor, org, ws, ws_id, log_level):
+    def __init__(self, requestor, org, ws, ws_id, log_level,
+                 ws_id_resolver=None, cache=None):
         """
         TFC/E API 'child' class constructor.
+
+        `ws_id_resolver` is an optional callable used to look up
+        `ws_id` on first use when it is not known up front.
+        `cache` is an optional `pytfc.cache.DiskCache` used by
+        endpoints that download immutable artifacts.
         """
-        self._logger = logging.getLogger(self.__class__.__name__)
-        self._logger.setLevel(log_level)
-        self._logger.addHandler(logging.StreamHandler(sys.stdout))
+        self._logger = get_logger(self.__class__.__name__, log_level)
 
         self._requestor = requestor
         self.org = org
         self.ws = ws
         self.ws_id = ws_id
-        self.log_level = log_level
\ No newline at end of file
+        self.log_level = log_level
+        self._ws_id_resolver = ws_id_resolver
+        self._cache = cache
+
+    @property
+    def ws_id(self):
+        if self._ws_id is None and self._ws_id_resolver is not None:
+            self._ws_id = self._ws_id_resolver()
+        return self._ws_id
+
+    @ws_id.setter
+    def ws_id(self, value):
+        self._ws_id = value
\ No newline at end of file
@@ -0,0 +1,244 @@
+"""
+Helpers for large object transfers (archivist uploads and downloads):
+progress reporting, bandwidth throttling and transient-failure detection.
+Also provides the request rate limiter and retry loop used by bulk API
+helpers that issue many calls concurrently.
+"""
+import io
+import threading
+import time
+from pytfc import deadline
+from pytfc.exceptions import DeadlineExceeded
+
+# Constants
+TRANSFER_CHUNK_SIZE = 64 * 1024
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+DEFAULT_RATE_LIMIT = 30 # TFC/E API requests per second per token
+
+
+class BandwidthLimiter:
+    """
+    Thread-safe token bucket limiting throughput to `bytes_per_second`.
+    One limiter can be shared by concurrent transfers to cap their
+    combined bandwidth.
+    """
+    def __init__(self, bytes_per_second, burst=None):
+        if bytes_per_second <= 0:
+            raise ValueError("`bytes_per_second` must be positive.")
+        self.rate = float(bytes_per_second)
+        self.burst = float(burst if burst else bytes_per_second)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, size):
+        """
+        Blocks until `size` bytes may be sent.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= size
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            deadline.sleep(wait)
+
+
+class RateLimiter(BandwidthLimiter):
+    """
+    Thread-safe token bucket limiting calls to `calls_per_second`.
+    Share one limiter between threads to cap their combined rate.
+    """
+    def acquire(self):
+        """
+        Blocks until one more call may be made.
+        """
+        self.consume(1)
+
+
+def as_limiter(bandwidth):
+    """
+    Returns a `BandwidthLimiter` for `bandwidth` (bytes per second,
+    an existing limiter, or `None` for unlimited).
+    """
+    if bandwidth is None or isinstance(bandwidth, BandwidthLimiter):
+        return bandwidth
+    return BandwidthLimiter(bandwidth)
+
+
+class ProgressReader:
+    """
+    File-like wrapper that reports progress and applies a bandwidth
+    limit as the HTTP client reads a request body from `fileobj`.
+
+    `progress(bytes_sent, total_bytes)` is called after every read;
+    `total_bytes` is `None` when the size is unknown.
+    """
+    def __init__(self, fileobj, total=None, progress=None, limiter=None):
+        self._fileobj = fileobj
+        self._start = fileobj.tell() if _seekable(fileobj) else 0
+        self.total = total
+        self.sent = 0
+        self._progress = progress
+        self._limiter = limiter
+
+    def __len__(self):
+        return self.total if self.total is not None else 0
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(TRANSFER_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def tell(self):
+        return self.sent
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = TRANSFER_CHUNK_SIZE
+        chunk = self._fileobj.read(size)
+        if chunk:
+            if self._limiter is not None:
+                self._limiter.consume(len(chunk))
+            self.sent += len(chunk)
+            if self._progress is not None:
+                self._progress(self.sent, self.total)
+        return chunk
+
+    def rewind(self):
+        """
+        Seeks back to where the body started, for a retry.
+        """
+        self._fileobj.seek(self._start)
+        self.sent = 0
+
+
+class IterStream(io.RawIOBase):
+    """
+    Read-only file object over an iterable of byte chunks, so that a
+    streamed download can be handed to `tarfile`, `gzip` and the like
+    without buffering it.
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._pending:
+            self._pending = next(self._chunks, None)
+            if self._pending is None:
+                self._pending = b''
+                return 0
+        size = min(len(b), len(self._pending))
+        b[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def iter_progress(chunks, total=None, progress=None, limiter=None):
+    """
+    Generator counterpart of `ProgressReader` for streamed bodies.
+    """
+    sent = 0
+    for chunk in chunks:
+        if limiter is not None:
+            limiter.consume(len(chunk))
+        sent += len(chunk)
+        if progress is not None:
+            progress(sent, total)
+        yield chunk
+
+
+def _seekable(fileobj):
+    try:
+        return fileobj.seekable()
+    except AttributeError:
+        return hasattr(fileobj, 'seek') and hasattr(fileobj, 'tell')
+
+
+def body_size(fileobj):
+    """
+    Bytes remaining in a seekable file object.
+    """
+    if hasattr(fileobj, '__len__'):
+        return len(fileobj) - fileobj.tell()
+    position = fileobj.tell()
+    end = fileobj.seek(0, io.SEEK_END)
+    fileobj.seek(position)
+    return end - position
+
+
+def wrap_body(data, progress=None, limiter=None):
+    """
+    Wraps an upload body for progress and throttling. Returns
+    `(body, rewindable)`; only rewindable bodies can be retried.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = io.BytesIO(data)
+    if hasattr(data, 'read') and _seekable(data):
+        return ProgressReader(data, total=body_size(data), progress=progress,
+                              limiter=limiter), True
+    if hasattr(data, 'read'):
+        return ProgressReader(data, progress=progress, limiter=limiter), False
+    if progress is None and limiter is None:
+        return data, False
+    return iter_progress(data, progress=progress, limiter=limiter), False
+
+
+def is_transient(exc):
+    """
+    Whether an exception from `requests` is worth retrying.
+    """
+    import requests
+    if isinstance(exc, requests.exceptions.HTTPError):
+        response = exc.response
+        return response is not None and \
+            response.status_code in TRANSIENT_STATUS_CODES
+    return isinstance(exc, (requests.exceptions.ConnectionError,
+                            requests.exceptions.Timeout,
+                            requests.exceptions.ChunkedEncodingError))
+
+
+def retry_after(exc, default):
+    """
+    Seconds to wait before retrying, honoring a `Retry-After` header.
+    """
+    response = getattr(exc, 'response', None)
+    if response is not None:
+        try:
+            return float(response.headers.get('Retry-After', default))
+        except ValueError:
+            pass
+    return default
+
+
+def retry_call(func, retries=5, backoff=0.5, limiter=None, logger=None):
+    """
+    Calls `func()` (one API request), waiting for `limiter` first, and
+    retries transient failures such as HTTP 429 up to `retries` times,
+    honoring `Retry-After` or backing off exponentially.
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return func()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if attempt >= retries or not is_transient(e):
+                raise
+            wait = retry_after(e, backoff * 2 ** attempt)
+            attempt += 1
+            if logger is not None:
+                logger.warning(f"Request failed ({e}); retry"
+                               f" {attempt}/{retries} in {wait}s.")
+            deadline.sleep(wait)
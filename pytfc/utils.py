@@ -1,9 +1,23 @@
 import functools
+import logging
+import sys
 from pytfc import exceptions
 
 # Constants
 DEFAULT_LOG_LEVEL = 'WARNING'
 
+def get_logger(name, level):
+    """
+    Returns the named logger set to `level`, attaching a stdout
+    handler only once so repeated client construction does not
+    stack duplicate handlers.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler(sys.stdout))
+    return logger
+
 def validate_ws_is_set(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
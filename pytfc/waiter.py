@@ -0,0 +1,84 @@
+"""
+Adaptive status polling for long-running TFC/E objects.
+
+A `Waiter` calls a `poll` function (one GET per call) until an `until`
+predicate is satisfied. Delays grow exponentially with jitter while the
+observed state is unchanged and drop back to the initial delay whenever
+it changes, so active objects are checked often and idle ones cheaply.
+Waits honor `timeout` as well as any active deadline (see
+`pytfc.deadline`) and raise `DeadlineExceeded` when either runs out.
+"""
+import random
+from pytfc import deadline
+
+# Constants
+RUN_FINAL_STATUSES = (
+    'planned_and_finished', 'planned_and_saved', 'applied', 'discarded',
+    'errored', 'canceled', 'force_canceled', 'policy_soft_failed',
+)
+RUN_WAITING_STATUSES = (
+    'planned', 'cost_estimated', 'policy_checked', 'policy_override',
+    'post_plan_completed',
+)
+APPLY_FINAL_STATUSES = ('finished', 'errored', 'canceled', 'unreachable')
+PLAN_EXPORT_FINAL_STATUSES = ('finished', 'errored', 'expired', 'canceled')
+
+
+class Waiter:
+    """
+    Polls until a condition is met, with exponential backoff and jitter.
+
+    `on_change(previous, current)` is called whenever the polled state
+    differs from the previous poll (`previous` is `None` on the first).
+    """
+    def __init__(self, initial_delay=0.5, max_delay=10, multiplier=1.5,
+                 jitter=0.2, timeout=None, on_change=None):
+        if initial_delay <= 0 or max_delay < initial_delay:
+            raise ValueError("Require 0 < `initial_delay` <= `max_delay`.")
+        if not 0 <= jitter < 1:
+            raise ValueError("`jitter` must be between 0 and 1.")
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.timeout = timeout
+        self.on_change = on_change
+        self.polls = 0
+
+    def _sleep_time(self, delay):
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def wait(self, poll, until, key=None):
+        """
+        Calls `poll()` until `until(result)` is true and returns the last
+        result. `key(result)` selects the value compared for state changes
+        (defaults to the result itself).
+        """
+        key = key if key else (lambda result: result)
+        self.polls = 0
+        with deadline.deadline_scope(self.timeout):
+            delay = self.initial_delay
+            previous = None
+            while True:
+                result = poll()
+                self.polls += 1
+                state = key(result)
+                if self.polls == 1 or state != previous:
+                    if self.on_change is not None:
+                        self.on_change(previous, state)
+                    delay = self.initial_delay
+                    previous = state
+                if until(result):
+                    return result
+                deadline.sleep(self._sleep_time(delay))
+                delay = min(delay * self.multiplier, self.max_delay)
+
+
+def get_waiter(waiter=None, timeout=None, on_change=None, **kwargs):
+    """
+    Returns `waiter` if given, otherwise a new `Waiter` built from the
+    remaining arguments (`kwargs` are per-object tuned defaults).
+    """
+    if waiter is not None:
+        return waiter
+    return Waiter(timeout=timeout, on_change=on_change, **kwargs)
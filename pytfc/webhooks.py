@@ -0,0 +1,157 @@
+"""
+Receiver for TFC/E notification webhooks (generic destination type).
+
+`WebhookReceiver` verifies the `X-TFE-Notification-Signature` HMAC of
+each delivery, turns the notifications into run status updates and
+forwards them to subscribers: callbacks, `RunWatcher`s (see
+`pytfc.run_watcher`) and blocking `wait_for_run()` calls. It can run
+its own small threaded HTTP server or be embedded in an existing web
+application through `handle()` (see `pytfc.http_receiver`).
+
+Register the receiver on Workspaces with
+`NotificationConfigurations.register_webhook()`.
+"""
+import json
+import threading
+from collections import namedtuple
+from pytfc import deadline
+from pytfc.http_receiver import DEFAULT_HOST, SignedJsonReceiver, sign
+from pytfc.utils import DEFAULT_LOG_LEVEL
+from pytfc.waiter import RUN_FINAL_STATUSES
+
+__all__ = ['RUN_TRIGGERS', 'SIGNATURE_HEADER', 'RunNotification',
+           'WebhookReceiver', 'parse_notifications', 'sign']
+
+# Constants
+SIGNATURE_HEADER = 'X-TFE-Notification-Signature'
+RUN_TRIGGERS = ['run:created', 'run:planning', 'run:needs_attention',
+                'run:applying', 'run:completed', 'run:errored']
+
+RunNotification = namedtuple(
+    'RunNotification',
+    ['run_id', 'ws_id', 'ws_name', 'org', 'status', 'trigger', 'payload'])
+RunNotification.__doc__ = """
+One run status update from a notification delivery.
+"""
+
+
+def parse_notifications(payload):
+    """
+    Converts a notification payload (dict) into `RunNotification`s.
+    Verification deliveries (no Run) produce none.
+    """
+    run_id = payload.get('run_id')
+    if not run_id:
+        return []
+    return [
+        RunNotification(run_id, payload.get('workspace_id'),
+                        payload.get('workspace_name'),
+                        payload.get('organization_name'),
+                        n.get('run_status'), n.get('trigger'), payload)
+        for n in payload.get('notifications') or []
+        if n.get('run_status')
+    ]
+
+
+class WebhookReceiver(SignedJsonReceiver):
+    """
+    Consumes TFC/E notification deliveries and dispatches run status
+    updates. `token` is the notification configuration token used for
+    HMAC verification and is required; unsigned deliveries are only
+    accepted with an explicit `verify=False`. The embedded server
+    listens on `host` (loopback by default).
+    """
+    signature_header = SIGNATURE_HEADER
+    thread_name = 'pytfc-webhook-receiver'
+
+    def __init__(self, token=None, host=DEFAULT_HOST, port=0, path='/',
+                 verify=True, log_level=DEFAULT_LOG_LEVEL):
+        super().__init__(key=token, verify=verify, host=host, port=port,
+                         path=path, log_level=log_level)
+        self.token = token
+        self.received = 0
+        self.rejected = 0
+        self._subscribers = []
+        self._statuses = {}
+        self._changed = threading.Condition()
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+    def subscribe(self, callback):
+        """
+        Calls `callback(notification)` for every `RunNotification`.
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    def attach(self, watcher):
+        """
+        Feeds run status updates into a `RunWatcher`.
+        """
+        return self.subscribe(lambda n: watcher.push(
+            n.run_id, n.status, ws_id=n.ws_id,
+            needs_attention=n.trigger == 'run:needs_attention'))
+
+    def status(self, run_id):
+        """
+        Last status pushed for `run_id`, or `None`.
+        """
+        with self._changed:
+            return self._statuses.get(run_id)
+
+    def wait_for_run(self, run_id, statuses=RUN_FINAL_STATUSES, timeout=None):
+        """
+        Blocks until a notification reports `run_id` in one of
+        `statuses`. Raises `DeadlineExceeded` after `timeout`.
+
+        Returns the status.
+        """
+        with deadline.deadline_scope(timeout) as active:
+            with self._changed:
+                while self._statuses.get(run_id) not in statuses:
+                    if active is not None:
+                        active.check()
+                    self._changed.wait(
+                        active.remaining() if active is not None else None)
+                return self._statuses[run_id]
+
+    # ------------------------------------------------------------------
+    # Delivery handling
+    # ------------------------------------------------------------------
+    def handle(self, body, signature=None):
+        """
+        Processes one delivery (raw `body` bytes and the value of the
+        `X-TFE-Notification-Signature` header). Use this to embed the
+        receiver in another web framework.
+
+        Returns the HTTP status code to answer with.
+        """
+        if not self.verify_signature(body, signature):
+            self._count('rejected')
+            self._logger.warning("Rejected notification with an invalid"
+                                 " signature.")
+            return 401
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            self._count('rejected')
+            return 400
+        self._count('received')
+
+        notifications = parse_notifications(payload)
+        for notification in notifications:
+            self._logger.debug(f"Run `{notification.run_id}` is"
+                               f" `{notification.status}`"
+                               f" ({notification.trigger}).")
+            with self._changed:
+                self._statuses[notification.run_id] = notification.status
+                self._changed.notify_all()
+            for callback in list(self._subscribers):
+                try:
+                    callback(notification)
+                except Exception as e:
+                    self._logger.error(f"Notification subscriber failed: {e}")
+        return 200
@@ -0,0 +1,211 @@
+import gzip
+import io
+import os
+import random
+import tarfile
+import pytest
+from pytfc.bundle import ConfigurationBundle, TerraformIgnore, parallel_gzip
+from pytfc.exceptions import FanOutError
+
+
+def _make_tree(root):
+    (root / 'main.tf').write_text('terraform {}\n')
+    (root / 'modules' / 'net').mkdir(parents=True)
+    (root / 'modules' / 'net' / 'main.tf').write_text('# net\n')
+    (root / '.git').mkdir()
+    (root / '.git' / 'HEAD').write_text('ref: refs/heads/main\n')
+    (root / '.terraform' / 'providers').mkdir(parents=True)
+    (root / '.terraform' / 'providers' / 'bin').write_bytes(b'\0' * 4096)
+    (root / '.terraform' / 'modules').mkdir()
+    (root / '.terraform' / 'modules' / 'modules.json').write_text('{}')
+    (root / 'fixtures').mkdir()
+    (root / 'fixtures' / 'big.json').write_text('{}' * 1000)
+    (root / '.terraformignore').write_text('# test data\nfixtures/\n*.log\n')
+    (root / 'debug.log').write_text('noise\n')
+
+
+def test_terraformignore_rules():
+    ignore = TerraformIgnore(['*.log', 'fixtures/', '!keep.log', '/build'])
+    defaults = TerraformIgnore()
+
+    assert ignore.excluded('debug.log')
+    assert ignore.excluded('sub/dir/debug.log')
+    assert not ignore.excluded('keep.log')
+    assert ignore.excluded('fixtures', is_dir=True)
+    assert ignore.excluded('fixtures/a.json')
+    assert not ignore.excluded('fixtures')
+    assert ignore.excluded('build/out')
+    assert not ignore.excluded('sub/build/out')
+    assert ignore.excluded('.git/HEAD')
+    assert ignore.prune('fixtures')
+    assert defaults.prune('.git')
+    assert defaults.prune('.terraform/providers')
+    assert not defaults.prune('.terraform')
+    assert not defaults.prune('.terraform/modules')
+    assert not defaults.excluded('.terraform/modules/modules.json')
+
+def test_streamed_bundle_matches_tarfile(tmp_path):
+    _make_tree(tmp_path)
+    bundle = ConfigurationBundle(str(tmp_path))
+    data = b''.join(bundle.iter_gzip(chunk_size=1024))
+
+    with tarfile.open(fileobj=io.BytesIO(data), mode='r:gz') as tar:
+        names = sorted(tar.getnames())
+        main = tar.extractfile('main.tf').read()
+
+    assert names == ['.terraform/modules',
+                     '.terraform/modules/modules.json', '.terraformignore',
+                     'main.tf', 'modules', 'modules/net',
+                     'modules/net/main.tf']
+    assert main == b'terraform {}\n'
+    assert set(bundle.skipped) == {'.git/', '.terraform/providers/',
+                                   'fixtures/', 'debug.log'}
+    assert bundle.compressed_size == len(data)
+
+def test_create_and_upload_stream(fake_server, fake_client, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-stream')
+    source_dir = tmp_path / 'tf'
+    source_dir.mkdir()
+    _make_tree(source_dir)
+
+    cv_id = fake_client.configuration_versions.create_and_upload(
+        source_tf_dir=str(source_dir), dest_tf_dir=str(tmp_path),
+        ws_id=ws_id, stream=True)
+
+    assert fake_client.configuration_versions.get_cv_status(cv_id) == 'uploaded'
+    assert not list(tmp_path.glob('tf_*.tar.gz'))
+    uploads = [o['data'] for o in fake_server.objects.values() if o['data']]
+    with tarfile.open(fileobj=io.BytesIO(uploads[-1]), mode='r:gz') as tar:
+        assert 'main.tf' in tar.getnames()
+        assert 'debug.log' not in tar.getnames()
+
+def test_create_tf_tarball_terraformignore(fake_client, tmp_path):
+    source_dir = tmp_path / 'tf'
+    source_dir.mkdir()
+    _make_tree(source_dir)
+    cv = fake_client.configuration_versions
+
+    tarball = cv._create_tf_tarball(source_dir=str(source_dir),
+                                    dest_dir=str(source_dir))
+
+    with tarfile.open(tarball, mode='r:gz') as tar:
+        names = tar.getnames()
+    assert 'main.tf' in names
+    assert not any(n.startswith(('.git', 'fixtures', 'tf_')) for n in names)
+    assert cv.last_bundle['files'] == 4
+    assert 'fixtures/' in cv.last_bundle['skipped']
+    assert cv.last_bundle['compressed_size'] == os.path.getsize(tarball)
+
+def test_parallel_gzip_is_standard_gzip():
+    rng = random.Random(1)
+    chunks = [rng.randbytes(5000) + b'terraform ' * 2000 for _ in range(40)]
+    raw = b''.join(chunks)
+
+    data = b''.join(parallel_gzip(iter(chunks), compresslevel=6, workers=4,
+                                  block_size=16 * 1024))
+    empty = b''.join(parallel_gzip(iter([]), workers=2))
+
+    assert gzip.decompress(data) == raw
+    assert len(data) < len(raw)
+    assert gzip.decompress(empty) == b''
+
+def test_bundle_compression_workers(tmp_path):
+    _make_tree(tmp_path)
+    (tmp_path / 'large.tf').write_bytes(b'resource "null" "x" {}\n' * 200000)
+    serial = ConfigurationBundle(str(tmp_path), workers=1)
+    parallel = ConfigurationBundle(str(tmp_path), workers=4, compresslevel=9)
+
+    serial_data = b''.join(serial.iter_gzip())
+    parallel_data = b''.join(parallel.iter_gzip())
+
+    assert gzip.decompress(parallel_data) == gzip.decompress(serial_data)
+    assert parallel.size == serial.size
+
+def test_deterministic_bundle(tmp_path):
+    first, second = tmp_path / 'a', tmp_path / 'b'
+    for root in (first, second):
+        root.mkdir()
+        _make_tree(root)
+    os.utime(second / 'main.tf', (0, 1234567))
+
+    bundles = [ConfigurationBundle(str(root), workers=workers)
+               for root, workers in ((first, 1), (second, 1), (second, 2))]
+    data = [b''.join(bundle.iter_gzip()) for bundle in bundles]
+
+    assert data[0] == data[1]
+    assert bundles[0].digest == bundles[1].digest == bundles[2].digest
+    assert ConfigurationBundle(str(first)).content_hash() == bundles[0].digest
+
+def test_create_and_upload_reuse(fake_server, fake_client, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-reuse')
+    source_dir = tmp_path / 'tf'
+    source_dir.mkdir()
+    (source_dir / 'main.tf').write_text('terraform {}\n')
+    cv = fake_client.configuration_versions
+
+    cv_ids = [cv.create_and_upload(source_tf_dir=str(source_dir),
+                                   dest_tf_dir=str(tmp_path), ws_id=ws_id,
+                                   stream=stream, reuse=True, cleanup=True)
+              for stream in (False, True)]
+    (source_dir / 'main.tf').write_text('terraform { }\n')
+    changed = cv.create_and_upload(source_tf_dir=str(source_dir), ws_id=ws_id,
+                                   stream=True, reuse=True)
+
+    assert cv_ids[0] == cv_ids[1]
+    assert changed != cv_ids[0]
+    assert len(fake_server.configuration_versions) == 2
+
+def test_create_and_upload_reuse_dest_in_tree(fake_server, fake_client,
+                                              tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-reuse-tree')
+    (tmp_path / 'main.tf').write_text('terraform {}\n')
+    cv = fake_client.configuration_versions
+
+    (tmp_path / 'tf_01012024_000000.tar.gz').write_bytes(b'earlier bundle')
+
+    cv_ids = [cv.create_and_upload(source_tf_dir=str(tmp_path),
+                                   dest_tf_dir=str(tmp_path), ws_id=ws_id,
+                                   reuse=True)
+              for _ in range(2)]
+
+    assert cv.last_bundle['files'] == 1
+    assert cv_ids[0] == cv_ids[1]
+    assert len(fake_server.configuration_versions) == 1
+
+def test_create_and_upload_many(fake_server, fake_client, tmp_path):
+    ws_ids = [fake_server.seed_workspace('pytfc-fake-org', f'pytest-fan-{i}')
+              for i in range(12)]
+    source_dir = tmp_path / 'tf'
+    source_dir.mkdir()
+    _make_tree(source_dir)
+
+    results = fake_client.configuration_versions.create_and_upload_many(
+        source_tf_dir=str(source_dir), ws_ids=ws_ids, auto_queue_runs=False,
+        max_workers=4)
+
+    assert sorted(results) == sorted(ws_ids)
+    uploads = {o['data'] for o in fake_server.objects.values() if o['data']}
+    assert len(uploads) == 1
+    with pytest.raises(FanOutError) as e:
+        fake_client.configuration_versions.create_and_upload_many(
+            source_tf_dir=str(source_dir), ws_ids=[ws_ids[0], 'ws-missing'])
+    assert list(e.value.results) == [ws_ids[0]]
+    assert list(e.value.errors) == ['ws-missing']
+
+def test_create_and_upload_many_connection_pool(fake_server, tmp_path,
+                                                caplog):
+    client = fake_server.client(org='pytfc-fake-org', pool_size=16)
+    adapter = client._requestor._session.get_adapter(fake_server.hostname)
+    assert adapter._pool_maxsize == 16
+    ws_ids = [fake_server.seed_workspace('pytfc-fake-org', f'pytest-pool-{i}')
+              for i in range(16)]
+    source_dir = tmp_path / 'tf'
+    source_dir.mkdir()
+    _make_tree(source_dir)
+
+    with caplog.at_level('WARNING', logger='urllib3.connectionpool'):
+        client.configuration_versions.create_and_upload_many(
+            source_tf_dir=str(source_dir), ws_ids=ws_ids,
+            auto_queue_runs=False, max_workers=16)
+
+    assert 'Connection pool is full' not in caplog.text
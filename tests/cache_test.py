@@ -0,0 +1,55 @@
+import os
+import time
+import pytest
+from pytfc.cache import TEMP_GRACE_PERIOD, DiskCache
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_disk_cache_lru_eviction(tmp_path, compress):
+    cache = DiskCache(str(tmp_path), max_size=2500, compress=compress)
+    values = {f'sv-{i}': os.urandom(1000) for i in range(3)}
+    cache.put('sv-0', values['sv-0'])
+    cache.put('sv-1', values['sv-1'])
+    # Touch sv-0 so that sv-1 is the least recently used entry.
+    past = time.time() - 60
+    for key in ('sv-0', 'sv-1'):
+        os.utime(cache._path(key), (past, past))
+    assert cache.get('sv-0') == values['sv-0']
+
+    cache.put('sv-2', values['sv-2'])
+
+    assert 'sv-1' not in cache
+    assert cache.get('sv-0') == values['sv-0']
+    assert cache.get('sv-2') == values['sv-2']
+    assert cache.size() <= 2500
+    assert cache.get('sv-1') is None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_disk_cache_discards_failed_and_corrupt_writes(tmp_path):
+    cache = DiskCache(str(tmp_path), compress=True)
+    with pytest.raises(RuntimeError):
+        with cache.writer('sv-0') as f:
+            f.write(b'partial')
+            raise RuntimeError('interrupted')
+    assert 'sv-0' not in cache
+    assert os.listdir(str(tmp_path)) == []
+
+    cache.put('sv-1', b'x' * 1000)
+    with open(cache._path('sv-1'), 'r+b') as f:
+        f.seek(20)
+        f.write(b'garbage')
+    assert cache.get('sv-1') is None
+    assert 'sv-1' not in cache
+
+def test_disk_cache_removes_abandoned_temp_files(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    old = tmp_path / '.tmp-crashed'
+    old.write_bytes(b'x' * 100)
+    past = time.time() - TEMP_GRACE_PERIOD - 60
+    os.utime(str(old), (past, past))
+    fresh = tmp_path / '.tmp-writing'
+    fresh.write_bytes(b'x' * 100)
+
+    cache.evict()
+
+    assert sorted(os.listdir(str(tmp_path))) == ['.tmp-writing']
@@ -0,0 +1,99 @@
+import gzip
+import json
+import pytest
+import pytfc
+from pytfc.cassette import Cassette
+from pytfc.exceptions import CassetteMismatch
+
+
+def test_record_and_replay(fake_server, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-cassette')
+    fake_server.seed_state_version(ws_id, b'{"serial": 1, "outputs": {}}')
+    cassette_path = str(tmp_path / 'workflow.cassette')
+
+    cassette = Cassette(cassette_path)
+    client = fake_server.client(org='pytfc-fake-org',
+                                session=cassette.recording_session())
+    recorded_id = client.workspaces.get_ws_id(name='pytest-cassette')
+    url = client.state_versions.get_download_url(
+        sv_id=fake_server.workspaces[ws_id]['current-state-version-id'])
+    recorded_state = client.state_versions.download(url=url)
+    cassette.save()
+    fake_server.stop()
+
+    with gzip.open(cassette_path, 'rt') as fp:
+        assert fake_server.token not in fp.read()
+
+    replay = Cassette.load(cassette_path)
+    client = pytfc.Client(hostname=fake_server.hostname, token='replay',
+                          org='pytfc-fake-org',
+                          session=replay.replay_session())
+
+    assert client.workspaces.get_ws_id(name='pytest-cassette') == recorded_id
+    url = client.state_versions.get_download_url(
+        sv_id=fake_server.workspaces[ws_id]['current-state-version-id'])
+    assert client.state_versions.download(url=url) == recorded_state
+    with pytest.raises(CassetteMismatch):
+        client.workspaces.list()
+
+def test_cassette_redacts_signed_urls(fake_server, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-signed')
+    fake_server.seed_state_version(ws_id, b'{"serial": 1, "outputs": {}}')
+    sv_id = fake_server.workspaces[ws_id]['current-state-version-id']
+    cassette_path = str(tmp_path / 'signed.cassette')
+
+    cassette = Cassette(cassette_path)
+    client = fake_server.client(org='pytfc-fake-org',
+                                session=cassette.recording_session())
+
+    def workflow(client):
+        cv = client.configuration_versions.create(ws_id=ws_id)
+        upload_url = cv.json()['data']['attributes']['upload-url']
+        status = client.configuration_versions.upload(
+            cv_upload_url=upload_url, tf_tarball=b'bundle')
+        url = client.state_versions.get_download_url(sv_id=sv_id)
+        return status, client.state_versions.download(url=url)
+
+    recorded = workflow(client)
+    cassette.save()
+    fake_server.stop()
+
+    with gzip.open(cassette_path, 'rt') as fp:
+        content = fp.read()
+    assert fake_server.objects
+    for object_token in fake_server.objects:
+        assert object_token not in content
+
+    replay = Cassette.load(cassette_path)
+    client = pytfc.Client(hostname=fake_server.hostname, token='replay',
+                          org='pytfc-fake-org',
+                          session=replay.replay_session())
+    assert workflow(client) == recorded
+
+def test_cassette_replays_bodies_verbatim(fake_server, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-verbatim')
+    state = json.dumps({'version': 4, 'serial': 1, 'lineage': 'l',
+                        'outputs': {}, 'resources': [{
+                            'type': 'vault_token', 'name': 'ci',
+                            'instances': [{'attributes': {
+                                'token': 'state-value'}}]}]},
+                       indent=2).encode('utf-8')
+    fake_server.seed_state_version(ws_id, state)
+    sv_id = fake_server.workspaces[ws_id]['current-state-version-id']
+    cassette_path = str(tmp_path / 'verbatim.cassette')
+
+    cassette = Cassette(cassette_path)
+    client = fake_server.client(org='pytfc-fake-org',
+                                session=cassette.recording_session())
+    client.state_versions.download_to(str(tmp_path / 'recorded.tfstate'),
+                                      sv_id=sv_id)
+    cassette.save()
+    fake_server.stop()
+
+    replay = Cassette.load(cassette_path)
+    client = pytfc.Client(hostname=fake_server.hostname, token='replay',
+                          org='pytfc-fake-org',
+                          session=replay.replay_session())
+    client.state_versions.download_to(str(tmp_path / 'replayed.tfstate'),
+                                      sv_id=sv_id)
+    assert (tmp_path / 'replayed.tfstate').read_bytes() == state
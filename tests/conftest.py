@@ -1,5 +1,6 @@
 import pytest
 import pytfc
+from pytfc.testing import FakeTfcServer
 from os import getenv
 
 
@@ -11,3 +12,13 @@ def client():
 @pytest.fixture
 def tfe_ghain():
     return getenv('TFE_GHAIN')
+
+@pytest.fixture
+def fake_server():
+    with FakeTfcServer() as server:
+        server.seed_organization('pytfc-fake-org')
+        yield server
+
+@pytest.fixture
+def fake_client(fake_server):
+    return fake_server.client(org='pytfc-fake-org')
@@ -0,0 +1,54 @@
+import time
+import pytest
+import requests
+from pytfc.exceptions import DeadlineExceeded
+
+
+def test_client_read_timeout(fake_server):
+    client = fake_server.client(org='pytfc-fake-org', timeout=(1, 0.2))
+    fake_server.latency = 1
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.workspaces.list()
+
+def test_create_and_upload_deadline(fake_server, fake_client, tmp_path):
+    fake_server.cv_process_seconds = 60
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-deadline')
+    source_dir = tmp_path / 'tf'
+    source_dir.mkdir()
+    (source_dir / 'main.tf').write_text('terraform {}\n')
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        fake_client.configuration_versions.create_and_upload(
+            source_tf_dir=str(source_dir), dest_tf_dir=str(tmp_path),
+            ws_id=ws_id, deadline=1.5)
+
+    assert time.monotonic() - start < 3
+
+def test_with_deadline_generator():
+    from pytfc import deadline
+
+    @deadline.with_deadline
+    def ticks():
+        while True:
+            assert deadline.current() is not None
+            deadline.sleep(0.1)
+            yield
+
+    seen = []
+    with pytest.raises(DeadlineExceeded):
+        for _ in ticks(deadline=0.35):
+            seen.append(deadline.current())
+    assert seen and all(d is None for d in seen)
+
+def test_bound_timeout_never_zero(monkeypatch):
+    from pytfc import deadline
+    active = deadline.Deadline(10)
+    # The clock reaches the deadline between two reads of it.
+    ticks = iter([active.expires_at - 1e-9, active.expires_at])
+    monkeypatch.setattr(deadline.time, 'monotonic', lambda: next(ticks))
+
+    assert min(active.bound_timeout((10, 60))) > 0
+    with pytest.raises(DeadlineExceeded):
+        active.bound_timeout((10, 60))
@@ -0,0 +1,42 @@
+import pytest
+import requests
+
+
+def test_list_all_paginates_workspaces(fake_server, fake_client):
+    fake_server.seed_workspaces('pytfc-fake-org', 250)
+    response = fake_client.workspaces.list_all()
+
+    assert len(response['data']) == 250
+    assert response['data'][-1]['attributes']['name'] == 'ws-000249'
+
+def test_create_and_upload_configuration_version(fake_server, fake_client,
+                                                 tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-cv')
+    source_dir = tmp_path / 'tf'
+    source_dir.mkdir()
+    (source_dir / 'main.tf').write_text('resource "null_resource" "x" {}\n')
+
+    cv_id = fake_client.configuration_versions.create_and_upload(
+        source_tf_dir=str(source_dir), dest_tf_dir=str(tmp_path),
+        cleanup=True, ws_id=ws_id)
+
+    assert fake_client.configuration_versions.get_cv_status(cv_id) == 'uploaded'
+    assert fake_server.configuration_versions[cv_id]['size'] > 0
+
+def test_download_state_version(fake_server, fake_client):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-sv')
+    state = b'{"version": 4, "serial": 3, "outputs": {}, "resources": []}'
+    sv_id = fake_server.seed_state_version(ws_id, state)
+
+    url = fake_client.state_versions.get_download_url(sv_id=sv_id)
+
+    assert fake_client.state_versions.download(url=url) == state
+
+def test_injected_rate_limit(fake_server, fake_client):
+    fake_server.inject_429()
+
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        fake_client.workspaces.list()
+
+    assert e.value.response.status_code == 429
+    assert fake_client.workspaces.list().status_code == 200
@@ -0,0 +1,52 @@
+import json
+from pytfc.cache import OUTPUTS_KEY, DiskCache
+
+def _outputs_state(ws_name, serial=1):
+    return json.dumps({'version': 4, 'serial': serial, 'lineage': ws_name,
+                       'outputs': {'name': {'value': ws_name,
+                                            'type': 'string'},
+                                   'serial': {'value': serial,
+                                              'type': 'number'}},
+                       'resources': []})
+
+def test_harvest_outputs(fake_server, fake_client, tmp_path):
+    ws_ids = fake_server.seed_workspaces('pytfc-fake-org', 30, prefix='svo')
+    for i, ws_id in enumerate(ws_ids[:25]):
+        fake_server.seed_state_version(ws_id, _outputs_state(f'svo-{i:06d}'))
+    cache = DiskCache(str(tmp_path))
+    fake_server.retry_after = 0
+    fake_server.rate_limit_every = 7
+
+    outputs = fake_client.state_version_outputs.harvest(cache=cache)
+
+    assert len(outputs) == 30
+    assert outputs['svo-000003'] == {'name': 'svo-000003', 'serial': 1}
+    assert outputs['svo-000029'] == {}
+
+    fake_server.rate_limit_every = None
+    fake_server.seed_state_version(ws_ids[3], _outputs_state('svo-000003', 2))
+    fake_server.log_requests = True
+    again = fake_client.state_version_outputs.harvest(
+        workspaces=['svo-000003', 'svo-000004', ws_ids[5]], cache=cache)
+
+    assert again == {'svo-000003': {'name': 'svo-000003', 'serial': 2},
+                     'svo-000004': {'name': 'svo-000004', 'serial': 1},
+                     'svo-000005': {'name': 'svo-000005', 'serial': 1}}
+    assert [path for _, path in fake_server.request_log
+            if '/outputs' in path] == \
+        [f"/api/v2/state-versions/"
+         f"{fake_server.workspaces[ws_ids[3]]['current-state-version-id']}"
+         f"/outputs"]
+
+def test_harvest_skips_caching_unprocessed_outputs(fake_server, fake_client,
+                                                   tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'svo-unprocessed')
+    # Outputs are not parsed, as before TFC/E has processed the state.
+    sv_id = fake_server.seed_state_version(
+        ws_id, _outputs_state('svo-unprocessed'), parse_outputs=False)
+    cache = DiskCache(str(tmp_path))
+
+    outputs = fake_client.state_version_outputs.harvest(cache=cache)
+
+    assert outputs == {'svo-unprocessed': {}}
+    assert OUTPUTS_KEY.format(sv_id=sv_id) not in cache
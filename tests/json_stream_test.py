@@ -0,0 +1,46 @@
+import json
+from pytfc import json_stream
+
+
+STATE = {
+    'version': 4,
+    'serial': 3,
+    'lineage': 'pytest',
+    'outputs': {'ids': {'value': [1, 2.5, 'x'], 'type': ['list', 'string']}},
+    'resources': [
+        {'mode': 'data', 'type': 'aws_ami', 'name': 'ubuntu',
+         'instances': [{'attributes': {'id': 'ami-1'}}]},
+        {'module': 'module.app', 'mode': 'managed', 'type': 'aws_instance',
+         'name': 'web', 'instances': [
+             {'index_key': 0, 'attributes': {'tags': {'a': 'q"\\{['}}},
+             {'index_key': 1, 'attributes': {'user_data': 'é' * 5000}}]},
+        {'mode': 'managed', 'type': 'aws_s3_bucket', 'name': 'b',
+         'instances': [{'index_key': 'logs', 'attributes': {}},
+                       {'index_key': 'data', 'attributes': {}}]},
+    ],
+    'check_results': None,
+}
+
+def _chunks(size):
+    raw = json.dumps(STATE, ensure_ascii=False, indent=1).encode('utf-8')
+    return (raw[i:i + size] for i in range(0, len(raw), size))
+
+def test_stream_parser_matches_json_loads():
+    for size in (1, 5, 64 * 1024):
+        assert list(json_stream.iter_resources(_chunks(size))) == \
+            STATE['resources']
+        assert json_stream.read_outputs(_chunks(size)) == STATE['outputs']
+
+def test_stream_parser_filters():
+    web = list(json_stream.iter_resources(
+        _chunks(7), addresses=['module.app.aws_instance.web[1]']))
+    assert [i['index_key'] for i in web[0]['instances']] == [1]
+    buckets = list(json_stream.iter_resources(
+        _chunks(7), addresses=['aws_s3_bucket.b["logs"]', 'data.aws_ami.ubuntu']))
+    assert [json_stream.resource_address(r) for r in buckets] == \
+        ['data.aws_ami.ubuntu', 'aws_s3_bucket.b']
+    assert len(buckets[1]['instances']) == 1
+    extracted = json_stream.extract(_chunks(3), outputs=False,
+                                    types=['aws_instance'])
+    assert extracted['serial'] == 3
+    assert [r['name'] for r in extracted['resources']] == ['web']
@@ -0,0 +1,82 @@
+import os
+import time
+from pytfc.exceptions import DeadlineExceeded, MissingPlan
+import pytest
+
+
+def _plan_id(fake_server):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-pe')
+    run_id = fake_server.seed_run(ws_id, status='planned')
+    return fake_server.runs[run_id]['plan_id']
+
+def test_plan_export_streaming(fake_server, fake_client, tmp_path):
+    plan_id = _plan_id(fake_server)
+    fake_server.log_requests = True
+
+    mocks = fake_client.plan_exports.read_mocks(
+        plan_id=plan_id, members=['mock-tfplan-v2.sentinel'])
+    assert list(mocks) == ['mock-tfplan-v2.sentinel']
+    assert plan_id.encode() in mocks['mock-tfplan-v2.sentinel']
+    # The download URL is learned from the redirect alone.
+    assert len([r for r in fake_server.request_log
+                if r[1].startswith('/_archivist/')]) == 1
+
+    extracted = fake_client.plan_exports.extract(
+        plan_id=plan_id, dest_folder=str(tmp_path / 'only'),
+        members=lambda name: name.startswith('mock-tfstate'))
+    assert [os.path.basename(p) for p in extracted] == \
+        ['mock-tfstate-v2.sentinel']
+
+    fake_server.inject_object_truncation(count=1, at=20)
+    path = fake_client.plan_exports.download(plan_id=plan_id,
+                                             dest_folder=str(tmp_path))
+    assert sorted(os.listdir(str(tmp_path))) == sorted([
+        os.path.basename(path), 'only', 'mock-tfconfig-v2.sentinel',
+        'mock-tfplan-v2.sentinel', 'mock-tfrun.sentinel',
+        'mock-tfstate-v2.sentinel', 'sentinel.hcl'])
+    pe_id = fake_server.plans[plan_id]['export_ids'][0]
+    token = fake_server.plan_exports[pe_id]['token']
+    with open(path, 'rb') as f:
+        assert f.read() == fake_server.objects[token]['data']
+
+    with pytest.raises(MissingPlan):
+        fake_client.plan_exports.read_mocks()
+
+
+def test_plan_artifacts_cache(fake_server, tmp_path):
+    from pytfc.cache import DiskCache
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-pe-cache')
+    run_id = fake_server.seed_run(ws_id, status='planned')
+    plan_id = fake_server.runs[run_id]['plan_id']
+    fake_server.set_plan_json(plan_id, {'format_version': '1.2',
+                                        'resource_changes': [{'address': 'a'}]})
+    client = fake_server.client(org='pytfc-fake-org',
+                                cache=DiskCache(str(tmp_path / 'cache')))
+
+    first = client.plans.get_json_output(plan_id)
+    mocks = client.plan_exports.read_mocks(plan_id=plan_id)
+    fake_server.log_requests = True
+    assert client.plans.get_json_output(plan_id) == first
+    assert client.runs.get_plan_json_output(run_id).json() == first
+    assert client.runs.get_plan_json_output(run_id).json() == first
+    assert client.plan_exports.read_mocks(plan_id=plan_id) == mocks
+    extracted = client.plan_exports.extract(
+        plan_id=plan_id, dest_folder=str(tmp_path / 'mocks'))
+    assert len(extracted) == len(mocks)
+    (tmp_path / 'download').mkdir()
+    path = client.plan_exports.download(
+        plan_id=plan_id, dest_folder=str(tmp_path / 'download'),
+        extract=False)
+    assert os.path.basename(path) == f'{plan_id}-sentinel-mocks.tar.gz'
+    # Only the first Run lookup (Run -> Plan) reaches the API.
+    assert fake_server.request_log == [('GET', f'/api/v2/runs/{run_id}')]
+
+def test_iter_mocks_deadline(fake_server, fake_client):
+    plan_id = _plan_id(fake_server)
+    fake_server.latency = 0.5
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        list(fake_client.plan_exports.iter_mocks(plan_id=plan_id,
+                                                 deadline=0.6))
+    assert time.monotonic() - start < 1.5
@@ -0,0 +1,91 @@
+import json
+import pytest
+from pytfc.cache import PLAN_JSON_KEY, DiskCache
+from pytfc.exceptions import PlanJsonUnavailable
+from pytfc.plan_json import iter_resource_changes, summarize
+
+
+def _change(address, type, actions):
+    return {'address': address, 'type': type, 'name': address.split('.')[-1],
+            'mode': 'managed',
+            'change': {'actions': actions, 'before': {'id': address},
+                       'after': {'id': address, 'big': 'x' * 1000}}}
+
+PLAN = {
+    'format_version': '1.2',
+    'planned_values': {'root_module': {'resources': [{'x': [1, '"]}']}]}},
+    'resource_changes': [
+        _change('aws_instance.a', 'aws_instance', ['create']),
+        _change('aws_instance.b', 'aws_instance', ['delete', 'create']),
+        _change('aws_s3_bucket.c', 'aws_s3_bucket', ['delete']),
+        _change('aws_s3_bucket.d', 'aws_s3_bucket', ['update']),
+        _change('aws_s3_bucket.e', 'aws_s3_bucket', ['no-op']),
+    ],
+    'output_changes': {},
+}
+
+def test_plan_json_streaming():
+    body = json.dumps(PLAN)
+    chunks = (body[i:i + 7].encode() for i in range(0, len(body), 7))
+
+    summary = summarize(chunks)
+    assert summary.total == 5 and summary.changes == 4
+    assert summary.actions == {'create': 1, 'replace': 1, 'delete': 1,
+                               'update': 1, 'no-op': 1}
+    assert summary.types['aws_s3_bucket'] == {'delete': 1, 'update': 1,
+                                              'no-op': 1}
+    assert summary.replaced == ['aws_instance.b']
+    assert summary.destroyed == ['aws_s3_bucket.c']
+
+    changes = list(iter_resource_changes(body, values=False,
+                                         actions=['create', 'replace']))
+    assert [c['address'] for c in changes] == ['aws_instance.a',
+                                               'aws_instance.b']
+    assert 'after' not in changes[0]['change']
+    assert [c['change']['after']['id'] for c in iter_resource_changes(
+        body, types=['aws_s3_bucket'])] == ['aws_s3_bucket.c',
+                                            'aws_s3_bucket.d',
+                                            'aws_s3_bucket.e']
+    assert not summarize(json.dumps({'resource_changes': []}))
+
+def test_plans_summarize(fake_server, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-plan-json')
+    run_id = fake_server.seed_run(ws_id, status='planned')
+    plan_id = fake_server.runs[run_id]['plan_id']
+    fake_server.set_plan_json(plan_id, PLAN)
+    client = fake_server.client(org='pytfc-fake-org',
+                                cache=DiskCache(str(tmp_path)))
+
+    summary = client.plans.summarize(plan_id, types=['aws_instance'])
+    assert summary.to_dict()['actions'] == {'create': 1, 'replace': 1}
+    # The whole document was read and cached along the way.
+    fake_server.log_requests = True
+    assert client.plans.get_json_output(plan_id) == PLAN
+    assert [c['address'] for c in client.plans.iter_resource_changes(
+        plan_id, actions=['delete'])] == ['aws_s3_bucket.c']
+    assert fake_server.request_log == []
+
+def test_plans_json_unavailable(fake_server, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-plan-wip')
+    run_id = fake_server.seed_run(ws_id, status='planning')
+    plan_id = fake_server.runs[run_id]['plan_id']
+    fake_server.set_plan_json(plan_id, PLAN)
+    cache = DiskCache(str(tmp_path))
+    client = fake_server.client(org='pytfc-fake-org', cache=cache)
+
+    with pytest.raises(PlanJsonUnavailable):
+        client.plans.summarize(plan_id)
+    with pytest.raises(PlanJsonUnavailable):
+        client.plans.get_json_output(plan_id)
+    assert PLAN_JSON_KEY.format(plan_id=plan_id) not in cache
+
+    fake_server.set_run_status(run_id, 'planned')
+    assert client.plans.summarize(plan_id).total == len(
+        PLAN['resource_changes'])
+    assert client.runs.get_plan_json_output(run_id).json() == PLAN
+
+def test_plan_json_errors_name_the_plan():
+    with pytest.raises(ValueError, match='Invalid JSON plan'):
+        summarize(b'')
+    with pytest.raises(ValueError, match='Invalid JSON plan'):
+        summarize(b'{"resource_changes": [1,')
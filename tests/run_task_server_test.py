@@ -0,0 +1,101 @@
+import asyncio
+import json
+import requests
+import threading
+from pytfc.run_task_server import (
+    SIGNATURE_HEADER, RunTaskResult, RunTaskServer)
+from pytfc.webhooks import sign
+import pytest
+
+
+def _payload(fake_server, run_id, result_id, access_token=None):
+    return json.dumps({
+        'payload_version': 1,
+        'stage': 'post_plan',
+        'access_token': access_token or fake_server.token,
+        'run_id': run_id,
+        'task_result_id': result_id,
+        'task_result_callback_url':
+            f'{fake_server.base_uri}/task-results/{result_id}/callback',
+        'workspace_name': 'pytest-run-task',
+        'organization_name': 'pytfc-fake-org',
+    }).encode('utf-8')
+
+def _post(server, body, key='secret'):
+    return requests.post(server.url, data=body,
+                         headers={SIGNATURE_HEADER: sign(body, key)})
+
+def test_run_task_server_callbacks(fake_server):
+    def handler(request):
+        if request.run_id == 'run-boom':
+            raise RuntimeError('boom')
+        return RunTaskResult('passed', message=f'checked {request.run_id}')
+
+    with RunTaskServer(handler, hmac_key='secret', host='127.0.0.1',
+                       max_workers=4) as server:
+        verification = _post(server, _payload(
+            fake_server, None, 'taskrs-verify', 'verification-token'))
+        bad = _post(server, _payload(fake_server, 'run-1', 'taskrs-1'),
+                    key='wrong')
+        accepted = [_post(server, _payload(fake_server, f'run-{i}',
+                                           f'taskrs-{i}')).status_code
+                    for i in range(10)]
+        _post(server, _payload(fake_server, 'run-boom', 'taskrs-boom'))
+        server.join(timeout=5)
+
+    assert verification.status_code == 200
+    assert bad.status_code == 401
+    assert accepted == [200] * 10
+    assert 'taskrs-verify' not in fake_server.task_results
+    assert fake_server.task_results['taskrs-3'] == [
+        {'status': 'passed', 'message': 'checked run-3'}]
+    assert fake_server.task_results['taskrs-boom'][0]['status'] == 'failed'
+    assert server.completed == 11
+
+def test_run_task_server_async_handler(fake_server):
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        return False
+
+    server = RunTaskServer(handler, verify=False)
+    for i in range(5):
+        assert server.handle(_payload(fake_server, f'run-{i}',
+                                      f'taskrs-{i}')) == 200
+    server.stop()
+
+    assert [r[0]['status'] for r in fake_server.task_results.values()] == \
+        ['failed'] * 5
+
+def test_run_task_server_listener():
+    import http.client
+    with pytest.raises(ValueError):
+        RunTaskServer(lambda request: True)
+
+    with RunTaskServer(lambda request: True, hmac_key='secret',
+                       max_workers=256) as server:
+        assert server.host == '127.0.0.1'
+        assert server._httpd.request_queue_size == 256
+        conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+        conn.putrequest('POST', '/')
+        conn.putheader('Content-Length', '-1')
+        conn.endheaders()
+        assert conn.getresponse().status == 400
+        conn.close()
+
+def test_run_task_server_creates_one_executor_and_loop():
+    server = RunTaskServer(lambda request: 'passed', verify=False)
+    barrier = threading.Barrier(16)
+    created = []
+
+    def first_request():
+        barrier.wait()
+        created.append((server._get_executor(), server._get_loop()))
+
+    threads = [threading.Thread(target=first_request) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.stop()
+
+    assert len(set(created)) == 1
@@ -0,0 +1,54 @@
+import time
+from pytfc.run_watcher import RunWatcher
+
+
+def test_run_watcher_bulk_refresh(fake_server, fake_client):
+    fake_server.run_step_seconds = 0.3
+    ws_ids = [fake_server.seed_workspace('pytfc-fake-org', f'pytest-watch-{i}')
+              for i in range(5)]
+    run_ids = [fake_server.seed_run(ws_id, **{'auto-apply': True})
+               for ws_id in ws_ids for _ in range(4)]
+    plan_only = fake_server.seed_run(ws_ids[0], **{'plan-only': True})
+
+    for mode in ('admin', 'workspace'):
+        for run_id in run_ids + [plan_only]:
+            fake_server.runs[run_id]['started'] = time.monotonic()
+        events = []
+        watcher = RunWatcher(fake_client, mode=mode, interval=0.1,
+                             max_interval=0.2, callback=events.append)
+        for run_id in run_ids:
+            watcher.add(run_id)
+        watcher.add(plan_only, ws_id=ws_ids[0])
+
+        statuses = watcher.wait(timeout=10)
+
+        assert statuses[plan_only] == 'planned_and_finished'
+        assert all(statuses[run_id] == 'applied' for run_id in run_ids)
+        assert {e.run_id for e in events} == set(run_ids + [plan_only])
+        assert all(e.ws_id for e in events)
+        # One GET per Run per tick would be well over 100 requests.
+        assert watcher.requests < 80, (mode, watcher.requests)
+
+def test_run_watcher_pages_and_deadline(fake_server, fake_client):
+    from pytfc import deadline
+    from pytfc.exceptions import DeadlineExceeded
+    import pytest
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-watch-many')
+    run_ids = [fake_server.seed_run(ws_id, status='planning')
+               for _ in range(150)]
+
+    for mode in ('admin', 'workspace'):
+        watcher = RunWatcher(fake_client, mode=mode, interval=0.05)
+        for run_id in run_ids:
+            watcher.add(run_id, ws_id=ws_id)
+        watcher.refresh()
+        # Two listing pages, no per-Run lookups.
+        assert watcher.requests == 2, mode
+        assert set(watcher.statuses.values()) == {'planning'}
+
+    fake_server.set_run_status(run_ids[0], 'planned_and_finished')
+    seen = []
+    with pytest.raises(DeadlineExceeded):
+        for event in watcher.events(timeout=0.3):
+            seen.append(deadline.current())
+    assert seen and all(d is None for d in seen)
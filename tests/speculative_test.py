@@ -0,0 +1,46 @@
+from pytfc import deadline
+from pytfc.exceptions import FanOutError, SpeculativePlanError
+from pytfc.speculative import iter_speculative_plans, speculative_plans
+import pytest
+
+PLAN = {'resource_changes': [
+    {'address': 'aws_vpc.main', 'type': 'aws_vpc',
+     'change': {'actions': ['delete', 'create']}},
+    {'address': 'aws_subnet.a', 'type': 'aws_subnet',
+     'change': {'actions': ['create']}},
+]}
+
+def test_speculative_plans(fake_server, fake_client, tmp_path):
+    fake_server.run_step_seconds = 0.05
+    fake_server.set_default_plan_json(PLAN)
+    ws_ids = [fake_server.seed_workspace('pytfc-fake-org', f'pytest-spec-{i}')
+              for i in range(6)]
+    (tmp_path / 'main.tf').write_text('terraform {}\n')
+
+    results = []
+    for result in iter_speculative_plans(
+            fake_client, str(tmp_path), ws_ids + ['ws-missing'],
+            max_workers=4, interval=0.05, timeout=30):
+        # The timeout does not leak into the consumer's code.
+        assert deadline.current() is None
+        results.append(result)
+
+    assert sorted(r.ws_id for r in results) == sorted(ws_ids + ['ws-missing'])
+    finished = [r for r in results if r.error is None]
+    assert len(finished) == len(ws_ids)
+    for r in finished:
+        assert r.status == 'planned_and_finished'
+        assert fake_server.runs[r.run_id]['plan-only']
+        assert r.summary.replaced == ['aws_vpc.main']
+        assert r.summary.actions == {'replace': 1, 'create': 1}
+    # One bundle, uploaded to speculative Configuration Versions only.
+    assert len({o['data'] for o in fake_server.objects.values()
+                if o['data']}) == 1
+    assert all(cv['speculative'] and not cv['auto-queue-runs']
+               for cv in fake_server.configuration_versions.values())
+
+    fake_server.set_default_run_status('errored')
+    with pytest.raises(FanOutError) as e:
+        speculative_plans(fake_client, str(tmp_path), [ws_ids[0]],
+                          interval=0.05, timeout=30)
+    assert isinstance(e.value.errors[ws_ids[0]], SpeculativePlanError)
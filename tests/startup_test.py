@@ -0,0 +1,33 @@
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = [
+    'requests',
+    'hcl',
+    'tarfile',
+    'urllib.request',
+    'pytfc.api.workspaces',
+    'pytfc.api.configuration_versions',
+]
+
+
+def test_import_does_not_load_heavy_modules():
+    code = ('import json, sys, pytfc; '
+            f'print(json.dumps([m for m in {HEAVY_MODULES!r} '
+            'if m in sys.modules]))')
+    out = subprocess.run([sys.executable, '-c', code], check=True,
+                         capture_output=True, text=True)
+
+    assert json.loads(out.stdout) == []
+
+def test_client_defers_ws_lookup(fake_server):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-lazy-ws')
+    requests_before = fake_server.request_count
+
+    client = fake_server.client(org='pytfc-fake-org', ws='pytest-lazy-ws')
+    assert fake_server.request_count == requests_before
+
+    assert client.runs.ws_id == ws_id
+    assert client.configuration_versions.ws_id == ws_id
+    assert fake_server.request_count == requests_before + 1
@@ -0,0 +1,46 @@
+import json
+from pytfc.state_diff import diff_states
+
+
+def _state(serial, resources, outputs=None):
+    return json.dumps({'version': 4, 'serial': serial, 'lineage': 'pytest',
+                       'outputs': outputs or {}, 'resources': resources})
+
+def _resource(name, instances, type='null_resource', module=None):
+    resource = {'mode': 'managed', 'type': type, 'name': name,
+                'instances': instances}
+    if module:
+        resource['module'] = module
+    return resource
+
+def test_diff_states():
+    old = _state(1, [
+        _resource('a', [{'attributes': {'id': '1', 'tags': {'x': 1}}}]),
+        _resource('b', [{'index_key': 0, 'attributes': {'id': 'b0'}},
+                        {'index_key': 1, 'attributes': {'id': 'b1'}}]),
+        _resource('gone', [{'attributes': {'id': 'g'}}], module='module.m'),
+    ], outputs={'keep': {'value': 1, 'type': 'number'},
+                'drop': {'value': 2, 'type': 'number'}})
+    new = _state(2, [
+        _resource('a', [{'attributes': {'id': '1', 'tags': {'x': 2}},
+                         'status': 'tainted'}]),
+        _resource('b', [{'index_key': 0, 'attributes': {'id': 'b0'}}]),
+        _resource('c', [{'index_key': 'k', 'attributes': {'id': 'c'}}],
+                  type='aws_instance'),
+    ], outputs={'keep': {'value': 3, 'type': 'number'},
+                'new': {'value': 4, 'type': 'number'}})
+
+    diff = diff_states(old.encode(), (new[i:i + 10].encode()
+                                      for i in range(0, len(new), 10)))
+
+    assert (diff.old_serial, diff.new_serial) == (1, 2)
+    assert diff.added == ['aws_instance.c["k"]']
+    assert diff.removed == ['module.m.null_resource.gone',
+                            'null_resource.b[1]']
+    assert diff.changed == {'null_resource.a': ['<status>', 'tags']}
+    assert diff.outputs_added == ['new']
+    assert diff.outputs_removed == ['drop']
+    assert diff.outputs_changed == {'keep': ['value']}
+    assert not diff_states(old, old)
+    assert diff_states(old, new, types=['aws_instance']).to_dict()['added'] \
+        == ['aws_instance.c["k"]']
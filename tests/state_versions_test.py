@@ -0,0 +1,150 @@
+import json
+import os
+import pytest
+from pytfc.cache import DiskCache
+from pytfc.exceptions import StateVersionDownloadError
+from pytfc.exceptions import StateVersionUploadError
+
+
+def _state(resources=2000):
+    return json.dumps({
+        'version': 4, 'serial': 7, 'lineage': 'pytest-lineage',
+        'outputs': {'region': {'value': 'us-east-2', 'type': 'string'}},
+        'resources': [{'mode': 'managed', 'type': 'null_resource',
+                       'name': f'r{i}', 'instances': [{'attributes':
+                                                       {'id': str(i)}}]}
+                      for i in range(resources)],
+    }).encode('utf-8')
+
+def test_state_download_to_resumes(fake_server, fake_client, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-sv')
+    state = _state()
+    sv_id = fake_server.seed_state_version(ws_id, state)
+    fake_client.set_ws('pytest-sv')
+
+    fake_server.inject_object_truncation(count=2, at=10000)
+    seen = []
+    path = fake_client.state_versions.download_to(
+        str(tmp_path / 'terraform.tfstate'), chunk_size=4096,
+        progress=lambda received, total: seen.append((received, total)))
+
+    with open(path, 'rb') as f:
+        assert f.read() == state
+    assert seen[-1] == (len(state), len(state))
+    assert not os.path.exists(path + '.part')
+    assert b''.join(fake_client.state_versions.iter_download(
+        sv_id=sv_id, retries=0)) == state
+
+def test_state_download_checks_md5(fake_server, fake_client, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-sv')
+    sv_id = fake_server.seed_state_version(ws_id, _state(10))
+    fake_server.state_versions[sv_id]['md5'] = '0' * 32
+    fake_client.set_ws('pytest-sv')
+
+    path = str(tmp_path / 'terraform.tfstate')
+    with pytest.raises(StateVersionDownloadError):
+        fake_client.state_versions.download_to(path, sv_id=sv_id)
+    assert not os.path.exists(path)
+    assert not os.path.exists(path + '.part')
+
+def test_state_stream_parser(fake_server, fake_client):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-sv')
+    fake_server.seed_state_version(ws_id, _state())
+    fake_client.set_ws('pytest-sv')
+    sv = fake_client.state_versions
+
+    assert sv.read_outputs()['region']['value'] == 'us-east-2'
+    resources = list(sv.iter_resources(
+        addresses=['null_resource.r5', 'null_resource.r1999']))
+    assert [r['name'] for r in resources] == ['r5', 'r1999']
+    assert list(sv.iter_resources(types=['aws_instance'])) == []
+    extracted = sv.extract(types=['null_resource'])
+    assert extracted['serial'] == 7
+    assert len(extracted['resources']) == 2000
+
+def test_state_download_cache(fake_server, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-sv')
+    state = _state(50)
+    fake_server.seed_state_version(ws_id, state)
+    client = fake_server.client(org='pytfc-fake-org', ws='pytest-sv',
+                                cache=DiskCache(str(tmp_path), compress=True))
+    fake_server.log_requests = True
+
+    assert client.state_versions.download_current() == state
+    assert client.state_versions.download_current() == state
+    assert b''.join(client.state_versions.iter_download()) == state
+    object_gets = [r for r in fake_server.request_log
+                   if r[1].startswith('/_archivist/')]
+    assert len(object_gets) == 1
+
+def test_state_download_cache_verifies(fake_server, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-sv')
+    other_ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-sv-2')
+    state = _state(10)
+    fake_server.seed_state_version(ws_id, state)
+    other_sv_id = fake_server.seed_state_version(other_ws_id, _state(3))
+    client = fake_server.client(org='pytfc-fake-org', ws='pytest-sv',
+                                cache=DiskCache(str(tmp_path)))
+    sv = client.state_versions.get_current().json()['data']
+    other_url = client.state_versions.get_download_url(sv_id=other_sv_id)
+
+    # Another document under the same State Version ID is not cached.
+    other = client.state_versions.download(other_url, sv_id=sv['id'])
+    assert client.state_versions.download(
+        sv['attributes']['hosted-state-download-url'], sv_id=sv['id']) \
+        == state != other
+    assert client.state_versions.download_current() == state
+
+def test_state_diff_previous(fake_server, fake_client):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-sv')
+    state = json.loads(_state(20))
+    fake_server.seed_state_version(ws_id, json.dumps(state))
+    state['serial'] += 1
+    state['resources'].pop(3)
+    state['resources'][5]['instances'][0]['attributes']['id'] = 'new'
+    fake_server.seed_state_version(ws_id, json.dumps(state))
+    fake_client.set_ws('pytest-sv')
+
+    diff = fake_client.state_versions.diff_previous()
+    assert diff.removed == ['null_resource.r3']
+    assert diff.changed == {'null_resource.r6': ['id']}
+    assert diff.added == []
+
+def test_state_upload_streams_to_upload_url(fake_server, fake_client,
+                                            tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-sv')
+    fake_client.set_ws('pytest-sv')
+    state = _state(500)
+    path = tmp_path / 'migrated.tfstate'
+    path.write_bytes(state)
+    fake_server.inject_object_error(count=1, status=503)
+    sent = []
+
+    sv = fake_client.state_versions.upload(
+        str(path), progress=lambda done, total: sent.append((done, total)))
+
+    assert sv['attributes']['status'] == 'pending'
+    assert fake_server.workspaces[ws_id]['current-state-version-id'] == \
+        sv['id']
+    assert fake_client.state_versions.download_current() == state
+    assert fake_server.state_versions[sv['id']]['serial'] == 7
+    assert fake_server.state_versions[sv['id']]['lineage'] == \
+        'pytest-lineage'
+    assert sent[-1] == (len(state), len(state))
+    assert fake_client.state_versions.read_outputs()['region']['value'] == \
+        'us-east-2'
+
+def test_inspect_state_file_sorted_keys(fake_server, fake_client, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-sv-sorted')
+    path = tmp_path / 'sorted.tfstate'
+    path.write_text(json.dumps(json.loads(_state(10)), sort_keys=True,
+                               indent=2))
+
+    info = fake_client.state_versions.inspect_state_file(str(path))
+
+    assert (info['serial'], info['lineage']) == (7, 'pytest-lineage')
+    assert info['size'] == os.path.getsize(str(path))
+    path.write_text(json.dumps({'version': 4, 'outputs': {}}))
+    with pytest.raises(StateVersionUploadError):
+        fake_client.state_versions.upload(str(path), ws_id=ws_id)
+    assert fake_server.state_versions == {}
@@ -0,0 +1,38 @@
+import time
+import pytest
+import requests
+from pytfc.transfer import BandwidthLimiter
+
+
+def test_upload_progress_and_retry(fake_server, fake_client, tmp_path):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-upload')
+    tarball = tmp_path / 'tf.tar.gz'
+    tarball.write_bytes(b'x' * 300000)
+    cv = fake_client.configuration_versions.create(ws_id=ws_id).json()
+    progress = []
+
+    fake_server.inject_object_error(count=2, status=503)
+    with open(tarball, 'rb') as fp:
+        fake_client._requestor.upload(
+            url=cv['data']['attributes']['upload-url'], data=fp,
+            progress=lambda sent, total: progress.append((sent, total)),
+            backoff=0.01)
+
+    assert progress[-1] == (300000, 300000)
+    assert fake_server.configuration_versions[cv['data']['id']]['size'] == 300000
+
+def test_upload_gives_up_on_client_errors(fake_server, fake_client):
+    fake_server.inject_object_error(count=1, status=403)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        fake_client._requestor.upload(
+            url=fake_server.object_url('missing'), data=b'data', backoff=0.01)
+
+def test_bandwidth_limiter():
+    limiter = BandwidthLimiter(100000, burst=10000)
+
+    start = time.monotonic()
+    for _ in range(10):
+        limiter.consume(10000)
+
+    assert 0.8 < time.monotonic() - start < 2
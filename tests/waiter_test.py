@@ -0,0 +1,54 @@
+import time
+import pytest
+from pytfc.exceptions import DeadlineExceeded
+from pytfc.waiter import Waiter
+
+
+def test_waiter_backoff_and_on_change():
+    states = iter(['pending', 'pending', 'pending', 'running', 'done'])
+    changes = []
+    sleeps = []
+    waiter = Waiter(initial_delay=0.01, max_delay=0.04, multiplier=2,
+                    jitter=0, on_change=lambda old, new: changes.append(new))
+    waiter._sleep_time = lambda delay: sleeps.append(delay) or 0
+
+    result = waiter.wait(poll=lambda: next(states),
+                         until=lambda state: state == 'done')
+
+    assert result == 'done'
+    assert waiter.polls == 5
+    assert changes == ['pending', 'running', 'done']
+    assert sleeps == [0.01, 0.02, 0.04, 0.01]
+
+def test_waiter_timeout():
+    waiter = Waiter(initial_delay=0.05, timeout=0.3)
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        waiter.wait(poll=lambda: 'pending', until=lambda state: False)
+    assert time.monotonic() - start < 1
+
+def test_run_and_upload_waits(fake_server, fake_client, tmp_path):
+    fake_server.run_step_seconds = 0.2
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-wait')
+    run_id = fake_server.seed_run(ws_id, **{'auto-apply': True})
+    changes = []
+
+    run = fake_client.runs.wait(
+        run_id=run_id, waiter=Waiter(initial_delay=0.05, max_delay=0.1,
+                                     on_change=lambda old, new: changes.append(new)))
+
+    assert run['data']['attributes']['status'] == 'applied'
+    assert changes[0] in ('pending', 'planning') and changes[-1] == 'applied'
+    assert len(changes) == len(set(changes))
+
+    fake_server.cv_process_seconds = 0.5
+    source_dir = tmp_path / 'tf'
+    source_dir.mkdir()
+    (source_dir / 'main.tf').write_text('terraform {}\n')
+    fake_server.log_requests = True
+    cv_id = fake_client.configuration_versions.create_and_upload(
+        source_tf_dir=str(source_dir), ws_id=ws_id, stream=True)
+    polls = [p for m, p in fake_server.request_log
+             if m == 'GET' and p.endswith(cv_id)]
+    assert 1 < len(polls) < 8
@@ -0,0 +1,87 @@
+import json
+import threading
+import requests
+from pytfc.run_watcher import RunWatcher
+from pytfc.webhooks import SIGNATURE_HEADER, WebhookReceiver, sign
+
+
+def _payload(run_id, ws_id, status, trigger):
+    return json.dumps({
+        'payload_version': 1,
+        'run_id': run_id,
+        'workspace_id': ws_id,
+        'workspace_name': 'pytest-webhook',
+        'organization_name': 'pytfc-fake-org',
+        'notifications': [{'message': 'Run update', 'trigger': trigger,
+                           'run_status': status}],
+    }).encode('utf-8')
+
+def test_webhook_receiver_feeds_watcher(fake_server, fake_client):
+    ws_id = fake_server.seed_workspace('pytfc-fake-org', 'pytest-webhook')
+    run_id = fake_server.seed_run(ws_id, status='planning')
+    watcher = RunWatcher(fake_client, run_ids=[run_id], interval=60)
+    events = []
+
+    with WebhookReceiver(token='secret', host='127.0.0.1') as receiver:
+        receiver.attach(watcher)
+        registered = fake_client.notification_configurations.register_webhook(
+            url=receiver.url, token='secret', ws_ids=[ws_id])
+        again = fake_client.notification_configurations.register_webhook(
+            url=receiver.url, token='secret', ws_ids=[ws_id])
+
+        bad = requests.post(receiver.url, data=_payload(
+            run_id, ws_id, 'applied', 'run:completed'),
+            headers={SIGNATURE_HEADER: 'bogus'})
+        body = _payload(run_id, ws_id, 'applied', 'run:completed')
+        deliver = threading.Timer(0.3, requests.post, args=(receiver.url,),
+                                  kwargs={'data': body,
+                                          'headers': {SIGNATURE_HEADER:
+                                                      sign(body, 'secret')}})
+        deliver.start()
+        for event in watcher.events(timeout=5):
+            events.append(event)
+        deliver.join()
+
+        assert receiver.wait_for_run(run_id, timeout=1) == 'applied'
+
+    assert registered == again
+    assert len(fake_server.notification_configurations) == 1
+    assert bad.status_code == 401
+    assert [e.status for e in events] == ['planning', 'applied']
+    assert watcher.requests == 1
+
+def test_webhook_receiver_rejects_bad_requests():
+    import http.client
+    import pytest
+    with pytest.raises(ValueError):
+        WebhookReceiver()
+    assert WebhookReceiver(verify=False).handle(b'{}') == 200
+
+    with WebhookReceiver(token='secret') as receiver:
+        assert receiver.host == '127.0.0.1'
+        statuses = []
+        for length in (None, 'abc', '-1', str(10 * 1024 * 1024)):
+            conn = http.client.HTTPConnection('127.0.0.1', receiver.port,
+                                              timeout=5)
+            conn.putrequest('POST', '/')
+            if length is not None:
+                conn.putheader('Content-Length', length)
+            conn.endheaders()
+            statuses.append(conn.getresponse().status)
+            conn.close()
+        for body in (b'[1]', b'"run"', b'null'):
+            conn = http.client.HTTPConnection('127.0.0.1', receiver.port,
+                                              timeout=5)
+            conn.request('POST', '/', body=body, headers={
+                SIGNATURE_HEADER: sign(body, 'secret')})
+            statuses.append(conn.getresponse().status)
+            conn.close()
+
+        receiver.handle = lambda body, signature=None: 1 / 0
+        conn = http.client.HTTPConnection('127.0.0.1', receiver.port,
+                                          timeout=5)
+        conn.request('POST', '/', body=b'{}')
+        statuses.append(conn.getresponse().status)
+        conn.close()
+    assert statuses == [411, 400, 400, 413, 400, 400, 400, 500]
+    assert receiver.rejected == 3